@@ -0,0 +1,109 @@
+"""Benchmark of NER file processing: whole-file regex vs streaming parser.
+
+Usage:
+    python benchmarks/ner_extractor_benchmark.py --lines 500000 --entities 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import tracemalloc
+from hashlib import sha256
+from time import perf_counter
+
+import pandas as pd
+from cleaning_utils import replace_arabic_char
+
+from phrase_api.scripts.NER_extractor import (
+    NE_PATTERN,
+    clean_ne_records,
+    iter_ne_batches,
+)
+
+PERSIAN_LETTERS = "ابپتثجچحخدذرزسشصضطظعغفقکگلمنوهی"
+TAGS = ["O"] * 6 + ["B-PER", "I-PER", "B-LOC", "I-LOC", "S-ORG", "E-ORG"]
+
+
+def random_word(rnd: random.Random) -> str:
+    """Creating a random Persian word."""
+    return "".join(rnd.choices(PERSIAN_LETTERS, k=rnd.randint(2, 7)))
+
+
+def write_sample(path: str, lines: int, entities: int, seed: int) -> None:
+    """Writing a NER file of ``word<TAB>tag`` lines."""
+    rnd = random.Random(seed)
+    vocabulary = [random_word(rnd) for _ in range(entities)]
+    with open(path, "w", encoding="utf-8") as ner_file:
+        for _ in range(lines):
+            ner_file.write(f"{rnd.choice(vocabulary)}\t{rnd.choice(TAGS)}\n")
+
+
+def whole_file(path: str) -> pd.DataFrame:
+    """Previous approach: reading the file at once & hashing with row apply."""
+    with open(path, encoding="utf-8") as ner_file:
+        raw_ne = ner_file.read()
+    records = [clean_ne_records(match.group()) for match in NE_PATTERN.finditer(raw_ne)]
+    words = set([
+        replace_arabic_char(ne) for ne, type_ne in (
+            record.split(" ") for record in records if len(record.split(" ")) == 2
+        ) if type_ne != "O" and type_ne.startswith(("I", "B", "E", "S"))
+    ])
+    df = pd.DataFrame(words, columns=["word"])
+    df["word_hash"] = df.apply(
+        lambda row: sha256(row["word"].encode()).hexdigest(), axis=1
+    )
+    return df
+
+
+def streaming(path: str) -> pd.DataFrame:
+    """Streaming parser, batches concatenated for comparison."""
+    with open(path, encoding="utf-8") as ner_file:
+        return pd.concat(list(iter_ne_batches(ner_file)), ignore_index=True)
+
+
+def measure(func, path: str):
+    """Running func, returning its result, seconds & peak traced memory.
+
+    Memory is traced in a second run since tracing slows the code down.
+    """
+    start = perf_counter()
+    result = func(path)
+    elapsed = perf_counter() - start
+
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> None:
+    """Running the benchmark and printing timings."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=500000)
+    parser.add_argument("--entities", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sample.ner")
+        write_sample(path, args.lines, args.entities, args.seed)
+        size = os.path.getsize(path)
+
+        old, old_time, old_peak = measure(whole_file, path)
+        new, new_time, new_peak = measure(streaming, path)
+
+    print(f"{args.lines} lines ({size / 2 ** 20:.1f} MiB), {len(new)} entities")
+    print(f"whole file:      {old_time * 1000:10.1f} ms "
+          f"{args.lines / old_time:12.0f} records/s "
+          f"{old_peak / 2 ** 20:8.1f} MiB peak")
+    print(f"streaming:       {new_time * 1000:10.1f} ms "
+          f"{args.lines / new_time:12.0f} records/s "
+          f"{new_peak / 2 ** 20:8.1f} MiB peak")
+    print(f"speedup:         {old_time / new_time:10.1f} x")
+    print(f"same words:      {set(old['word']) == set(new['word'])}")
+    print(f"same hashes:     {set(old['word_hash']) == set(new['word_hash'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ from phrase_api.scripts.progress_viewer import view_progress
 from phrase_api.scripts.NER_extractor import ner_handler
 from phrase_api.scripts.chunk_aggregate import aggregation_handler
 from phrase_api.scripts.NE_search import tag_handler
+from phrase_api.scripts.export_phrases import export_handler
+from phrase_api.scripts.setup_db import setup_db_handler
 from phrase_api.scripts.word_graph_ingest import ingest_word_graph
 
 
@@ -27,28 +29,92 @@ def cli_wrapper(args):
         "view-progress", help="View progress for ingestion"
     )
 
+    # ------------------------- Database Setup -------------------------
+    setup_db_parser = subparsers.add_parser(
+        "setup-db", help="Create collections & indexes used by the API and CLI."
+    )
+
+    # Verify only
+    setup_db_parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Only report missing collections & indexes.",
+    )
+
+    # Explain
+    setup_db_parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Report index usage of every query the API and CLI issue.",
+    )
+
+    # ------------------------- Phrase Export -------------------------
+    export_parser = subparsers.add_parser(
+        "export", help="Export phrases as NDJSON, CSV or Parquet."
+    )
+
+    # Output
+    export_parser.add_argument(
+        "--output", action="store", help="Path of the export file", required=True
+    )
+
+    # Format
+    export_parser.add_argument(
+        "--format", action="store", help="Export format",
+        choices=["ndjson", "csv", "parquet"], default="ndjson"
+    )
+
+    # Status
+    export_parser.add_argument(
+        "--status", action="store", help="Status filter of exported phrases",
+        choices=["highlight", "stop", "has_status", "no_status", "suggested-stop"]
+    )
+
+    # Fields
+    export_parser.add_argument(
+        "--fields", action="store",
+        help="Comma separated fields to export, e.g. bag,count,status"
+    )
+
+    # Batch size
+    export_parser.add_argument(
+        "--batch_size", action="store", help="Phrases fetched per round trip",
+        default=10000, type=int
+    )
+
     # ------------------------- NER Search Handler -------------------------
     ner_search_handler_parser = subparsers.add_parser(
         "search-NE", help="Search for NE and tag them with suggested highlight."
     )
 
-    # Max Records
+    # Chunk Size
+    ner_search_handler_parser.add_argument(
+        "--chunk_size", action="store", help="N records to fetch in each query",
+        required=False, default=1000, type=int
+    )
+
+    # Partition Size
     ner_search_handler_parser.add_argument(
-        "--max_records", action="store",
-        help="Total Number of records in aggregated collection",
-        required=True, type=int
+        "--partition_size", action="store",
+        help="Approximate number of records in each key range",
+        required=False, default=100000, type=int
     )
 
-    # Chunk Size
+    # Checkpoints
     ner_search_handler_parser.add_argument(
-        "--chunk_size", action="store", help="N records to fetch in each job",
-        required=False, default=1000, type=int
+        "--checkpoint_dir", action="store",
+        help="Directory of progress checkpoints. Default is checkpoints/search-NE",
+        required=False
+    )
+    ner_search_handler_parser.add_argument(
+        "--restart", action="store_true",
+        help="Ignore checkpoints of an interrupted run. Default is False.",
     )
 
     # NER Search Jobs
     ner_search_handler_parser.add_argument(
         "--n_jobs", action="store", help="Number of processes to run on.",
-        required=False, default=1
+        required=False, default=1, type=int
     )
 
     # ------------------------- NER Process Handler -------------------------
@@ -89,6 +155,38 @@ def cli_wrapper(args):
         action="store", help="List of IDs", required=False
     )
 
+    # Aggregation mode
+    agg_handler.add_argument(
+        "--mode", choices=["bulk", "incremental", "record"], default="bulk",
+        help="bulk aggregates batches of documents in one query, incremental "
+        "does the same for documents after the site watermark, record "
+        "upserts every phrase record separately. Default is bulk.",
+    )
+
+    # Documents per batch
+    agg_handler.add_argument(
+        "--docs_per_batch", action="store",
+        help="Documents aggregated in each query of bulk & incremental modes",
+        required=False, default=100, type=int
+    )
+
+    # Incremental mode
+    agg_handler.add_argument(
+        "--max_gap", action="store",
+        help="Consecutive IDs without records that end an incremental run",
+        required=False, default=1000, type=int
+    )
+    agg_handler.add_argument(
+        "--lookback", action="store",
+        help="IDs before the watermark checked again for late documents. "
+        "Default is 100, one ingest batch",
+        required=False, type=int
+    )
+    agg_handler.add_argument(
+        "--since_id", action="store",
+        help="Watermark used instead of the stored one", required=False, type=int
+    )
+
     # ----------------------- doc-process Enpoint Handler -----------------------
     ingest_parser = subparsers.add_parser(
         "ingest", help="CLI wrapper for doc-process API"
@@ -202,11 +300,19 @@ def run_commands(args: dict):
         ner_handler(args["ner_path"])
     elif args["command"] == "chunk-agg":
         aggregation_handler(args)
+    elif args["command"] == "export":
+        if not export_handler(args):
+            sys.exit(1)
+    elif args["command"] == "setup-db":
+        if not setup_db_handler(verify_only=args["verify"], explain=args["explain"]):
+            sys.exit(1)
     elif args["command"] == "search-NE":
         tag_handler(
-            max_records=args["max_records"],
             chunk_size=args["chunk_size"],
-            n_jobs=args["n_jobs"]
+            n_jobs=args["n_jobs"],
+            partition_size=args["partition_size"],
+            checkpoint_dir=args["checkpoint_dir"],
+            restart=args["restart"],
         )
 
 
@@ -0,0 +1,96 @@
+"""Bounded in-process response caches."""
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from phrase_api.lib.metrics import CACHE_REQUESTS
+
+
+class TTLCache:
+    """Least recently used cache whose entries expire after ``ttl`` seconds.
+
+    Args:
+        name: Cache name, used as metrics label.
+        max_entries: Maximum number of entries kept.
+        ttl: Seconds an entry is served for. 0 disables the cache.
+        clock: Monotonic clock in seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 256,
+        ttl: float = 30,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Fresh value of key or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Storing value, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Cached value of key, loading & storing it on a miss.
+
+        Args:
+            key: Cache key.
+            loader: Function computing the value.
+
+        Returns:
+            Cached or loaded value.
+        """
+        if self.ttl <= 0:
+            return loader()
+        value = self.get(key)
+        if value is not None:
+            CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return value
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Dropping all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Pages of ``fetch_data``. Every worker has its own copy: counts changed by
+# ingestion and status updates served by other workers show up after at most
+# ``FETCH_CACHE_TTL`` seconds, status updates of this worker clear it right away.
+# Keying pages on the collection revision would drop them on every ingested
+# document, so staleness is bounded by the ttl instead.
+FETCH_CACHE = TTLCache(
+    "fetch-data",
+    max_entries=int(os.getenv("FETCH_CACHE_SIZE") or 256),
+    ttl=float(os.getenv("FETCH_CACHE_TTL") or 30),
+)
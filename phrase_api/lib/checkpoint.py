@@ -0,0 +1,46 @@
+"""Progress checkpoints of resumable CLI jobs."""
+from typing import Any, Dict, Optional
+
+import json
+import os
+from pathlib import Path
+
+
+class CheckpointStore:
+    """JSON checkpoints stored as one file per name.
+
+    Writes are atomic, so a job killed mid-write leaves the previous
+    checkpoint in place.
+
+    Args:
+        directory: Directory of checkpoint files, created if missing.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, name: str) -> Path:
+        """File of the named checkpoint."""
+        return self.directory / f"{name}.json"
+
+    def read(self, name: str) -> Optional[Dict[str, Any]]:
+        """Checkpoint or None if it was never written."""
+        try:
+            with open(self.path(name), encoding="utf-8") as checkpoint_file:
+                return json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None
+
+    def write(self, name: str, state: Dict[str, Any]) -> None:
+        """Replacing the checkpoint atomically."""
+        path = self.path(name)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as checkpoint_file:
+            json.dump(state, checkpoint_file)
+        os.replace(tmp_path, path)
+
+    def clear(self) -> None:
+        """Removing all checkpoints."""
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
@@ -1,6 +1,7 @@
 """Helper functions for CLI."""
 import multiprocessing as mp
 import os
+from time import sleep
 
 import requests
 from sqlalchemy import BLOB, Column, Integer, Text, create_engine, select, update, and_
@@ -13,6 +14,10 @@ Base = declarative_base()
 
 logger = LoggerSetup(__name__, "info").get_minimal()
 
+# Batches rejected because the API queue is full are retried with backoff
+INGEST_RETRY_ATTEMPTS = int(os.getenv("INGEST_RETRY_ATTEMPTS") or 5)
+INGEST_RETRY_DELAY = float(os.getenv("INGEST_RETRY_DELAY") or 1.0)
+
 
 class News(Base):
     """News metadata"""
@@ -75,6 +80,30 @@ def ingest_site(cli_args):
     )
 
 
+def post_batch(url, payload, headers):
+    """Posting a batch to the API, retrying while its queue is full.
+
+    503 responses are retried up to ``INGEST_RETRY_ATTEMPTS`` times, waiting
+    ``INGEST_RETRY_DELAY`` seconds doubled on every attempt, or the
+    ``Retry-After`` header if it is longer.
+
+    Returns:
+        Last response of the API.
+    """
+    req = requests.post(url, json=payload, headers=headers)
+    for attempt in range(INGEST_RETRY_ATTEMPTS):
+        if req.status_code != 503:
+            break
+        delay = max(
+            INGEST_RETRY_DELAY * 2 ** attempt,
+            float(req.headers.get("Retry-After") or 0),
+        )
+        logger.warning("API queue is full, retrying batch in %.1f seconds.", delay)
+        sleep(delay)
+        req = requests.post(url, json=payload, headers=headers)
+    return req
+
+
 def ingest_news(news_ids, cli_args, ngram_range):
     """Ingesting each news"""
     try:
@@ -106,45 +135,66 @@ def ingest_news(news_ids, cli_args, ngram_range):
             return
 
         news_content = list(news_content)
+        if not news_content:
+            return
 
-        for content in news_content:
-            news = content[0]
-            news_id = content[1]
-
-            # --------------- Creating request to doc-process endpoint ---------------
-            payload = {"document": news}
-            headers = {"x-token": os.getenv("API_KEY")}
-            request_url = f"http://127.0.0.1:80/api/doc-process/?doc_type=TEXT&\
+        # --------------- Creating request to batch doc-process endpoint ---------------
+        payload = {
+            "documents": [
+                {
+                    "document": news,
+                    "doc_id": str(news_id),
+                    "sitename": cli_args["sitename"],
+                }
+                for news, news_id in news_content
+            ]
+        }
+        headers = {"x-token": os.getenv("API_KEY")}
+        request_url = f"http://127.0.0.1:80/api/doc-process/batch?doc_type=TEXT&\
 replace_stop={cli_args['replace_stop']}&tag_stop={cli_args['tag_stop']}\
-&tag_highlight={cli_args['tag_highlight']}&ngram_range={ngram_range}\
-&doc_id={news_id}&sitename={cli_args['sitename']}"
-
-            req = requests.post(request_url, json=payload, headers=headers)
-
-            # --------------- Updating process status in news DB ---------------
-            if req.status_code == 201:
-
-                update_query = (update(News).where(
-                    News.newsstudio_id == news_id).values(proc_status=1))
-
-                conn.execute(update_query)
-                logger.info(
-                    "Finished processing news %d of site %s.",
-                    news_id,
-                    cli_args["sitename"]
-                )
-
+&tag_highlight={cli_args['tag_highlight']}&ngram_range={ngram_range}"
+
+        req = post_batch(request_url, payload, headers)
+
+        if req.status_code == 201:
+            doc_results = req.json()["documents"]
+        else:
+            logger.error(
+                "Failed ingesting %s - news ids %d to %d (status %d).",
+                cli_args["sitename"],
+                news_ids[0],
+                news_ids[1],
+                req.status_code,
+            )
+            doc_results = [{"status": "failed"} for _ in news_content]
+
+        # --------------- Updating process status in news DB ---------------
+        done_ids = []
+        failed_ids = []
+        for (_, news_id), doc_result in zip(news_content, doc_results):
+            if doc_result["status"] == "done":
+                done_ids.append(news_id)
             else:
                 logger.error(
                     "Failed ingesting %s - news_id: %d",
                     cli_args["sitename"],
                     news_id,
                 )
-                update_query = (update(News).where(
-                    News.newsstudio_id == news_id).values(proc_status=2))
+                failed_ids.append(news_id)
 
+        for proc_status, status_ids in ((1, done_ids), (2, failed_ids)):
+            if status_ids:
+                update_query = (update(News).where(
+                    News.newsstudio_id.in_(status_ids)).values(proc_status=proc_status))
                 conn.execute(update_query)
 
+        logger.info(
+            "Finished processing %d news of site %s (%d failed).",
+            len(done_ids),
+            cli_args["sitename"],
+            len(failed_ids),
+        )
+
     except (OperationalError, TimeoutError) as err:
         logger.error("Failed connecting to news database.", exc_info=err)
         conn.close()
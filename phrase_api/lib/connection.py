@@ -0,0 +1,163 @@
+"""Process-wide pooled ArangoDB connections."""
+from typing import Dict, Optional
+
+import os
+import threading
+
+from arango import ArangoClient
+from arango.database import StandardDatabase
+from arango.http import DefaultHTTPClient
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from phrase_api.logger import LoggerSetup
+
+logger = LoggerSetup(__name__, "info").get_minimal()
+
+
+class PooledHTTPClient(DefaultHTTPClient):
+    """HTTP client keeping a bounded pool of keep-alive connections per host."""
+
+    RETRY_ATTEMPTS = 3
+    BACKOFF_FACTOR = 1
+
+    def __init__(self, pool_size: int = 10) -> None:
+        super().__init__()
+        self.pool_size = pool_size
+
+    def create_session(self, host: str) -> Session:
+        """Creating a session with a bounded keep-alive connection pool.
+
+        Args:
+            host: ArangoDB host URL.
+
+        Returns:
+            requests session object.
+        """
+        retry_strategy = Retry(
+            total=self.RETRY_ATTEMPTS,
+            backoff_factor=self.BACKOFF_FACTOR,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["HEAD", "GET", "OPTIONS"],
+        )
+        http_adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            pool_block=True,
+            max_retries=retry_strategy,
+        )
+
+        session = Session()
+        session.mount("https://", http_adapter)
+        session.mount("http://", http_adapter)
+
+        return session
+
+
+class ArangoConnectionManager:
+    """Lazily created ArangoDB client shared by everything in a process.
+
+    The client is recreated when used from a forked child (e.g. workers of
+    ``multiprocessing.Pool``) so processes never share sockets.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._client: Optional[ArangoClient] = None
+        self._databases: Dict[str, StandardDatabase] = {}
+
+    def _reset_if_forked(self) -> None:
+        """Dropping connections inherited from a parent process."""
+        if self._pid is not None and self._pid != os.getpid():
+            self._client = None
+            self._databases = {}
+            self._pid = None
+
+    def client(self) -> ArangoClient:
+        """Getting the process client, creating it on first use."""
+        with self._lock:
+            self._reset_if_forked()
+            if self._client is None:
+                host = os.getenv("ARANGO_HOST")
+                port = os.getenv("ARANGO_PORT")
+                pool_size = int(os.getenv("ARANGO_POOL_SIZE") or 10)
+                self._client = ArangoClient(
+                    hosts=f"http://{host}:{port}",
+                    http_client=PooledHTTPClient(pool_size=pool_size),
+                )
+                self._pid = os.getpid()
+                logger.info(
+                    "Created ArangoDB client for process %d (pool size %d).",
+                    self._pid,
+                    pool_size,
+                )
+            return self._client
+
+    def db(self, name: Optional[str] = None) -> StandardDatabase:
+        """Getting a database wrapper on top of the shared client.
+
+        Args:
+            name: Database name. Defaults to ``ARANGO_DATABASE``.
+
+        Returns:
+            Standard database API wrapper.
+        """
+        name = name or os.getenv("ARANGO_DATABASE")
+        client = self.client()
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = client.db(
+                    name,
+                    username=os.getenv("ARANGO_USER"),
+                    password=os.getenv("ARANGO_PASS"),
+                )
+            return self._databases[name]
+
+    def health_check(self) -> bool:
+        """Checking the server answers on the pooled connection.
+
+        A failed check drops the client so the next call reconnects.
+        """
+        try:
+            self.db().version()
+            return True
+        except Exception as err:
+            logger.warning("ArangoDB health check failed.", exc_info=err)
+            self.close()
+            return False
+
+    def close(self) -> None:
+        """Closing pooled connections of this process."""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._databases = {}
+            self._pid = None
+
+
+_MANAGER = ArangoConnectionManager()
+
+
+def get_database(name: Optional[str] = None) -> StandardDatabase:
+    """Getting the pooled database of the current process.
+
+    Args:
+        name: Database name. Defaults to ``ARANGO_DATABASE``.
+
+    Returns:
+        Standard database API wrapper.
+    """
+    return _MANAGER.db(name)
+
+
+def check_connection() -> bool:
+    """Health check for the pooled connection of the current process."""
+    return _MANAGER.health_check()
+
+
+def close_connections() -> None:
+    """Closing pooled connections of the current process."""
+    _MANAGER.close()
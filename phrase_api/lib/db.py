@@ -1,20 +1,59 @@
 """Arango Database Configs."""
-from typing import Dict, List, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
+import json
 import os
-from hashlib import sha256
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 
 from arango import ArangoClient
+from arango.database import StandardDatabase
 from fastapi.exceptions import HTTPException
 from pandas import DataFrame
 from bson.objectid import ObjectId
 
+from phrase_api.lib.cache import FETCH_CACHE
+from phrase_api.lib.connection import get_database
+from phrase_api.lib.keys import phrase_keys
+from phrase_api.lib.retry import (
+    DEAD_LETTERS,
+    DEFAULT_POLICY,
+    WriteDroppedError,
+    execute_with_retry,
+)
 from phrase_api.logger import LoggerSetup
-from arango.exceptions import AQLQueryExecuteError
 
 
 logger = LoggerSetup(__name__, "info").get_minimal()
 
+UPSERT_MODES = ("batch", "single")
+
+# Adds counts of every item in ``@batch`` to the documents with same key
+BATCH_UPSERT_QUERY = """
+FOR item IN @batch
+    UPSERT {"_key": item._key}
+        INSERT item
+        UPDATE {"count": OLD.count + item.count}
+    IN @@collection
+"""
+
+# Same as ``BATCH_UPSERT_QUERY``, stamping edges for incremental reads of the
+# word graph cache
+EDGE_UPSERT_QUERY = """
+FOR item IN @batch
+    UPSERT {"_key": item._key}
+        INSERT MERGE(item, {"updated_at": DATE_NOW()})
+        UPDATE {"count": OLD.count + item.count, "updated_at": DATE_NOW()}
+    IN @@collection
+"""
+
+# Sets statuses by key, phrases missing from the collection are skipped
+STATUS_UPDATE_QUERY = """
+FOR item IN @updates
+    UPDATE {"_key": item._key} WITH {"status": item.status} IN @@phrase_col
+    OPTIONS {ignoreErrors: true}
+    RETURN NEW._key
+"""
+
 
 def arango_connection() -> ArangoClient:
     """Connecting to arango."""
@@ -25,180 +64,282 @@ def arango_connection() -> ArangoClient:
     return arango_client
 
 
-def integrate_phrase_data(result: DataFrame) -> None:
+def integrate_phrase_data(
+    result: DataFrame,
+    mode: str = "batch",
+    batch_size: Optional[int] = None,
+    dead_letter: bool = True,
+) -> Dict[str, int]:
     """Inserting or updating phrase data in arango collection.
 
     Args:
         result: JSON result of counted phrases or generated edges.
+        mode: ``batch`` for sending rows as ``FOR item IN @batch UPSERT ...``
+            statements or ``single`` for one UPSERT per phrase.
+        batch_size: Number of rows in each batch statement. ``None`` sends the
+            whole dataframe in one statement. Ignored in ``single`` mode.
+        dead_letter: Recording rows that failed after retries in the
+            dead-letter sink.
+
+    Returns:
+        Number of rows written, round trips used and rows dropped.
+
+    Raises:
+        ValueError: If unknown mode is given.
+        WriteDroppedError: If any row failed after retries. Other rows are
+            still written.
     """
+    if mode not in UPSERT_MODES:
+        raise ValueError(f"Unknown upsert mode: {mode}")
+
     # ------------------ Initialization & Connecting to database ------------------
     vertex_col_name = os.getenv("PHRASE_COLLECTION")
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
-    client = arango_connection()
-    phrase_db = client.db(database, username=username, password=password)
+    phrase_db = get_database()
 
     # Converting results to JSON records
-    result = result.to_dict(orient="records")
-
-    # UPSERT every item in result set.
-    for item in result:
-        try_counter = 1
-        while True:
-            try:
-                upsert_query = """
-                UPSERT {"_key": @phrase_hash}
-                    INSERT {"_key": @phrase_hash, "bag": @bag,"count": @count,
-                    "status": @status, "length": @length, "object_id": @obj_id}
-                    UPDATE {"count": OLD.count + @count}
-                IN @@agg_collection
-                """
-                binds = {
-                    "@agg_collection": vertex_col_name,
-                    "phrase_hash": item["_key"],
-                    "bag": item["bag"],
-                    "count": item["count"],
-                    "status": item["status"],
-                    "length": item["length"],
-                    "obj_id": str(ObjectId())
-                }
-                phrase_db.aql.execute(
-                    query=upsert_query,
-                    cache=False,
-                    bind_vars=binds
-                )
-                break
-            except AQLQueryExecuteError:
-                logger.warning(
-                    "AQL exception for phrase %s. Retrying (%d).",
-                    item["_key"],
-                    try_counter)
-
-                try_counter += 1
-                if try_counter >= 10:
-                    break
-
-    client.close()
-
-
-def integrate_word_data(result: DataFrame) -> None:
+    records = [
+        {
+            "_key": item["_key"],
+            "bag": item["bag"],
+            "count": item["count"],
+            "status": item.get("status"),
+            "length": item.get("length"),
+            "object_id": str(ObjectId()),
+        }
+        for item in result.to_dict(orient="records")
+    ]
+
+    if mode == "single":
+        stats = _upsert_phrases_single(
+            phrase_db, vertex_col_name, records, dead_letter=dead_letter
+        )
+    else:
+        stats = _upsert_batches(
+            phrase_db,
+            "phrase-upsert",
+            BATCH_UPSERT_QUERY,
+            vertex_col_name,
+            records,
+            batch_size,
+            dead_letter=dead_letter,
+        )
+
+    return stats
+
+
+def _upsert_phrases_single(
+    phrase_db: StandardDatabase,
+    collection: str,
+    records: List[Dict[str, Any]],
+    dead_letter: bool = True,
+) -> Dict[str, int]:
+    """UPSERT every phrase in its own AQL query."""
+    upsert_query = """
+    UPSERT {"_key": @phrase_hash}
+        INSERT {"_key": @phrase_hash, "bag": @bag,"count": @count,
+        "status": @status, "length": @length, "object_id": @obj_id}
+        UPDATE {"count": OLD.count + @count}
+    IN @@agg_collection
+    """
+    rows, round_trips = 0, 0
+    failed: List[Dict[str, Any]] = []
+    budget = DEFAULT_POLICY.budget(len(records))
+    for item in records:
+        binds = {
+            "@agg_collection": collection,
+            "phrase_hash": item["_key"],
+            "bag": item["bag"],
+            "count": item["count"],
+            "status": item["status"],
+            "length": item["length"],
+            "obj_id": item["object_id"],
+        }
+
+        def upsert(binds=binds):
+            nonlocal round_trips
+            round_trips += 1
+            phrase_db.aql.execute(query=upsert_query, cache=False, bind_vars=binds)
+
+        try:
+            execute_with_retry("phrase-upsert", upsert, budget=budget)
+            rows += 1
+        except Exception as err:
+            _drop("phrase-upsert", [item], err, failed, dead_letter)
+
+    return _write_stats("phrase-upsert", rows, round_trips, failed)
+
+
+def _upsert_batches(
+    phrase_db: StandardDatabase,
+    operation: str,
+    upsert_query: str,
+    collection: str,
+    records: List[Dict[str, Any]],
+    batch_size: Optional[int] = None,
+    dead_letter: bool = True,
+) -> Dict[str, int]:
+    """Running a ``FOR item IN @batch`` query once per chunk of records.
+
+    Args:
+        phrase_db: Database.
+        operation: Name of the write, used in logs, metrics & dead letters.
+        upsert_query: Query binding ``@batch`` and ``@@collection``.
+        collection: Collection name.
+        records: Rows to write.
+        batch_size: Number of rows in each query. ``None`` sends all rows in
+            one query.
+        dead_letter: Recording rows that failed after retries in the
+            dead-letter sink.
+
+    Returns:
+        Number of rows written, round trips used and rows dropped.
+
+    Raises:
+        WriteDroppedError: If any chunk failed after retries. Other chunks
+            are still written.
+    """
+    rows, round_trips = 0, 0
+    failed: List[Dict[str, Any]] = []
+    budget = DEFAULT_POLICY.budget(len(records))
+    for batch in _chunks(records, batch_size):
+
+        def upsert(batch=batch):
+            nonlocal round_trips
+            round_trips += 1
+            phrase_db.aql.execute(
+                query=upsert_query,
+                cache=False,
+                bind_vars={"@collection": collection, "batch": batch}
+            )
+
+        try:
+            execute_with_retry(operation, upsert, budget=budget)
+            rows += len(batch)
+        except Exception as err:
+            _drop(operation, batch, err, failed, dead_letter)
+
+    return _write_stats(operation, rows, round_trips, failed)
+
+
+def _drop(
+    operation: str,
+    rows: List[Dict[str, Any]],
+    err: Exception,
+    failed: List[Dict[str, Any]],
+    dead_letter: bool,
+) -> None:
+    """Collecting rows that failed after retries."""
+    failed.extend(rows)
+    if dead_letter:
+        DEAD_LETTERS.write(operation, rows, err)
+    else:
+        logger.error("%s failed for %d rows.", operation, len(rows), exc_info=err)
+
+
+def _write_stats(
+    operation: str, rows: int, round_trips: int, failed: List[Dict[str, Any]]
+) -> Dict[str, int]:
+    """Stats of a write, raising if any row was dropped."""
+    stats = {"rows": rows, "round_trips": round_trips, "dropped": len(failed)}
+    if failed:
+        raise WriteDroppedError(operation, failed, stats)
+    return stats
+
+
+def _chunks(
+    records: List[Dict[str, Any]], batch_size: Optional[int]
+) -> Iterator[List[Dict[str, Any]]]:
+    """Splitting records into lists of at most batch_size items."""
+    if not batch_size or batch_size >= len(records):
+        if records:
+            yield records
+        return
+    for start in range(0, len(records), batch_size):
+        yield records[start:start + batch_size]
+
+
+def integrate_word_data(
+    result: DataFrame, batch_size: Optional[int] = None
+) -> Dict[str, int]:
     """Inserting or updating words data in arango word collection.
 
     Args:
         result: Dataframe of counted words.
+        batch_size: Number of words in each UPSERT query. ``None`` sends all
+            words in one query.
+
+    Returns:
+        Number of rows written, round trips used and rows dropped.
+
+    Raises:
+        WriteDroppedError: If any chunk failed after retries.
     """
     # ------------------ Initialization & Connecting to database ------------------
     vertex_col_name = os.getenv("WORD_COLLECTION")
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
-    client = arango_connection()
-    phrase_db = client.db(database, username=username, password=password)
+    phrase_db = get_database()
 
     # Converting results to JSON records
-    result = result.to_dict(orient="records")
-
-    # UPSERT every item in result set.
-    for item in result:
-        try_counter = 1
-        while True:
-            try:
-                upsert_query = """
-                UPSERT {"_key": @word_hash}
-                    INSERT {"_key": @word_hash, "word": @word,"count": @count,
-                    "status": @status, "object_id": @obj_id}
-                    UPDATE {"count": OLD.count + @count}
-                IN @@word_collection
-                """
-                binds = {
-                    "@word_collection": vertex_col_name,
-                    "word_hash": item["word_hash"],
-                    "word": item["word"],
-                    "count": item["count"],
-                    "status": item["status"],
-                    "obj_id": str(ObjectId())
-                }
-                phrase_db.aql.execute(
-                    query=upsert_query,
-                    cache=False,
-                    bind_vars=binds
-                )
-                break
-            except AQLQueryExecuteError as err:
-                logger.warning(
-                    "AQL exception for word %s. Retrying (%d).",
-                    item["word_hash"],
-                    try_counter,
-                )
-
-                try_counter += 1
-                if try_counter >= 10:
-                    break
-
-    client.close()
-
-
-def integrate_word_edge_data(result: DataFrame) -> None:
+    records = [
+        {
+            "_key": item["word_hash"],
+            "word": item["word"],
+            "count": item["count"],
+            "status": item["status"],
+            "object_id": str(ObjectId()),
+        }
+        for item in result.to_dict(orient="records")
+    ]
+
+    return _upsert_batches(
+        phrase_db,
+        "word-upsert",
+        BATCH_UPSERT_QUERY,
+        vertex_col_name,
+        records,
+        batch_size,
+    )
+
+
+def integrate_word_edge_data(
+    result: DataFrame, batch_size: Optional[int] = None
+) -> Dict[str, int]:
     """Inserting or updating words relation data in arango collection.
 
     Args:
-        result: Dataframe of generated edges.
+        result: Dataframe of generated edges, see ``build_edge_frame``.
+        batch_size: Number of edges in each UPSERT query. ``None`` sends all
+            edges in one query.
+
+    Returns:
+        Number of rows written, round trips used and rows dropped.
+
+    Raises:
+        WriteDroppedError: If any chunk failed after retries.
     """
     # ------------------ Initialization & Connecting to database ------------------
-    vertex_col_name = os.getenv("WORD_EDGE_COLLECTION")
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
-    client = arango_connection()
-    phrase_db = client.db(database, username=username, password=password)
+    edge_col_name = os.getenv("WORD_EDGE_COLLECTION")
+    phrase_db = get_database()
 
     # Converting results to JSON records
-    result = result.to_dict(orient="records")
-
-    # UPSERT every item in result set.
-    for item in result:
-        try_counter = 1
-        while True:
-            try:
-                upsert_query = """
-                UPSERT {"_key": @edge_key}
-                    INSERT {"_key": @edge_key, "_from": @_from, "_to": @_to,
-                    "count": @count, "object_id": @obj_id}
-                    UPDATE {"count": OLD.count + @count}
-                IN @@word_edge_col
-                """
-                binds = {
-                    "@word_edge_col": vertex_col_name,
-                    "edge_key": item["_key"],
-                    "_from": item["_from"],
-                    "_to": item["_to"],
-                    "count": item["count"],
-                    "obj_id": str(ObjectId())
-                }
-                phrase_db.aql.execute(
-                    query=upsert_query,
-                    cache=False,
-                    bind_vars=binds
-                )
-                break
-            except AQLQueryExecuteError as err:
-                logger.warning(
-                    "AQL exception for relation %s. Retrying (%d).",
-                    item["_key"],
-                    try_counter,
-                    exc_info=err)
-
-                try_counter += 1
-                if try_counter >= 2:
-                    break
-
-    client.close()
+    records = result[["_key", "_from", "_to", "count"]].to_dict(orient="records")
+    for item in records:
+        item["object_id"] = str(ObjectId())
+
+    return _upsert_batches(
+        phrase_db,
+        "word-edge-upsert",
+        EDGE_UPSERT_QUERY,
+        edge_col_name,
+        records,
+        batch_size,
+    )
 
 
 def update_status(phrase: str, status: str) -> None:
     """Updates the status of given phrase.
 
+    The phrase is updated by key in a single statement.
+
     Args:
         phrase: Given keyword for status update.
         status: stop or highlight.
@@ -206,87 +347,185 @@ def update_status(phrase: str, status: str) -> None:
     Raises:
         HTTPException: If no phrase is found in database.
     """
-    # ------------------ Connecting to collection ------------------
-    vertex_col_name = os.getenv("PHRASE_COLLECTION")
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
-    client = arango_connection()
-    phrase_db = client.db(database, username=username, password=password)
-    collection = phrase_db.collection(vertex_col_name)  # Getting collection
-
-    # ----------------- Finding & Updating Phrase Status -----------------
-    phrase_hash = sha256(phrase.encode()).hexdigest()  # Hashing the phrase
-    find_query = {"_key": phrase_hash}  # checking that phrase exists
-    find_res = list(collection.find(find_query))
-    # Update status if phrase exists
-    if find_res:
-        collection.update_match(find_query, {"status": status})
-
-    # If there is not any record then raise exception
-    else:
+    if not update_statuses([(phrase, status)])[0]:
         raise HTTPException(status_code=404, detail="no-phrase")
 
 
-def fetch_data(
-    status: Union[str, None], limit: int, offset: int
-) -> List[Dict[str, str]]:
-    """Fetching data from arango."""
-    # ----------------- Client Initialization ----------------
+def update_statuses(updates: List[Tuple[str, str]]) -> List[bool]:
+    """Updating statuses of many phrases in one AQL statement.
+
+    Phrases are hashed in one pass and updated by key. Phrases missing from
+    the collection are skipped instead of failing the statement. The fetch
+    cache of this worker is cleared, other workers serve the new statuses
+    once their cached pages expire.
+
+    Args:
+        updates: (phrase, status) pairs. For repeated phrases the last status
+            is applied.
+
+    Returns:
+        Whether each phrase was found, in the order of ``updates``.
+    """
     vertex_col_name = os.getenv("PHRASE_COLLECTION")
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
-    client = arango_connection()
-    phrase_db = client.db(database, username=username, password=password)
+    phrase_db = get_database()
+
+    keys = phrase_keys(phrase for phrase, _ in updates)
+    statuses = dict(zip(keys, (status for _, status in updates)))
+
+    found = set(
+        phrase_db.aql.execute(
+            query=STATUS_UPDATE_QUERY,
+            bind_vars={
+                "@phrase_col": vertex_col_name,
+                "updates": [
+                    {"_key": key, "status": status} for key, status in statuses.items()
+                ],
+            },
+        )
+    )
+    if found:
+        FETCH_CACHE.clear()
+
+    return [key in found for key in keys]
+
+
+def encode_cursor(phrase: Dict[str, Any]) -> str:
+    """Opaque cursor pointing after the given phrase."""
+    position = json.dumps([phrase["count"], phrase["_key"]]).encode()
+    return urlsafe_b64encode(position).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """Reading count & key from a cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        count, key = json.loads(urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as err:
+        raise ValueError("Invalid cursor.") from err
+    if not isinstance(count, int) or not isinstance(key, str):
+        raise ValueError("Invalid cursor.")
+    return count, key
 
+
+def build_status_filter(status: Union[str, None], bind_vars: Dict[str, Any]) -> str:
+    """AQL filter of the given status filter option on ``phrase`` variable.
+
+    Raises:
+        ValueError: If status is unknown.
+    """
+    if status is None:  # Fetching all records
+        return ""
+    if status == "has_status":  # Fetching records that status IS NOT NULL
+        return "FILTER phrase.status != null"
+    if status == "no_status":  # Fetching records that status IS NULL
+        return "FILTER phrase.status == null"
+    if status in ["highlight", "stop", "suggested-stop"]:
+        bind_vars["status"] = status
+        return "FILTER phrase.status == @status"
+    raise ValueError(f"Unknown status: {status}")
+
+
+def build_fetch_query(
+    status: Union[str, None],
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """Building the AQL query of a ``fetch_data`` page.
+
+    Args:
+        status: Status filter option.
+        limit: Number of phrases.
+        offset: Number of phrases to skip. Ignored if cursor is given.
+        cursor: Cursor from ``encode_cursor``.
+
+    Returns:
+        Query & its bind variables.
+
+    Raises:
+        ValueError: If status or cursor is invalid.
+    """
     # Setting binding parameters
-    bind_vars = {
-        "@phrase_col": vertex_col_name,
-        "offset": offset,
+    bind_vars: Dict[str, Any] = {
+        "@phrase_col": os.getenv("PHRASE_COLLECTION"),
         "limit_val": limit,
     }
+    status_filter = build_status_filter(status, bind_vars)
 
     # --------------------- Defining Query Based On Given Status ---------------------
-    if status is None:  # Fetching all records
-        query = """
+    if cursor is None:
+        bind_vars["offset"] = offset
+        query = f"""
         FOR phrase IN @@phrase_col
-            SORT phrase.count DESC
+            {status_filter}
+            SORT phrase.count DESC, phrase._key DESC
             LIMIT @offset, @limit_val
             RETURN phrase
         """
-
-    elif status == "has_status":  # Fetching records that status IS NOT NULL
-        query = """
-        FOR phrase IN @@phrase_col
-            FILTER phrase.status != null
-            SORT phrase.count DESC
-            LIMIT @offset, @limit_val
+    else:
+        bind_vars["count"], bind_vars["key"] = decode_cursor(cursor)
+        # Phrases with the same count after the cursor key, then lower counts
+        query = f"""
+        LET same_count = (
+            FOR phrase IN @@phrase_col
+                FILTER phrase.count == @count AND phrase._key < @key
+                {status_filter}
+                SORT phrase.count DESC, phrase._key DESC
+                LIMIT @limit_val
+                RETURN phrase
+        )
+        LET lower_count = (
+            FOR phrase IN @@phrase_col
+                FILTER phrase.count < @count
+                {status_filter}
+                SORT phrase.count DESC, phrase._key DESC
+                LIMIT @limit_val
+                RETURN phrase
+        )
+        FOR phrase IN SLICE(APPEND(same_count, lower_count), 0, @limit_val)
             RETURN phrase
         """
 
-    elif status == "no_status":  # Fetching records that status IS NULL
-        query = """
-        FOR phrase IN @@phrase_col
-            FILTER phrase.status == null
-            SORT phrase.count DESC
-            LIMIT @offset, @limit_val
-            RETURN phrase
-        """
+    return query, bind_vars
 
-    elif status in ["highlight", "stop", "suggested-stop"]:
-        query = """
-        FOR phrase IN @@phrase_col
-            FILTER phrase.status == @status
-            SORT phrase.count DESC
-            LIMIT @offset, @limit_val
-            RETURN phrase
-        """
 
-        # Adding status to bind_vars
-        bind_vars["status"] = status
+def fetch_data(
+    status: Union[str, None],
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> List[Dict[str, str]]:
+    """Fetching data from arango.
 
-    # Gettting results
-    result = list(phrase_db.aql.execute(query=query, bind_vars=bind_vars))
+    Phrases are sorted by count and then key, both descending. With a cursor
+    the page starts right after the phrase the cursor points to and is read
+    from the count index, so it costs the same at any depth. Without a
+    cursor ``offset`` phrases are skipped.
+
+    Pages are served from ``FETCH_CACHE`` for up to ``FETCH_CACHE_TTL``
+    seconds, so changes made through other workers show up within the ttl.
+
+    Args:
+        status: Status filter option.
+        limit: Number of phrases.
+        offset: Number of phrases to skip. Ignored if cursor is given.
+        cursor: Cursor from ``encode_cursor``.
+
+    Returns:
+        Phrases of the page.
 
-    return result
+    Raises:
+        ValueError: If status or cursor is invalid.
+    """
+    query, bind_vars = build_fetch_query(status, limit, offset=offset, cursor=cursor)
+
+    def load() -> List[Dict[str, str]]:
+        phrase_db = get_database()
+        return list(phrase_db.aql.execute(query=query, bind_vars=bind_vars))
+
+    # Gettting results
+    cache_key = (bind_vars["@phrase_col"], status, limit, offset, cursor)
+    return FETCH_CACHE.get_or_load(cache_key, load)
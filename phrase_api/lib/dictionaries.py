@@ -0,0 +1,305 @@
+"""Process-wide registry of NE, stop word and frequent phrase dictionaries."""
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+import fcntl
+import mmap
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+from hashlib import sha256
+from pathlib import Path
+from time import time
+
+from phrase_api.lib.connection import get_database
+from phrase_api.lib.frequent_remover import get_frequents
+from phrase_api.lib.matcher import PhraseRemover, WordMatcher
+from phrase_api.lib.status_updater import get_named_entities, get_stop_words
+from phrase_api.logger import LoggerSetup
+
+logger = LoggerSetup(__name__, "info").get_minimal()
+
+
+def dictionary_collections() -> Dict[str, str]:
+    """Collections backing every dictionary."""
+    return {
+        "named_entities": "ner",
+        "stop_words": "stop_word",
+        "frequent_ne": os.getenv("REPEATED_NE_COLLECTION"),
+        "frequent_stops": os.getenv("REPEATED_STOPS_COLLECTION"),
+    }
+
+
+def collection_revisions() -> Dict[str, str]:
+    """Current revision of every dictionary collection.
+
+    The revision changes on every write, so equal revisions mean the
+    dictionaries do not need to be fetched again.
+    """
+    phrase_db = get_database()
+    return {
+        name: phrase_db.collection(collection).revision()
+        for name, collection in dictionary_collections().items()
+    }
+
+
+def checksum(words: Optional[Iterable[str]]) -> str:
+    """Order independent checksum of a dictionary."""
+    digest = sha256()
+    for word in sorted(set(words or ())):
+        digest.update(word.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class DictionarySnapshot:
+    """Immutable set of loaded dictionaries and their compiled matchers.
+
+    Args:
+        ne_set: Named entities.
+        stop_matcher: Matcher for stop words.
+        freq_ne: Remover of frequent NE phrases.
+        freq_stops: Remover of frequent stop phrases.
+        versions: Checksum of every dictionary.
+        revisions: Revision of every dictionary collection when loaded.
+    """
+
+    def __init__(
+        self,
+        ne_set: FrozenSet[str],
+        stop_matcher: WordMatcher,
+        freq_ne: Optional[PhraseRemover],
+        freq_stops: Optional[PhraseRemover],
+        versions: Dict[str, str],
+        revisions: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.ne_set = ne_set
+        self.stop_matcher = stop_matcher
+        self.freq_ne = freq_ne
+        self.freq_stops = freq_stops
+        self.versions = versions
+        self.revisions = revisions or {}
+        self.version = checksum(f"{name}:{versions[name]}" for name in versions)
+        self.loaded_at = time()
+
+    def pipeline_args(self) -> tuple:
+        """Arguments of ``doc_pipeline.init_pipeline``."""
+        return (self.stop_matcher, self.ne_set, self.freq_ne, self.freq_stops)
+
+
+class SnapshotStore:
+    """Compiled dictionary snapshots on local disk, keyed by revisions.
+
+    Workers and CLI processes of one host share the directory. The first
+    process that misses a revision builds the snapshot while holding a file
+    lock and the others wait and read it, so ArangoDB is scanned once per
+    revision change instead of once per process.
+
+    Args:
+        directory: Snapshot directory, created if missing.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, revisions: Dict[str, str]) -> Path:
+        """Snapshot file of given revisions."""
+        key = checksum(f"{name}:{revisions[name]}" for name in revisions)
+        return self.directory / f"dictionaries-{key[:24]}.pickle"
+
+    @contextmanager
+    def lock(self):
+        """Exclusive lock between processes sharing the directory."""
+        with open(self.directory / "dictionaries.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self, revisions: Dict[str, str]) -> Optional[DictionarySnapshot]:
+        """Reading snapshot of given revisions if it exists.
+
+        The file is memory-mapped and unpickled straight from the mapping.
+        """
+        path = self.path(revisions)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as snapshot_file, mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                snapshot = pickle.loads(mapped)
+        except Exception as err:
+            logger.warning("Ignoring unreadable snapshot %s.", path, exc_info=err)
+            return None
+        snapshot.loaded_at = time()
+        return snapshot
+
+    def write(self, snapshot: DictionarySnapshot) -> None:
+        """Writing snapshot atomically and removing older ones."""
+        path = self.path(snapshot.revisions)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as snapshot_file:
+            pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        for old_path in self.directory.glob("dictionaries-*.pickle"):
+            if old_path != path:
+                old_path.unlink(missing_ok=True)
+
+
+class DictionaryRegistry:
+    """Loads dictionaries once per process and swaps in refreshed versions.
+
+    Readers always get a complete snapshot through ``get``. ``reload``
+    builds the new snapshot aside, recompiling only dictionaries whose
+    checksum changed, and replaces the reference in one assignment.
+
+    Args:
+        ttl: Seconds between background refreshes. 0 disables them.
+        snapshot_dir: Directory of on-disk snapshots. None disables them.
+    """
+
+    def __init__(self, ttl: int = 0, snapshot_dir: Optional[str] = None) -> None:
+        self.ttl = ttl
+        self.store = SnapshotStore(snapshot_dir) if snapshot_dir else None
+        self._snapshot: Optional[DictionarySnapshot] = None
+        self._reload_lock = threading.Lock()
+        self._listeners: List[Callable[[DictionarySnapshot], None]] = []
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self) -> DictionarySnapshot:
+        """Current snapshot, loading it on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.reload()
+            snapshot = self._snapshot
+        return snapshot  # type: ignore
+
+    def subscribe(self, listener: Callable[[DictionarySnapshot], None]) -> None:
+        """Registering a callback run after a new snapshot is swapped in."""
+        self._listeners.append(listener)
+
+    def reload(self, force: bool = False) -> bool:
+        """Reloading dictionaries whose collections changed.
+
+        Args:
+            force: Fetching dictionaries from database even if collection
+                revisions did not change.
+
+        Returns:
+            True if any dictionary changed.
+        """
+        with self._reload_lock:
+            current = self._snapshot
+            s_load = time()
+            revisions = collection_revisions()
+            if not force and current is not None and current.revisions == revisions:
+                return False
+
+            if self.store is None:
+                snapshot = self._fetch(current, revisions)
+            else:
+                with self.store.lock():
+                    snapshot = None if force else self.store.read(revisions)
+                    source = "snapshot"
+                    if snapshot is None:
+                        snapshot = self._fetch(current, revisions)
+                        self.store.write(snapshot)
+                        source = "database"
+                logger.info("Dictionaries read from %s.", source)
+
+            self._snapshot = snapshot
+            if current is not None and current.versions == snapshot.versions:
+                logger.info(
+                    "Dictionaries unchanged (version %s).", current.version[:12]
+                )
+                return False
+
+        logger.info(
+            "Loaded dictionaries version %s in %.1f ms.",
+            snapshot.version[:12],
+            (time() - s_load) * 1000,
+        )
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as err:
+                logger.error("Dictionary listener failed.", exc_info=err)
+        return True
+
+    @staticmethod
+    def _fetch(
+        current: Optional[DictionarySnapshot], revisions: Dict[str, str]
+    ) -> DictionarySnapshot:
+        """Fetching dictionaries from database and compiling changed ones."""
+        named_entities = get_named_entities()
+        stop_words = get_stop_words()
+        frequent_ne = get_frequents("ne")
+        frequent_stops = get_frequents("stop")
+
+        versions = {
+            "named_entities": checksum(named_entities),
+            "stop_words": checksum(stop_words),
+            "frequent_ne": checksum(frequent_ne),
+            "frequent_stops": checksum(frequent_stops),
+        }
+
+        def unchanged(name: str) -> bool:
+            return current is not None and current.versions[name] == versions[name]
+
+        return DictionarySnapshot(
+            ne_set=current.ne_set if unchanged("named_entities") else named_entities,
+            stop_matcher=(
+                current.stop_matcher if unchanged("stop_words")
+                else WordMatcher(stop_words)
+            ),
+            freq_ne=(
+                current.freq_ne if unchanged("frequent_ne")
+                else PhraseRemover(frequent_ne) if frequent_ne else None
+            ),
+            freq_stops=(
+                current.freq_stops if unchanged("frequent_stops")
+                else PhraseRemover(frequent_stops) if frequent_stops else None
+            ),
+            versions=versions,
+            revisions=revisions,
+        )
+
+    def _refresh_loop(self) -> None:
+        """Reloading dictionaries every ``ttl`` seconds until stopped."""
+        while not self._stop_event.wait(self.ttl):
+            try:
+                self.reload()
+            except Exception as err:
+                logger.error("Failed refreshing dictionaries.", exc_info=err)
+
+    def start(self) -> None:
+        """Starting background refresh if a ttl is configured."""
+        if self.ttl <= 0 or self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._refresh_loop, name="dictionary-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stopping background refresh."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+REGISTRY = DictionaryRegistry(
+    ttl=int(os.getenv("DICTIONARY_TTL") or 0),
+    snapshot_dir=os.getenv("DICTIONARY_SNAPSHOT_DIR") or None,
+)
+
+
+def get_dictionaries() -> DictionarySnapshot:
+    """Dictionaries of the current process."""
+    return REGISTRY.get()
@@ -0,0 +1,171 @@
+"""CPU-bound document stages, runnable inside worker processes."""
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence
+
+import os
+import re
+
+import pandas as pd
+from pandas import DataFrame
+from phrase_counter.cleaner import cleaner, fetch_page_text
+from sklearn.feature_extraction.text import CountVectorizer
+
+from phrase_api.lib.keys import phrase_keys
+from phrase_api.lib.matcher import PhraseRemover
+from phrase_api.lib.status_updater import StopMatcher, detect_statuses
+
+# Dictionaries of the current process, set by ``init_pipeline``.
+_DICTIONARIES: Dict[str, Any] = {}
+
+
+def init_pipeline(
+    stop_matcher: StopMatcher,
+    ne_set: FrozenSet[str],
+    freq_ne: Optional[PhraseRemover],
+    freq_stops: Optional[PhraseRemover],
+) -> None:
+    """Setting dictionaries used by ``count_phrases`` in this process.
+
+    Args:
+        stop_matcher: Matcher for stop words.
+        ne_set: Named entities.
+        freq_ne: Remover of frequent NE phrases.
+        freq_stops: Remover of frequent stop phrases.
+    """
+    _DICTIONARIES.update(
+        stop_matcher=stop_matcher,
+        ne_set=ne_set,
+        freq_ne=freq_ne,
+        freq_stops=freq_stops,
+    )
+
+
+def ingest_document(
+    doc: str,
+    doc_type: str = "TEXT",
+    ngram_range: Sequence[int] = (1, 5),
+    removers: Sequence[Optional[PhraseRemover]] = (),
+    removal_priority: str = "length",
+) -> DataFrame:
+    """Counting phrases in the document.
+
+    Same as ``phrase_counter.ingest.ingest_doc`` except that frequent phrases
+    are removed with phrase tries instead of per-length regexes, which take
+    phrases with punctuation literally (see ``PhraseRemover``).
+
+    Args:
+        doc: Document to be processed.
+        doc_type: URL, TEXT, or HTML.
+        ngram_range: Determining bag of words length.
+        removers: Frequent phrase removers, applied in order.
+        removal_priority: ``length`` for removing longer phrases first over
+            the whole text, like ``ingest_doc``, or ``longest`` for a single
+            longest-match pass. ``longest`` is faster but can change counts.
+
+    Returns:
+        Dataframe with counts for each phrase.
+
+    Raises:
+        Exception: If unkown value is given for doc_type.
+    """
+    # ---------------- Fetching the page text ----------------
+    if doc_type == "URL":
+        dirty_text = fetch_page_text(url=doc)
+    elif doc_type == "HTML":
+        dirty_text = fetch_page_text(webpage=doc)
+    elif doc_type == "TEXT":
+        dirty_text = doc
+    else:
+        raise Exception("Unknown value for doc_type argument.")
+
+    cleaned_text = cleaner(dirty_text)
+
+    # --------------------- Remove frequents ---------------------
+    for remover in removers:
+        if remover:
+            cleaned_text = remover.remove(cleaned_text, priority=removal_priority)
+
+    cleaned_text = re.sub(" +", " ", cleaned_text).strip()  # space cleaner
+
+    bags_list = []
+    counts_list = []
+    # ----------------- Splitting -----------------
+    for text_part in cleaned_text.split("."):
+        count_vector = CountVectorizer(
+            ngram_range=(ngram_range[0], ngram_range[1]), encoding="utf-8"
+        )
+        try:
+            count_data = count_vector.fit_transform([text_part.strip()])
+        except ValueError:
+            continue
+        bags_list.extend(count_vector.get_feature_names_out().tolist())
+        counts_list.extend(count_data.toarray()[0].tolist())
+
+    # Concating results & aggregating duplicate bags
+    phrase_df = pd.DataFrame(zip(bags_list, counts_list), columns=["bag", "count"])
+    phrase_df = phrase_df.groupby(["bag"]).agg({"count": "sum"}).reset_index()
+
+    # Creating phrase hash & counting number of words in each bag
+    phrase_df["_key"] = phrase_keys(phrase_df["bag"])
+    phrase_df["length"] = [len(str(bag).split()) for bag in phrase_df["bag"]]
+
+    return phrase_df
+
+
+def count_phrases(document: str, doc_type: str, ngram_range: List[int]) -> DataFrame:
+    """Counting phrases of the document and detecting their statuses.
+
+    Args:
+        document: Document content.
+        doc_type: TEXT, HTML or URL.
+        ngram_range: Minimum and maximum bag length.
+
+    ``PHRASE_REMOVAL_PRIORITY`` (``length`` or ``longest``, default
+    ``length``) selects how frequent phrases are removed.
+
+    Returns:
+        Dataframe of counted phrases with status column.
+    """
+    phrase_count_res = ingest_document(
+        doc=document,
+        doc_type=doc_type,
+        ngram_range=ngram_range,
+        removers=[_DICTIONARIES["freq_stops"], _DICTIONARIES["freq_ne"]],
+        removal_priority=os.getenv("PHRASE_REMOVAL_PRIORITY") or "length",
+    )
+
+    phrase_count_res["status"] = detect_statuses(
+        phrase_count_res["bag"], _DICTIONARIES["stop_matcher"], _DICTIONARIES["ne_set"]
+    )
+
+    return phrase_count_res
+
+
+def merge_phrase_counts(frames: Sequence[DataFrame]) -> DataFrame:
+    """Merging phrase counts of several documents.
+
+    Args:
+        frames: Results of ``count_phrases``.
+
+    Returns:
+        One row per phrase with counts summed over all documents.
+    """
+    merged = pd.concat(frames, ignore_index=True)
+    return merged.groupby("_key", as_index=False, sort=False).agg(
+        {"bag": "first", "count": "sum", "length": "first", "status": "first"}
+    )
+
+
+def build_edge_frame(rel_df: DataFrame, vertex_collection: str) -> DataFrame:
+    """Turning word relations into edge documents.
+
+    Args:
+        rel_df: ``_from``, ``_to`` word hashes & ``count`` of each relation.
+        vertex_collection: Name of the word collection.
+
+    Returns:
+        Relations with ``_key`` and ``_from`` & ``_to`` as document handles.
+    """
+    _from = rel_df["_from"].astype(str)
+    _to = rel_df["_to"].astype(str)
+    prefix = f"{vertex_collection}/"
+    return rel_df.assign(_key=_from + "_" + _to, _from=prefix + _from, _to=prefix + _to)
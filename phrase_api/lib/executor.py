@@ -0,0 +1,178 @@
+"""Bounded executors for running blocking work outside the event loop."""
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import asyncio
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+from phrase_api.logger import LoggerSetup
+
+logger = LoggerSetup(__name__, "info").get_minimal()
+
+
+class QueueSaturatedError(Exception):
+    """Raised when the executor already holds its maximum number of jobs."""
+
+
+class BoundedExecutor:
+    """CPU and IO pools with a bounded number of in-flight jobs.
+
+    CPU-bound work runs in a process pool (or in the thread pool when
+    ``cpu_workers`` is 0) and blocking IO, like database writes, runs in a
+    thread pool. Jobs are admitted through ``acquire`` which raises
+    ``QueueSaturatedError`` once ``max_pending`` jobs are in flight.
+
+    Args:
+        cpu_workers: Number of processes for CPU-bound work.
+        io_workers: Number of threads for blocking IO.
+        max_pending: Maximum number of admitted jobs.
+        initializer: Callable run once in every worker process.
+        initargs: Arguments of ``initializer``.
+    """
+
+    def __init__(
+        self,
+        cpu_workers: int,
+        io_workers: int,
+        max_pending: int,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: Tuple[Any, ...] = (),
+    ) -> None:
+        self.cpu_workers = cpu_workers
+        self.io_workers = io_workers
+        self.max_pending = max_pending
+        self.initializer = initializer
+        self.initargs = initargs
+        self.pending = 0
+        self._pool_lock = threading.Lock()
+        self._cpu_pool: Optional[Executor] = None
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_env(
+        cls,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: Tuple[Any, ...] = (),
+    ) -> "BoundedExecutor":
+        """Creating executor from environment variables.
+
+        ``DOC_PROCESS_WORKERS`` (processes, default 2), ``DB_WRITE_WORKERS``
+        (threads, default 4) and ``DOC_PROCESS_QUEUE_SIZE`` (in-flight jobs,
+        default 4 per process) are read.
+        """
+        cpu_workers = int(os.getenv("DOC_PROCESS_WORKERS") or 2)
+        io_workers = int(os.getenv("DB_WRITE_WORKERS") or 4)
+        max_pending = int(
+            os.getenv("DOC_PROCESS_QUEUE_SIZE") or max(cpu_workers, 1) * 4
+        )
+        return cls(
+            cpu_workers=cpu_workers,
+            io_workers=io_workers,
+            max_pending=max_pending,
+            initializer=initializer,
+            initargs=initargs,
+        )
+
+    def io_pool(self) -> ThreadPoolExecutor:
+        """Thread pool for blocking IO, created on first use."""
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(
+                max_workers=self.io_workers, thread_name_prefix="db-write"
+            )
+        return self._io_pool
+
+    def cpu_pool(self) -> Executor:
+        """Process pool for CPU-bound work, created on first use."""
+        with self._pool_lock:
+            if self._cpu_pool is None:
+                if self.cpu_workers > 0:
+                    self._cpu_pool = ProcessPoolExecutor(
+                        max_workers=self.cpu_workers,
+                        mp_context=mp.get_context("spawn"),
+                        initializer=self.initializer,
+                        initargs=self.initargs,
+                    )
+                else:
+                    if self.initializer is not None:
+                        self.initializer(*self.initargs)
+                    self._cpu_pool = self.io_pool()
+            return self._cpu_pool
+
+    def reinitialize(self, initargs: Tuple[Any, ...]) -> None:
+        """Replacing worker initializer arguments.
+
+        New jobs go to a fresh process pool, jobs already submitted finish
+        in the old one. Jobs submitted to the old pool after its shutdown
+        are retried in the new one by ``run_cpu``.
+
+        Args:
+            initargs: New arguments of ``initializer``.
+        """
+        with self._pool_lock:
+            self.initargs = initargs
+            old_pool, self._cpu_pool = self._cpu_pool, None
+        if old_pool is not None and old_pool is not self._io_pool:
+            old_pool.shutdown(wait=False)
+
+    def acquire(self, jobs: int = 1) -> None:
+        """Admitting jobs or raising if the queue is saturated.
+
+        Args:
+            jobs: Number of jobs admitted together, all or none.
+
+        Raises:
+            QueueSaturatedError: If fewer than ``jobs`` slots are free.
+        """
+        if self.pending + jobs > self.max_pending:
+            raise QueueSaturatedError(
+                f"{self.pending} jobs in flight (limit {self.max_pending})."
+            )
+        self.pending += jobs
+
+    def release(self, jobs: int = 1) -> None:
+        """Releasing admitted jobs."""
+        self.pending -= jobs
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Context manager around ``acquire`` and ``release``."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run_cpu(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Running CPU-bound function in the process pool."""
+        loop = asyncio.get_running_loop()
+        call = partial(func, *args, **kwargs)
+        pool = self.cpu_pool()
+        try:
+            future = loop.run_in_executor(pool, call)
+        except RuntimeError:
+            if pool is self._cpu_pool:
+                raise
+            # Pool was replaced by ``reinitialize`` before the job was submitted
+            future = loop.run_in_executor(self.cpu_pool(), call)
+        return await future
+
+    async def run_io(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Running blocking IO function in the thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.io_pool(), partial(func, *args, **kwargs)
+        )
+
+    def shutdown(self) -> None:
+        """Shutting down pools and waiting for running jobs."""
+        if self._cpu_pool is not None and self._cpu_pool is not self._io_pool:
+            self._cpu_pool.shutdown(wait=True)
+        if self._io_pool is not None:
+            self._io_pool.shutdown(wait=True)
+        self._cpu_pool = None
+        self._io_pool = None
+        logger.info("Executor pools shut down.")
@@ -0,0 +1,205 @@
+"""Streaming export of the phrase collection."""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import csv
+import io
+import json
+import os
+from itertools import islice
+
+from phrase_api.lib.connection import get_database
+from phrase_api.lib.db import build_status_filter
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+EXPORT_FIELDS = ("_key", "bag", "count", "status", "length")
+EXPORT_FORMATS = ("ndjson", "csv", "parquet")
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Seconds the server keeps the export cursor alive between batches
+CURSOR_TTL = 600
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Parsing a comma separated projection.
+
+    Args:
+        fields: e.g. ``bag,count,status``. Empty means all export fields.
+
+    Returns:
+        Field names.
+
+    Raises:
+        ValueError: If a field is not exportable.
+    """
+    if not fields:
+        return list(EXPORT_FIELDS)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = set(names) - set(EXPORT_FIELDS)
+    if unknown or not names:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return names
+
+
+def iter_phrase_batches(
+    status: Union[str, None], fields: List[str], batch_size: int = 10000
+) -> Iterator[List[Dict[str, Any]]]:
+    """Iterating phrases batch by batch through a streaming AQL cursor.
+
+    Args:
+        status: Status filter option, same as ``fetch_data``.
+        fields: Attributes kept of every phrase.
+        batch_size: Number of phrases fetched per round trip.
+
+    Yields:
+        Lists of projected phrases.
+    """
+    bind_vars: Dict[str, Any] = {
+        "@phrase_col": os.getenv("PHRASE_COLLECTION"),
+        "fields": fields,
+    }
+    status_filter = build_status_filter(status, bind_vars)
+    query = f"""
+    FOR phrase IN @@phrase_col
+        {status_filter}
+        RETURN KEEP(phrase, @fields)
+    """
+    cursor = get_database().aql.execute(
+        query,
+        bind_vars=bind_vars,
+        batch_size=batch_size,
+        stream=True,
+        ttl=CURSOR_TTL,
+    )
+    try:
+        while True:
+            batch = list(islice(cursor, batch_size))
+            if not batch:
+                break
+            yield batch
+    finally:
+        cursor.close(ignore_missing=True)
+
+
+def ndjson_stream(batches: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """Encoding batches as JSON lines."""
+    for batch in batches:
+        yield "".join(
+            json.dumps(row, ensure_ascii=False) + "\n" for row in batch
+        ).encode()
+
+
+def csv_stream(
+    batches: Iterable[List[Dict[str, Any]]], fields: List[str]
+) -> Iterator[bytes]:
+    """Encoding batches as CSV with a header row."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # Header of an empty export
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting bytes until they are taken."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        """Bytes written since the last call."""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_stream(
+    batches: Iterable[List[Dict[str, Any]]], fields: List[str]
+) -> Iterator[bytes]:
+    """Encoding batches as a Parquet file, one row group per batch."""
+    types = {
+        "_key": pa.string(),
+        "bag": pa.string(),
+        "count": pa.int64(),
+        "status": pa.string(),
+        "length": pa.int64(),
+    }
+    schema = pa.schema([(name, types[name]) for name in fields])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for batch in batches:
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        chunk = sink.take()
+        if chunk:
+            yield chunk
+    writer.close()
+    yield sink.take()
+
+
+def export_phrases(
+    status: Union[str, None],
+    export_format: str = "ndjson",
+    fields: Optional[List[str]] = None,
+    batch_size: int = 10000,
+) -> Iterator[bytes]:
+    """Streaming the phrase collection as NDJSON, CSV or Parquet.
+
+    Arguments are validated before the first phrase is fetched, memory is
+    bounded by ``batch_size`` regardless of collection size.
+
+    Args:
+        status: Status filter option, same as ``fetch_data``.
+        export_format: ``ndjson``, ``csv`` or ``parquet``.
+        fields: Attributes kept of every phrase. Defaults to all.
+        batch_size: Number of phrases fetched per round trip.
+
+    Returns:
+        Iterator over encoded chunks.
+
+    Raises:
+        ValueError: If the format or status is unknown, or Parquet is asked
+            without pyarrow installed.
+    """
+    fields = fields or list(EXPORT_FIELDS)
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if export_format == "parquet" and pa is None:
+        raise ValueError(
+            "Parquet export needs pyarrow, install the parquet extra "
+            "(pip install common_phrase_detection[parquet])."
+        )
+    build_status_filter(status, {})
+
+    batches = iter_phrase_batches(status, fields, batch_size=batch_size)
+    if export_format == "csv":
+        return csv_stream(batches, fields)
+    if export_format == "parquet":
+        return parquet_stream(batches, fields)
+    return ndjson_stream(batches)
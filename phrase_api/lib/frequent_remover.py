@@ -1,16 +1,14 @@
 import os
-from phrase_api.lib.db import arango_connection
+from phrase_api.lib.connection import get_database
+from phrase_api.lib.matcher import PhraseRemover
+from typing import Optional
 import re
 
 
 def get_frequents(type_freq):
     """Fetching named entities from database."""
     # ------------------ Arango Connection Config ------------------
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
-    arango_client = arango_connection()
-    phrase_db = arango_client.db(database, username=username, password=password)
+    phrase_db = get_database()
 
     if type_freq == "stop":
         collection = os.getenv("REPEATED_STOPS_COLLECTION")
@@ -31,18 +29,22 @@ def get_frequents(type_freq):
 
     phrases_list = [phrase["phrase"] for phrase in phrases]
 
-    arango_client.close()
-
     return phrases_list
 
 
 def freq_regex(type_freq):
     """Creating frequent stops and NE regexes"""
     # Fetching phrases
-    freq_phrases = {}
     phrases = get_frequents(type_freq=type_freq)
     if not phrases:
         return None
+
+    return build_freq_regexes(phrases)
+
+
+def build_freq_regexes(phrases):
+    """Creating one alternation regex per phrase length, longest first."""
+    freq_phrases = {}
     for phrase in phrases:
         length = len(phrase.split())
         if length not in freq_phrases:
@@ -60,3 +62,12 @@ def freq_regex(type_freq):
         )
 
     return freq_regexes
+
+
+def freq_remover(type_freq) -> Optional[PhraseRemover]:
+    """Creating frequent stops or NE phrase remover."""
+    phrases = get_frequents(type_freq=type_freq)
+    if not phrases:
+        return None
+
+    return PhraseRemover(phrases)
@@ -0,0 +1,14 @@
+"""Document keys of phrases."""
+from typing import Iterable, List
+
+from hashlib import sha256
+
+
+def phrase_key(phrase: str) -> str:
+    """Key of the phrase document, shared by ingestion & status updates."""
+    return sha256(phrase.encode()).hexdigest()
+
+
+def phrase_keys(phrases: Iterable[str]) -> List[str]:
+    """Keys of many phrases."""
+    return [sha256(phrase.encode()).hexdigest() for phrase in phrases]
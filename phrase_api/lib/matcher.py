@@ -0,0 +1,214 @@
+"""Word-boundary aware multi-pattern matching."""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import re
+
+# Maximal runs of word / non-word characters. Every ``\b`` position of a text
+# lies between two runs, so whole-word matches are sequences of whole runs.
+_RUNS = re.compile(r"\w+|\W+")
+_WORD_RUN = re.compile(r"\w")
+
+
+def _is_word_run(run: str) -> bool:
+    """Whether the run consists of word characters."""
+    return _WORD_RUN.match(run) is not None
+
+
+class WordMatcher:
+    """Aho-Corasick automaton over word / non-word runs.
+
+    Matches the same texts as ``re.compile(r"\\b(w1|w2|...)\\b").search`` with
+    every word taken literally, but in a single pass over the runs of the
+    text regardless of dictionary size.
+
+    Args:
+        words: Dictionary words or phrases. Empty strings are ignored.
+    """
+
+    def __init__(self, words: Iterable[str]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._size = 0
+
+        for word in set(words):
+            if word:
+                self._add(_RUNS.findall(word))
+        self._build_fail_links()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _add(self, runs: List[str]) -> None:
+        """Adding a pattern to the trie."""
+        node = 0
+        for run in runs:
+            next_node = self._goto[node].get(run)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][run] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = next_node
+        if not self._out[node]:
+            self._out[node] = (len(runs),)
+            self._size += 1
+
+    def _build_fail_links(self) -> None:
+        """Computing failure links and merged outputs breadth first."""
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for run, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and run not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(run, 0)
+                self._fail[child] = fail if fail != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def search(self, text: str) -> bool:
+        """Whether any dictionary word appears in text as a whole word.
+
+        Args:
+            text: Text to scan.
+
+        Returns:
+            True if there is a match.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        runs = _RUNS.findall(text)
+        last = len(runs) - 1
+        node = 0
+        for end, run in enumerate(runs):
+            while node and run not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(run, 0)
+            for length in out[node]:
+                start = end - length + 1
+                # Text edges are boundaries only next to word characters
+                if (start > 0 or _is_word_run(runs[start])) and (
+                    end < last or _is_word_run(run)
+                ):
+                    return True
+        return False
+
+    def search_many(self, texts: Iterable[str]) -> List[bool]:
+        """Scanning many texts with the same automaton.
+
+        Args:
+            texts: Texts to scan.
+
+        Returns:
+            Match flag for every text.
+        """
+        search = self.search
+        return [search(text) for text in texts]
+
+
+class PhraseRemover:
+    """Trie of phrases removed from texts with a longest-match scan.
+
+    Phrases are matched as whole words, like ``\\b(p1|p2|...)\\b``, and the
+    matched runs are dropped from the text in one pass.
+
+    Unlike the per-length regexes of ``build_freq_regexes``, phrases are
+    taken literally, as if escaped, and the longest phrase matching at a
+    position is removed instead of the first listed one. Both only differ
+    for phrases with punctuation: with ``a b`` and ``a b-c``, ``x a b-c y``
+    becomes ``x  y`` instead of ``x -c y``.
+
+    Args:
+        phrases: Phrases to remove. Blank strings are ignored.
+    """
+
+    def __init__(self, phrases: Iterable[str]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._length: List[int] = [0]
+
+        for phrase in set(phrases):
+            if phrase.strip():
+                self._add(phrase)
+
+        # Phrase lengths (in words), longest first
+        self.lengths = sorted(
+            {length for length in self._length if length}, reverse=True
+        )
+
+    def __len__(self) -> int:
+        return sum(1 for length in self._length if length)
+
+    def _add(self, phrase: str) -> None:
+        """Adding a phrase to the trie."""
+        node = 0
+        for run in _RUNS.findall(phrase):
+            next_node = self._goto[node].get(run)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][run] = next_node
+                self._goto.append({})
+                self._length.append(0)
+            node = next_node
+        self._length[node] = len(phrase.split())
+
+    def remove(self, text: str, priority: str = "longest") -> str:
+        """Removing phrases from text.
+
+        Args:
+            text: Text to clean.
+            priority: ``longest`` removes the longest phrase starting at each
+                position in a single pass. ``length`` runs one pass per phrase
+                length, longest first, like a cascade of per-length regexes.
+
+        Returns:
+            Text without the phrases. Surrounding whitespace is kept.
+
+        Raises:
+            ValueError: If unknown priority is given.
+        """
+        if priority == "longest":
+            return self._remove_pass(text)
+        if priority == "length":
+            for length in self.lengths:
+                text = self._remove_pass(text, length)
+            return text
+        raise ValueError(f"Unknown priority: {priority}")
+
+    def _remove_pass(self, text: str, length: Optional[int] = None) -> str:
+        """Single left to right pass removing longest matches.
+
+        Args:
+            text: Text to clean.
+            length: Only remove phrases with this number of words.
+
+        Returns:
+            Cleaned text.
+        """
+        goto, lengths = self._goto, self._length
+        runs = _RUNS.findall(text)
+        last = len(runs) - 1
+        kept = []
+        start = 0
+        while start <= last:
+            match_end = -1
+            # Text start is a boundary only before a word character
+            if start > 0 or _is_word_run(runs[start]):
+                node = 0
+                for end in range(start, last + 1):
+                    node = goto[node].get(runs[end], 0)
+                    if not node:
+                        break
+                    phrase_length = lengths[node]
+                    if (
+                        phrase_length
+                        and (length is None or phrase_length == length)
+                        and (end < last or _is_word_run(runs[end]))
+                    ):
+                        match_end = end
+            if match_end >= 0:
+                start = match_end + 1
+            else:
+                kept.append(runs[start])
+                start += 1
+        return "".join(kept)
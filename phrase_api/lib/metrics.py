@@ -0,0 +1,36 @@
+"""Prometheus metrics."""
+import os
+
+from prometheus_client import CollectorRegistry, Counter, make_asgi_app, multiprocess
+
+# ------------------------------ Database writes ------------------------------
+DB_WRITE_RETRIES = Counter(
+    "db_write_retries_total",
+    "Database writes retried after a transient error.",
+    ["operation", "reason"],
+)
+DB_WRITE_DROPPED_ROWS = Counter(
+    "db_write_dropped_rows_total",
+    "Rows that finally failed and were sent to the dead-letter sink.",
+    ["operation"],
+)
+
+# ------------------------------ Response caches ------------------------------
+CACHE_REQUESTS = Counter(
+    "response_cache_requests_total",
+    "Response cache lookups by result (hit or miss).",
+    ["cache", "result"],
+)
+
+
+def metrics_app():
+    """ASGI app serving metrics of this process or of all workers.
+
+    With several uvicorn workers ``PROMETHEUS_MULTIPROC_DIR`` must point to a
+    shared empty directory so metrics of all workers are collected.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return make_asgi_app(registry)
+    return make_asgi_app()
@@ -0,0 +1,234 @@
+"""Retry policy and dead-letter sink for database writes."""
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+
+import json
+import os
+import random
+import threading
+from datetime import datetime
+from time import sleep
+
+from arango.exceptions import ArangoServerError
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout
+
+from phrase_api.lib.metrics import DB_WRITE_DROPPED_ROWS, DB_WRITE_RETRIES
+from phrase_api.logger import LoggerSetup
+
+logger = LoggerSetup(__name__, "info").get_minimal()
+
+T = TypeVar("T")
+
+# ArangoDB error codes worth retrying: write-write conflict & lock timeout
+RETRYABLE_ERROR_CODES = {1200: "conflict", 18: "lock-timeout"}
+RETRYABLE_HTTP_CODES = {429, 502, 503, 504}
+
+
+def retry_reason(err: Exception) -> Optional[str]:
+    """Classifying an error as transient or fatal.
+
+    Args:
+        err: Raised exception.
+
+    Returns:
+        Reason label if the error is transient, None if it is fatal.
+    """
+    if isinstance(err, ArangoServerError):
+        if err.error_code in RETRYABLE_ERROR_CODES:
+            return RETRYABLE_ERROR_CODES[err.error_code]
+        if err.http_code in RETRYABLE_HTTP_CODES:
+            return "unavailable"
+        return None
+    if isinstance(err, (RequestsConnectionError, Timeout)):
+        return "connection"
+    return None
+
+
+class WriteDroppedError(Exception):
+    """Rows of a write that still failed after retries.
+
+    Args:
+        operation: Name of the write.
+        rows: Rows that were not written.
+        stats: Rows written, round trips used and rows dropped.
+    """
+
+    def __init__(
+        self, operation: str, rows: List[Dict[str, Any]], stats: Dict[str, int]
+    ) -> None:
+        super().__init__(f"{operation} failed for {len(rows)} rows.")
+        self.operation = operation
+        self.rows = rows
+        self.stats = stats
+
+
+class RetryBudget:
+    """Number of retries shared by all writes of one batch.
+
+    Args:
+        retries: Number of retries allowed.
+    """
+
+    def __init__(self, retries: int) -> None:
+        self.remaining = retries
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        """Using one retry if any is left."""
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter.
+
+    Args:
+        max_attempts: Attempts of a single write, including the first one.
+        base_delay: Seconds of the first backoff.
+        max_delay: Upper bound of any backoff in seconds.
+        budget_ratio: Retries allowed per written row of a batch.
+        min_budget: Retries allowed for any batch regardless of its size.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 8,
+        base_delay: float = 0.05,
+        max_delay: float = 2.0,
+        budget_ratio: float = 0.2,
+        min_budget: int = 10,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.min_budget = min_budget
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Creating policy from ``RETRY_MAX_ATTEMPTS``, ``RETRY_BASE_DELAY``,
+        ``RETRY_MAX_DELAY`` and ``RETRY_BUDGET_RATIO``."""
+        return cls(
+            max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS") or 8),
+            base_delay=float(os.getenv("RETRY_BASE_DELAY") or 0.05),
+            max_delay=float(os.getenv("RETRY_MAX_DELAY") or 2.0),
+            budget_ratio=float(os.getenv("RETRY_BUDGET_RATIO") or 0.2),
+        )
+
+    def delay(self, attempt: int) -> float:
+        """Backoff in seconds before the given retry (0 based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def budget(self, rows: int) -> RetryBudget:
+        """Retry budget of a batch with given number of rows."""
+        return RetryBudget(max(self.min_budget, int(rows * self.budget_ratio)))
+
+
+DEFAULT_POLICY = RetryPolicy.from_env()
+
+
+def execute_with_retry(
+    operation: str,
+    func: Callable[[], T],
+    budget: Optional[RetryBudget] = None,
+    policy: Optional[RetryPolicy] = None,
+) -> T:
+    """Running a write, retrying transient errors with backoff.
+
+    Args:
+        operation: Name of the write, used in logs and metrics.
+        func: Write to run.
+        budget: Retry budget shared with other writes of the batch.
+        policy: Retry policy. Defaults to the one read from environment.
+
+    Returns:
+        Result of ``func``.
+
+    Raises:
+        Exception: The last error if it is fatal or retries are exhausted.
+    """
+    policy = policy or DEFAULT_POLICY
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as err:
+            reason = retry_reason(err)
+            if (
+                reason is None
+                or attempt + 1 >= policy.max_attempts
+                or (budget is not None and not budget.take())
+            ):
+                raise
+            DB_WRITE_RETRIES.labels(operation, reason).inc()
+            delay = policy.delay(attempt)
+            logger.warning(
+                "%s failed (%s). Retrying in %.3f s (%d).",
+                operation,
+                reason,
+                delay,
+                attempt + 1,
+            )
+            sleep(delay)
+            attempt += 1
+
+
+class DeadLetterSink:
+    """Appending rows that finally failed to a JSON lines file.
+
+    Args:
+        path: File path. Parent directories are created on first write.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(
+        self, operation: str, rows: Iterable[Dict[str, Any]], err: Exception
+    ) -> int:
+        """Recording failed rows.
+
+        Args:
+            operation: Name of the write.
+            rows: Rows that were not written.
+            err: Final error.
+
+        Returns:
+            Number of recorded rows.
+        """
+        failed_at = datetime.utcnow().isoformat()
+        lines = [
+            json.dumps(
+                {
+                    "operation": operation,
+                    "error": f"{type(err).__name__}: {err}",
+                    "failed_at": failed_at,
+                    "row": row,
+                },
+                default=str,
+                ensure_ascii=False,
+            )
+            for row in rows
+        ]
+        if not lines:
+            return 0
+
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as sink_file:
+                sink_file.write("\n".join(lines) + "\n")
+
+        DB_WRITE_DROPPED_ROWS.labels(operation).inc(len(lines))
+        logger.error(
+            "%s dropped %d rows to %s.", operation, len(lines), self.path, exc_info=err
+        )
+        return len(lines)
+
+
+DEAD_LETTERS = DeadLetterSink(os.getenv("DEAD_LETTER_PATH") or "dead_letters.jsonl")
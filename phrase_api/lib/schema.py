@@ -0,0 +1,243 @@
+"""Collections, indexes & query plans of the phrase database."""
+from typing import Any, Dict, List, Optional, Tuple
+
+import os
+
+from arango.database import StandardDatabase
+
+from phrase_api.lib.connection import get_database
+from phrase_api.logger import LoggerSetup
+
+logger = LoggerSetup(__name__, "info").get_minimal()
+
+# Collections by the environment variable holding their name. Indexes are
+# persistent indexes serving the filters & sorts of ``hot_queries``.
+SCHEMA: Dict[str, Dict[str, Any]] = {
+    "PHRASE_COLLECTION": {
+        "edge": False,
+        "indexes": [
+            ["count", "_key"],  # fetch_data pages sorted by count
+            ["status", "count", "_key"],  # fetch_data pages of a status
+            ["sitename", "doc_id"],  # chunk-agg records of a document
+        ],
+    },
+    "AGG_PHRASE_COL": {
+        "edge": False,
+        "indexes": [["status"]],  # search-NE records without status
+    },
+    "AGG_STATE_COL": {"edge": False, "indexes": []},  # chunk-agg watermarks
+    "WORD_COLLECTION": {"edge": False, "indexes": []},
+    "WORD_EDGE_COLLECTION": {
+        "edge": True,
+        "indexes": [["updated_at"]],  # word graph cache refreshes
+    },
+    "NER_COLLECTION": {"edge": False, "indexes": []},
+}
+
+
+def ensure_schema(phrase_db: Optional[StandardDatabase] = None) -> List[str]:
+    """Creating missing collections & persistent indexes.
+
+    Collections whose environment variable is not set are skipped.
+
+    Args:
+        phrase_db: Database. Defaults to the pooled one.
+
+    Returns:
+        Descriptions of created collections & indexes.
+    """
+    phrase_db = phrase_db or get_database()
+    created = []
+    for env_var, spec in SCHEMA.items():
+        name = os.getenv(env_var)
+        if not name:
+            logger.warning("%s is not set, skipping its schema.", env_var)
+            continue
+
+        if not phrase_db.has_collection(name):
+            phrase_db.create_collection(name, edge=spec["edge"])
+            created.append(f"collection {name}")
+
+        existing = {
+            tuple(index["fields"]) for index in phrase_db.collection(name).indexes()
+        }
+        for fields in spec["indexes"]:
+            if tuple(fields) not in existing:
+                phrase_db.collection(name).add_persistent_index(
+                    fields=fields, sparse=False
+                )
+                created.append(f"index {name}{fields}")
+
+    for item in created:
+        logger.info("Created %s.", item)
+    return created
+
+
+def missing_indexes(phrase_db: Optional[StandardDatabase] = None) -> List[str]:
+    """Listing collections & indexes of ``SCHEMA`` that do not exist."""
+    phrase_db = phrase_db or get_database()
+    missing = []
+    for env_var, spec in SCHEMA.items():
+        name = os.getenv(env_var)
+        if not name:
+            continue
+        if not phrase_db.has_collection(name):
+            missing.append(f"collection {name}")
+            continue
+        existing = {
+            tuple(index["fields"]) for index in phrase_db.collection(name).indexes()
+        }
+        missing.extend(
+            f"index {name}{fields}"
+            for fields in spec["indexes"]
+            if tuple(fields) not in existing
+        )
+    return missing
+
+
+def hot_queries() -> List[Tuple[str, str, Dict[str, Any]]]:
+    """Queries issued by the API & CLI with sample bind variables.
+
+    Writes are listed too, explaining them does not run them.
+
+    Queries on collections whose environment variable is not set are left out.
+
+    Returns:
+        Name, query & bind variables of every query.
+    """
+    # Imported here since the scripts import lib modules
+    from phrase_api.lib.db import (
+        STATUS_UPDATE_QUERY,
+        build_fetch_query,
+        encode_cursor,
+    )
+    from phrase_api.lib.word_graph import EDGE_DELTA_QUERY
+    from phrase_api.scripts import NER_extractor, NE_search, chunk_aggregate
+
+    queries = []
+    if os.getenv("PHRASE_COLLECTION"):
+        cursor = encode_cursor({"count": 1, "_key": "0"})
+        for status in [None, "highlight", "has_status", "no_status"]:
+            queries.append(
+                (f"fetch-data status={status}", *build_fetch_query(status, 10, 100))
+            )
+            queries.append(
+                (
+                    f"fetch-data status={status} cursor",
+                    *build_fetch_query(status, 10, cursor=cursor),
+                )
+            )
+        queries.append(
+            (
+                "status update",
+                STATUS_UPDATE_QUERY,
+                {
+                    "@phrase_col": os.getenv("PHRASE_COLLECTION"),
+                    "updates": [{"_key": "0", "status": "stop"}],
+                },
+            )
+        )
+        queries.append(
+            (
+                "chunk-agg fetch",
+                chunk_aggregate.DOC_FETCH_QUERY,
+                {
+                    "@phrase_collection": os.getenv("PHRASE_COLLECTION"),
+                    "sitename": "site",
+                    "doc_id": "1",
+                },
+            )
+        )
+        if os.getenv("AGG_PHRASE_COL"):
+            queries.append(
+                (
+                    "chunk-agg bulk",
+                    chunk_aggregate.BULK_AGGREGATE_QUERY,
+                    {
+                        "@phrase_collection": os.getenv("PHRASE_COLLECTION"),
+                        "@agg_collection": os.getenv("AGG_PHRASE_COL"),
+                        "sitename": "site",
+                        "doc_ids": ["1", "2"],
+                    },
+                )
+            )
+    if os.getenv("AGG_PHRASE_COL"):
+        queries.append(
+            (
+                "search-NE fetch",
+                NE_search.DOC_FETCH_QUERY,
+                {
+                    "@agg_collection": os.getenv("AGG_PHRASE_COL"),
+                    "start": "8",
+                    "end": "9",
+                    "after": "8",
+                    "chunk_size": 1000,
+                },
+            )
+        )
+        queries.append(
+            (
+                "search-NE tag",
+                NE_search.TAG_QUERY,
+                {"@agg_collection": os.getenv("AGG_PHRASE_COL"), "keys": ["0"]},
+            )
+        )
+    if os.getenv("NER_COLLECTION"):
+        queries.append(
+            (
+                "NER insert",
+                NER_extractor.NE_INSERT_QUERY,
+                {
+                    "@ner_col": os.getenv("NER_COLLECTION"),
+                    "batch": [{"_key": "0", "word": "word"}],
+                },
+            )
+        )
+    if os.getenv("WORD_EDGE_COLLECTION"):
+        queries.append(
+            (
+                "word-graph refresh",
+                EDGE_DELTA_QUERY,
+                {"@edge_col": os.getenv("WORD_EDGE_COLLECTION"), "since": 0},
+            )
+        )
+    return queries
+
+
+def explain_query(
+    query: str,
+    bind_vars: Dict[str, Any],
+    phrase_db: Optional[StandardDatabase] = None,
+) -> Dict[str, List[str]]:
+    """Summarizing index usage of a query plan.
+
+    Args:
+        query: AQL query.
+        bind_vars: Bind variables of the query.
+        phrase_db: Database. Defaults to the pooled one.
+
+    Returns:
+        Indexes used and collections enumerated without an index.
+    """
+    phrase_db = phrase_db or get_database()
+    plan = phrase_db.aql.explain(query, bind_vars=bind_vars)
+    indexes, full_scans = [], []
+    for node in plan["nodes"]:
+        if node["type"] == "IndexNode":
+            indexes.extend(
+                f"{node['collection']}{index['fields']}" for index in node["indexes"]
+            )
+        elif node["type"] == "EnumerateCollectionNode":
+            full_scans.append(node["collection"])
+    return {"indexes": indexes, "full_scans": full_scans}
+
+
+def explain_hot_queries(
+    phrase_db: Optional[StandardDatabase] = None,
+) -> Dict[str, Dict[str, List[str]]]:
+    """Index usage of every query in ``hot_queries``."""
+    phrase_db = phrase_db or get_database()
+    return {
+        name: explain_query(query, bind_vars, phrase_db)
+        for name, query, bind_vars in hot_queries()
+    }
@@ -1,59 +1,59 @@
-import os
-from phrase_api.lib.db import arango_connection
-from typing import Optional
+from phrase_api.lib.connection import get_database
+from phrase_api.lib.matcher import WordMatcher
+from typing import FrozenSet, Iterable, List, Optional, Union
 import re
 
+StopMatcher = Union[re.Pattern, WordMatcher]
 
-def get_named_entities():
-    """Fetching named entities from database."""
+
+def get_named_entities() -> FrozenSet[str]:
+    """Fetching named entities from database as a hashed set."""
     # ------------------ Arango Connection Config ------------------
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
-    arango_client = arango_connection()
-    phrase_db = arango_client.db(database, username=username, password=password)
+    phrase_db = get_database()
 
     # Fetching named entities
     named_entities = phrase_db.aql.execute("""FOR ph in ner return {"word":ph.word}""")
     named_entities = list(named_entities)
-    arango_client.close()
-    ne = [word["word"] for word in named_entities]
+    ne = frozenset(word["word"] for word in named_entities)
 
     return ne
 
 
-def get_stop_words_regex():
+def get_stop_words():
     """Fetching stop words from database."""
     # ------------------ Arango Connection Config ------------------
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
-    arango_client = arango_connection()
-    phrase_db = arango_client.db(database, username=username, password=password)
+    phrase_db = get_database()
 
     # Fetching stop words
     stop_words = phrase_db.aql.execute(
         """FOR ph in stop_word return {"word":ph.word}""")
-    stop_words = list(stop_words)
-    arango_client.close()
     stops = [word["word"] for word in stop_words]
 
-    # Creating regex pattern
-    pattern = "|".join(stops)
+    return stops
+
+
+def get_stop_words_regex():
+    """Creating stop words regex pattern."""
+    pattern = "|".join(re.escape(stop) for stop in get_stop_words())
     stop_match = re.compile(r"\b(" + pattern + r")\b")
     return stop_match
 
 
+def get_stop_words_matcher() -> WordMatcher:
+    """Creating whole-word stop words matcher."""
+    return WordMatcher(get_stop_words())
+
+
 def status_detector(
     phrase: str,
-    stop_patt: re.Pattern,
-    ne_list: list
+    stop_patt: StopMatcher,
+    ne_set: FrozenSet[str]
 ) -> Optional[str]:
     """Detects status based on given phrase
     Args:
         phrase: phrase string
-        stop_patt: Regex pattern for stop words
-        ne_list: list of named entities
+        stop_patt: Regex pattern or matcher for stop words
+        ne_set: set of named entities
 
     Returns:
         status (suggested-highlight, suggested-stop, None)
@@ -63,9 +63,36 @@ def status_detector(
         return "suggested-stop"
 
     # --------------- NE Search ---------------
-    words = phrase.split()
-    for word in words:
-        if word not in ne_list:
-            return None
+    if ne_set.issuperset(phrase.split()):
+        return "suggested-highlight"
 
-    return "suggested-highlight"
+    return None
+
+
+def detect_statuses(
+    bags: Iterable[str],
+    stop_patt: StopMatcher,
+    ne_set: FrozenSet[str]
+) -> List[Optional[str]]:
+    """Detects statuses for a whole column of phrases in one call.
+
+    Args:
+        bags: phrases, e.g. ``phrase_count_res["bag"]``
+        stop_patt: Regex pattern or matcher for stop words
+        ne_set: set of named entities
+
+    Returns:
+        statuses in the same order as ``bags``
+    """
+    bags = list(bags)
+    if isinstance(stop_patt, WordMatcher):
+        stops = stop_patt.search_many(bags)
+    else:
+        stops = [bool(stop_patt.search(bag)) for bag in bags]
+    is_ne = ne_set.issuperset
+    return [
+        "suggested-stop" if stop
+        else "suggested-highlight" if is_ne(bag.split())
+        else None
+        for bag, stop in zip(bags, stops)
+    ]
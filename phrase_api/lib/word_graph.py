@@ -0,0 +1,381 @@
+"""In-memory adjacency of the word graph."""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import heapq
+import os
+import threading
+from itertools import islice
+from time import time
+
+import numpy as np
+
+from phrase_api.lib.connection import get_database
+from phrase_api.lib.keys import phrase_key
+from phrase_api.logger import LoggerSetup
+
+logger = LoggerSetup(__name__, "info").get_minimal()
+
+# Edges are read batch by batch, ``updated_at`` is set by the edge upsert
+EDGE_QUERY = """
+FOR edge IN @@edge_col
+    RETURN [edge._from, edge._to, edge.count, edge.updated_at]
+"""
+EDGE_DELTA_QUERY = """
+FOR edge IN @@edge_col
+    FILTER edge.updated_at >= @since
+    RETURN [edge._from, edge._to, edge.count, edge.updated_at]
+"""
+WORD_QUERY = """
+FOR word IN @@word_col
+    FILTER word._key IN @keys
+    RETURN [word._key, word.word]
+"""
+
+# Edge row: from hash, to hash, count & update time in ms
+EdgeRow = Tuple[str, str, int, int]
+
+
+class Adjacency:
+    """Immutable CSR adjacency matrix of the word graph.
+
+    Words are numbered in order of appearance. Row ``i`` holds the outgoing
+    edges of word ``i`` sorted by count, so the top neighbors of a word are
+    the head of its row.
+
+    Args:
+        hashes: Word hash of each id.
+        words: Word of each id, None if it is not in the word collection.
+        indptr: Row offsets, ``len(hashes) + 1`` items.
+        indices: Target id of each edge.
+        counts: Count of each edge.
+        watermark: Latest ``updated_at`` of the loaded edges in ms.
+    """
+
+    def __init__(
+        self,
+        hashes: List[str],
+        words: List[Optional[str]],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        counts: np.ndarray,
+        watermark: int = 0,
+        ids: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.hashes = hashes
+        self.words = words
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+        self.watermark = watermark
+        self.ids = ids if ids is not None else {h: i for i, h in enumerate(hashes)}
+        self.loaded_at = time()
+
+    @property
+    def node_count(self) -> int:
+        """Number of words."""
+        return len(self.hashes)
+
+    @property
+    def edge_count(self) -> int:
+        """Number of edges."""
+        return len(self.indices)
+
+    def node(self, word: str) -> Optional[int]:
+        """Id of a word or None if it has no edges."""
+        return self.ids.get(phrase_key(word))
+
+    def neighbors(self, node: int, limit: int = 10) -> List[Tuple[int, int]]:
+        """Top neighbors of a word.
+
+        Args:
+            node: Word id.
+            limit: Maximum number of neighbors.
+
+        Returns:
+            Id & edge count of the neighbors, by count descending.
+        """
+        start = self.indptr[node]
+        end = min(self.indptr[node + 1], start + limit)
+        return list(
+            zip(self.indices[start:end].tolist(), self.counts[start:end].tolist())
+        )
+
+    def expand(
+        self, node: int, hops: int = 2, limit: int = 10, max_nodes: int = 1000
+    ) -> Dict[int, int]:
+        """Words reachable in at most ``hops`` steps.
+
+        Only the top ``limit`` neighbors of every word are followed.
+
+        Args:
+            node: Start word id.
+            hops: Maximum number of steps.
+            limit: Neighbors followed per word.
+            max_nodes: Maximum number of words returned.
+
+        Returns:
+            Hop distance of every reached word, in breadth-first order.
+        """
+        depths = {node: 0}
+        frontier = [node]
+        for depth in range(1, hops + 1):
+            next_frontier = []
+            for current in frontier:
+                for neighbor, _ in self.neighbors(current, limit):
+                    if neighbor in depths:
+                        continue
+                    if len(depths) >= max_nodes:
+                        return depths
+                    depths[neighbor] = depth
+                    next_frontier.append(neighbor)
+            frontier = next_frontier
+        return depths
+
+    def weighted_path(
+        self, source: int, target: int, max_hops: int = 6
+    ) -> Optional[Tuple[List[int], float]]:
+        """Cheapest path of at most ``max_hops`` edges.
+
+        An edge costs ``1 / count``, frequent co-occurrences are close.
+
+        Args:
+            source: Start word id.
+            target: End word id.
+            max_hops: Maximum number of edges in the path.
+
+        Returns:
+            Word ids of the path & its cost, or None if there is no path.
+        """
+        # Labels are (cost, hops, node, parent label). A popped label is only
+        # expanded if it has fewer hops than every cheaper label of its node.
+        heap: List[Tuple[float, int, int, Optional[tuple]]] = [(0.0, 0, source, None)]
+        fewest_hops: Dict[int, int] = {}
+        while heap:
+            label = heapq.heappop(heap)
+            cost, hops, current, _ = label
+            if current == target:
+                path = []
+                while label is not None:
+                    path.append(label[2])
+                    label = label[3]
+                return path[::-1], cost
+            if fewest_hops.get(current, max_hops + 1) <= hops or hops >= max_hops:
+                continue
+            fewest_hops[current] = hops
+            start, end = self.indptr[current], self.indptr[current + 1]
+            for neighbor, count in zip(
+                self.indices[start:end].tolist(), self.counts[start:end].tolist()
+            ):
+                if fewest_hops.get(neighbor, max_hops + 1) > hops + 1:
+                    heapq.heappush(heap, (cost + 1 / count, hops + 1, neighbor, label))
+        return None
+
+
+def build_adjacency(
+    previous: Optional[Adjacency],
+    edges: Sequence[EdgeRow],
+    words: Dict[str, Optional[str]],
+) -> Adjacency:
+    """Merging changed edges into an adjacency.
+
+    Args:
+        previous: Adjacency the edges are merged into. None builds a new one.
+        edges: Changed edges with their current counts.
+        words: Words of hashes not in ``previous``.
+
+    Returns:
+        New adjacency, ``previous`` is left untouched.
+    """
+    hashes = list(previous.hashes) if previous else []
+    word_list = list(previous.words) if previous else []
+    ids = dict(previous.ids) if previous else {}
+
+    def node_id(word_hash: str) -> int:
+        if word_hash not in ids:
+            ids[word_hash] = len(hashes)
+            hashes.append(word_hash)
+            word_list.append(words.get(word_hash))
+        return ids[word_hash]
+
+    new_src = np.fromiter((node_id(edge[0]) for edge in edges), np.int64, len(edges))
+    new_dst = np.fromiter((node_id(edge[1]) for edge in edges), np.int64, len(edges))
+    new_counts = np.fromiter((edge[2] for edge in edges), np.int64, len(edges))
+
+    if previous is not None:
+        old_src = np.repeat(
+            np.arange(previous.node_count, dtype=np.int64), np.diff(previous.indptr)
+        )
+        keys = np.concatenate(
+            [(old_src << 32) | previous.indices, (new_src << 32) | new_dst]
+        )
+        counts = np.concatenate([previous.counts, new_counts])
+    else:
+        keys, counts = (new_src << 32) | new_dst, new_counts
+
+    # Later rows win, so changed edges replace their previous counts
+    keys, last = np.unique(keys[::-1], return_index=True)
+    counts = counts[::-1][last]
+    src, dst = keys >> 32, keys & 0xFFFFFFFF
+
+    order = np.lexsort((-counts, src))
+    indptr = np.zeros(len(hashes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=len(hashes)), out=indptr[1:])
+
+    watermark = max(
+        [previous.watermark if previous else 0]
+        + [edge[3] for edge in edges if edge[3] is not None]
+    )
+    return Adjacency(
+        hashes,
+        word_list,
+        indptr,
+        dst[order].astype(np.int32),
+        counts[order],
+        watermark=watermark,
+        ids=ids,
+    )
+
+
+def _batches(rows: Iterable, size: int) -> Iterable[list]:
+    """Splitting an iterable into lists of at most size items."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class WordGraphCache:
+    """Keeps the word graph adjacency of this process up to date.
+
+    Readers get a complete adjacency through ``get``, the first call loads
+    it and starts background refreshes, so workers never serving the graph
+    never read it. ``refresh`` fetches only edges updated since the last one
+    and swaps in the merged adjacency in one assignment.
+
+    Args:
+        ttl: Seconds between background refreshes. 0 disables them.
+        overlap: Seconds every refresh goes back before the watermark, so
+            writes committed out of order are not missed.
+        batch_size: Number of rows fetched per round trip.
+    """
+
+    def __init__(
+        self, ttl: int = 0, overlap: float = 5, batch_size: int = 50000
+    ) -> None:
+        self.ttl = ttl
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self._adjacency: Optional[Adjacency] = None
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self) -> Adjacency:
+        """Current adjacency, loading it and starting refreshes on first use."""
+        adjacency = self._adjacency
+        if adjacency is None:
+            self.refresh()
+            adjacency = self._adjacency
+            self.start()
+        return adjacency  # type: ignore
+
+    def refresh(self, full: bool = False) -> int:
+        """Merging edges changed since the last refresh.
+
+        Args:
+            full: Rebuilding the adjacency from all edges.
+
+        Returns:
+            Number of fetched edges.
+        """
+        with self._refresh_lock:
+            current = None if full else self._adjacency
+            s_load = time()
+            if current is None:
+                edges = self._fetch_edges(None)
+            else:
+                edges = self._fetch_edges(current.watermark - int(self.overlap * 1000))
+                if not edges:
+                    return 0
+
+            known = current.ids if current else {}
+            new_hashes = {h for edge in edges for h in edge[:2] if h not in known}
+            adjacency = build_adjacency(current, edges, self._fetch_words(new_hashes))
+            self._adjacency = adjacency
+
+        logger.info(
+            "Merged %d word edges in %.1f ms (%d words, %d edges).",
+            len(edges),
+            (time() - s_load) * 1000,
+            adjacency.node_count,
+            adjacency.edge_count,
+        )
+        return len(edges)
+
+    def _fetch_edges(self, since: Optional[int]) -> List[EdgeRow]:
+        """Edges updated at or after ``since``, all edges if it is None."""
+        bind_vars = {"@edge_col": os.getenv("WORD_EDGE_COLLECTION")}
+        if since is not None:
+            bind_vars["since"] = since
+        cursor = get_database().aql.execute(
+            EDGE_QUERY if since is None else EDGE_DELTA_QUERY,
+            bind_vars=bind_vars,
+            batch_size=self.batch_size,
+            stream=True,
+        )
+        try:
+            return [
+                (_from.rsplit("/", 1)[-1], _to.rsplit("/", 1)[-1], count, updated)
+                for _from, _to, count, updated in cursor
+            ]
+        finally:
+            cursor.close(ignore_missing=True)
+
+    def _fetch_words(self, word_hashes: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Words of the given hashes."""
+        words: Dict[str, Optional[str]] = {}
+        phrase_db = get_database()
+        for keys in _batches(word_hashes, self.batch_size):
+            cursor = phrase_db.aql.execute(
+                WORD_QUERY,
+                bind_vars={"@word_col": os.getenv("WORD_COLLECTION"), "keys": keys},
+                batch_size=self.batch_size,
+            )
+            words.update(cursor)
+        return words
+
+    def _refresh_loop(self) -> None:
+        """Refreshing adjacency every ``ttl`` seconds until stopped."""
+        while not self._stop_event.wait(self.ttl):
+            try:
+                self.refresh()
+            except Exception as err:
+                logger.error("Failed refreshing word graph.", exc_info=err)
+
+    def start(self) -> None:
+        """Starting background refresh if a ttl is configured."""
+        with self._thread_lock:
+            if self.ttl <= 0 or self._thread is not None:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._refresh_loop, name="word-graph-refresh", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stopping background refresh."""
+        self._stop_event.set()
+        with self._thread_lock:
+            if self._thread is not None:
+                self._thread.join(timeout=5)
+                self._thread = None
+
+
+WORD_GRAPH = WordGraphCache(
+    ttl=int(os.getenv("WORD_GRAPH_REFRESH") or 60),
+    overlap=float(os.getenv("WORD_GRAPH_REFRESH_OVERLAP") or 5),
+)
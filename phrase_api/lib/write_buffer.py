@@ -0,0 +1,259 @@
+"""Write-behind aggregation of phrase counts before upserting them."""
+from typing import Any, Callable, Dict, Optional
+
+import os
+import threading
+from collections import OrderedDict
+from functools import partial
+
+import pandas as pd
+from pandas import DataFrame
+
+from phrase_api.lib.db import integrate_phrase_data
+from phrase_api.lib.retry import DEAD_LETTERS, WriteDroppedError
+from phrase_api.logger import LoggerSetup
+
+logger = LoggerSetup(__name__, "info").get_minimal()
+
+BUFFER_MODES = ("off", "ack", "async")
+BUFFER_FIELDS = ("_key", "bag", "count", "status", "length")
+
+# Number of flushes the errors of failed batches are kept for waiting writers
+_ERROR_HISTORY = 1000
+
+
+class PhraseWriteBuffer:
+    """Per-process buffer summing phrase counts per phrase hash.
+
+    Documents add their counts to the buffer and every flush upserts one row
+    per distinct phrase, so hot phrases are written once per flush instead
+    of once per document.
+
+    * ``ack``: ``write`` returns after the flush holding its counts is saved.
+      Concurrent writers share flushes (group commit).
+    * ``async``: ``write`` returns immediately. Counts are flushed when the
+      buffer holds ``max_rows`` phrases, every ``interval`` seconds and on
+      ``close``. Phrases of failed flushes are merged back and retried,
+      those still unsaved on ``close`` go to the dead-letter sink.
+
+    Args:
+        mode: ``ack`` or ``async``.
+        max_rows: Number of buffered phrases triggering a flush.
+        interval: Seconds between background flushes.
+        writer: Function upserting a phrase dataframe. Defaults to
+            ``integrate_phrase_data``, without dead letters in ``async`` mode.
+    """
+
+    def __init__(
+        self,
+        mode: str = "ack",
+        max_rows: int = 5000,
+        interval: float = 1.0,
+        writer: Optional[Callable[[DataFrame], Dict[str, int]]] = None,
+    ) -> None:
+        if mode not in BUFFER_MODES[1:]:
+            raise ValueError(f"Unknown buffer mode: {mode}")
+
+        self.mode = mode
+        self.max_rows = max_rows
+        self.interval = interval
+        self.writer = writer or partial(
+            integrate_phrase_data, dead_letter=(mode == "ack")
+        )
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._batch_id = 0
+        self._done_id = -1
+        self._errors: "OrderedDict[int, Exception]" = OrderedDict()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["PhraseWriteBuffer"]:
+        """Creating buffer from environment variables.
+
+        ``PHRASE_WRITE_BUFFER`` (``off``, ``ack`` or ``async``, default
+        ``off``), ``PHRASE_BUFFER_ROWS`` (default 5000) and
+        ``PHRASE_BUFFER_INTERVAL`` (seconds, default 1) are read.
+
+        Returns:
+            Buffer or None if buffering is off.
+        """
+        mode = os.getenv("PHRASE_WRITE_BUFFER") or "off"
+        if mode == "off":
+            return None
+        return cls(
+            mode=mode,
+            max_rows=int(os.getenv("PHRASE_BUFFER_ROWS") or 5000),
+            interval=float(os.getenv("PHRASE_BUFFER_INTERVAL") or 1.0),
+        )
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _merge(self, records: Dict[str, Dict[str, Any]]) -> None:
+        """Adding phrase records to pending ones. Caller holds ``_lock``."""
+        pending = self._pending
+        for key, record in records.items():
+            if key in pending:
+                pending[key]["count"] += record["count"]
+            else:
+                pending[key] = record
+
+    def add(self, result: DataFrame) -> int:
+        """Adding counted phrases to the buffer.
+
+        Args:
+            result: Counted phrases with ``_key``, ``bag``, ``count``,
+                ``status`` and ``length`` columns.
+
+        Returns:
+            Id of the batch holding the counts.
+        """
+        records: Dict[str, Dict[str, Any]] = {}
+        for item in result.to_dict(orient="records"):
+            record = records.get(item["_key"])
+            if record is None:
+                records[item["_key"]] = {
+                    "_key": item["_key"],
+                    "bag": item["bag"],
+                    "count": int(item["count"]),
+                    "status": item.get("status"),
+                    "length": item.get("length"),
+                }
+            else:
+                record["count"] += int(item["count"])
+
+        with self._lock:
+            self._merge(records)
+            return self._batch_id
+
+    def write(self, result: DataFrame) -> Dict[str, int]:
+        """Buffering counted phrases, drop-in for ``integrate_phrase_data``.
+
+        Args:
+            result: Counted phrases.
+
+        Returns:
+            Rows and round trips of the flush saving the counts, zeros if
+            the counts are only buffered.
+
+        Raises:
+            Exception: In ``ack`` mode, if the flush holding the counts failed.
+        """
+        batch_id = self.add(result)
+        if self.mode == "ack":
+            return self.flush_until(batch_id)
+        if len(self) >= self.max_rows:
+            return self.flush()
+        return {"rows": 0, "round_trips": 0}
+
+    def flush_until(self, batch_id: int) -> Dict[str, int]:
+        """Flushing until the given batch is saved.
+
+        Raises:
+            Exception: If the batch failed saving.
+        """
+        stats = {"rows": 0, "round_trips": 0}
+        with self._flush_lock:
+            if self._done_id < batch_id:
+                stats = self._flush_locked()
+        error = self._errors.get(batch_id)
+        if error is not None:
+            raise error
+        return stats
+
+    def flush(self) -> Dict[str, int]:
+        """Upserting all buffered phrases.
+
+        Returns:
+            Rows and round trips used.
+        """
+        with self._flush_lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> Dict[str, int]:
+        """Swapping pending phrases out and writing them."""
+        with self._lock:
+            records, self._pending = self._pending, {}
+            batch_id = self._batch_id
+            self._batch_id += 1
+
+        stats = {"rows": 0, "round_trips": 0}
+        if records:
+            try:
+                stats = self.writer(pd.DataFrame.from_records(list(records.values())))
+            except Exception as err:
+                logger.error(
+                    "Failed flushing %d buffered phrases.", len(records), exc_info=err
+                )
+                if self.mode == "ack":
+                    self._errors[batch_id] = err
+                if self.mode == "async":
+                    if isinstance(err, WriteDroppedError):
+                        # Only rows that were not written are retried
+                        records = {
+                            row["_key"]: {
+                                field: row[field] for field in BUFFER_FIELDS
+                            }
+                            for row in err.rows
+                        }
+                    with self._lock:
+                        self._merge(records)
+                    return stats
+                raise
+            finally:
+                self._done_id = batch_id
+                self._forget_errors(batch_id)
+            logger.debug(
+                "Flushed %d buffered phrases in %d round trips.",
+                stats["rows"],
+                stats["round_trips"],
+            )
+        else:
+            self._done_id = batch_id
+            self._forget_errors(batch_id)
+
+        return stats
+
+    def _forget_errors(self, batch_id: int) -> None:
+        """Dropping errors of batches older than ``_ERROR_HISTORY`` flushes."""
+        errors = self._errors
+        while errors and next(iter(errors)) <= batch_id - _ERROR_HISTORY:
+            errors.popitem(last=False)
+
+    def _flush_loop(self) -> None:
+        """Flushing every ``interval`` seconds until stopped."""
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as err:
+                logger.error("Background flush failed.", exc_info=err)
+
+    def start(self) -> None:
+        """Starting background flushes in ``async`` mode."""
+        if self.mode != "async" or self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._flush_loop, name="phrase-write-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stopping background flushes and flushing what is left."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        self.flush()
+        with self._lock:
+            records, self._pending = self._pending, {}
+        if records:
+            DEAD_LETTERS.write(
+                "phrase-buffer",
+                records.values(),
+                RuntimeError("Buffer closed with unsaved phrases."),
+            )
+        logger.info("Phrase write buffer flushed.")
@@ -5,11 +5,22 @@ import os
 
 from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.openapi.utils import get_openapi
+from phrase_api.lib.connection import check_connection, close_connections
+from phrase_api.lib.dictionaries import REGISTRY
+from phrase_api.lib.metrics import metrics_app
+from phrase_api.lib.schema import ensure_schema
+from phrase_api.lib.word_graph import WORD_GRAPH
+from phrase_api.logger import LoggerSetup
 from routers import (
-    http_data_fetcher, http_doc_processor, http_status_updater, http_word_graph
+    http_admin,
+    http_data_fetcher,
+    http_doc_processor,
+    http_status_updater,
+    http_word_graph,
 )
 
 app = FastAPI()
+logger = LoggerSetup(__name__, "info").get_minimal()
 DESCRIPTION = """
 API for handling common phrase detection functionalities.
 Here is what each section provides.
@@ -44,7 +55,8 @@ Here you can fetch phrases based on 4 different situation for statuses:
 
 * Phrases which statuses are not yet determined
 
-
+<h3>Admin</h3>
+Inspecting and reloading NE, stop word & frequent phrase dictionaries.
 
 """
 
@@ -75,6 +87,38 @@ def custom_openapi():
 
 app.openapi = custom_openapi  # type: ignore
 
+# Prometheus metrics (retries, dropped rows, ...)
+app.mount("/metrics", metrics_app())
+
+
+@app.on_event("startup")
+def open_connections() -> None:
+    """Warming up the pooled ArangoDB connection of this worker."""
+    if not check_connection():
+        logger.warning("ArangoDB is not reachable on worker startup.")
+        return
+    if (os.getenv("SCHEMA_BOOTSTRAP") or "1") == "0":
+        return
+    try:
+        ensure_schema()
+    except Exception as err:
+        logger.warning("Failed ensuring collections & indexes.", exc_info=err)
+
+
+@app.on_event("startup")
+def start_dictionary_refresh() -> None:
+    """Refreshing dictionaries in background every DICTIONARY_TTL seconds."""
+    REGISTRY.start()
+
+
+@app.on_event("shutdown")
+def shutdown_connections() -> None:
+    """Closing pooled ArangoDB connections of this worker."""
+    REGISTRY.stop()
+    WORD_GRAPH.stop()
+    close_connections()
+
+
 app.include_router(
     http_doc_processor.router,
     prefix=os.getenv("ROOT_PATH", ""),
@@ -102,3 +146,10 @@ app.include_router(
     # dependencies=[Depends(get_token_header)],
     responses={404: {"description": "Not found"}},
 )
+
+app.include_router(
+    http_admin.router,
+    prefix=os.getenv("ROOT_PATH", ""),
+    dependencies=[Depends(get_token_header)],
+    responses={404: {"description": "Not found"}},
+)
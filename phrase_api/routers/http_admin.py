@@ -0,0 +1,54 @@
+"""Administration endpoints."""
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Query
+
+from phrase_api.lib.dictionaries import REGISTRY
+from phrase_api.logger import LoggerSetup
+
+# ------------------------------ Initialization -------------------------------
+router = APIRouter()
+logger = LoggerSetup(__name__, "info").get_minimal()
+
+
+# ---------------------------- function definition ----------------------------
+def dictionary_info() -> Dict[str, Any]:
+    """Versions of the dictionaries loaded in this worker."""
+    snapshot = REGISTRY.get()
+    return {
+        "version": snapshot.version,
+        "versions": snapshot.versions,
+        "loaded_at": snapshot.loaded_at,
+    }
+
+
+@router.get("/api/admin/dictionaries", response_model=dict, tags=["Admin"])
+def read_dictionaries() -> Dict[str, Any]:
+    """**Versions of NE, stop word & frequent phrase dictionaries in use.**"""
+    return dictionary_info()
+
+
+@router.post(
+    "/api/admin/reload-dictionaries",
+    response_model=dict,
+    tags=["Admin"],
+    status_code=200,
+)
+def reload_dictionaries(force: bool = Query(False)) -> Dict[str, Any]:
+    """**Reloading dictionaries from database.**
+
+    The new dictionaries are swapped in once they are fully loaded, requests
+    in progress keep using the previous ones. Note that only the worker that
+    serves this request is reloaded, other workers pick up changes on their
+    `DICTIONARY_TTL` refresh.
+
+    Dictionaries are only fetched when their collections changed since the
+    last load, unless `force` is set.
+    """
+    try:
+        changed = REGISTRY.reload(force=force)
+    except Exception as err:
+        logger.error("Failed reloading dictionaries.", exc_info=err)
+        raise HTTPException(status_code=500, detail="Reload failed.") from err
+
+    return {"changed": changed, **dictionary_info()}
@@ -1,6 +1,11 @@
 """Updating the status of the phrase (highlight, stop) based on input."""
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException, Query
-from lib.db import fetch_data
+from fastapi.responses import StreamingResponse
+from lib.db import encode_cursor, fetch_data
+
+from phrase_api.lib.export import MEDIA_TYPES, export_phrases, parse_fields
 
 # ------------------------------ Initialization -------------------------------
 router = APIRouter()
@@ -17,6 +22,7 @@ async def fetch_phrases(
     ),
     limit: int = 10,
     page: int = 1,
+    cursor: Optional[str] = None,
 ):
     """**Fetching data from database.**
 
@@ -40,6 +46,13 @@ async def fetch_phrases(
 
     * **page**: Page number.
 
+    * **cursor**: `next_cursor` of the previous response. Pages fetched with a
+    cursor take the same time at any depth, **page** is ignored when it is given.
+
+    **Response:** `items` of the page and `next_cursor` for the next page,
+    `null` on the last page. Pages are cached per worker for `FETCH_CACHE_TTL`
+    seconds. Status updates clear the cache of the worker serving them, other
+    workers may return the previous status until their pages expire.
     """
     try:
         if status not in [
@@ -53,15 +66,68 @@ async def fetch_phrases(
             raise HTTPException(status_code=400, detail="bad-status")
         offset = (page - 1) * limit
 
-        results = fetch_data(status=status, limit=limit, offset=offset)
+        try:
+            results = fetch_data(
+                status=status, limit=limit, offset=offset, cursor=cursor
+            )
+        except ValueError as err:
+            raise HTTPException(status_code=400, detail="bad-cursor") from err
 
-        return {"items": results}
+        next_cursor = encode_cursor(results[-1]) if len(results) == limit else None
+
+        return {"items": results, "next_cursor": next_cursor}
     except HTTPException as err:
         if err.detail == "bad-status":
             raise HTTPException(
                 status_code=400, detail="Wrong status code input."
             ) from err
+        if err.detail == "bad-cursor":
+            raise HTTPException(status_code=400, detail="Invalid cursor.") from err
 
     except Exception as err:
         print(err)
         raise HTTPException(status_code=400) from err
+
+
+@router.get("/api/data-fetcher/export", tags=["Data Fetcher"], status_code=200)
+def export_data(
+    status: str = Query(
+        None, enum=["highlight", "stop", "has_status", "no_status", "suggested-stop"]
+    ),
+    export_format: str = Query("ndjson", alias="format", enum=list(MEDIA_TYPES)),
+    fields: Optional[str] = None,
+    batch_size: int = Query(10000, ge=1, le=100000),
+) -> StreamingResponse:
+    """**Streaming all phrases of a status.**
+
+    **Arguments:** <br>
+
+    * **status**: Same as `/api/data-fetcher/`.
+
+    * **format**: `ndjson`, `csv` or `parquet`. Parquet needs the `parquet`
+    extra (`pyarrow`) installed, 400 is returned otherwise.
+
+    * **fields**: Comma separated projection of `_key`, `bag`, `count`,
+    `status` & `length`, e.g. `bag,count,status`. Defaults to all of them.
+
+    * **batch_size**: Phrases fetched from database per round trip.
+
+    The export is streamed batch by batch, so it can hold the whole collection.
+    """
+    try:
+        chunks = export_phrases(
+            status,
+            export_format=export_format,
+            fields=parse_fields(fields),
+            batch_size=batch_size,
+        )
+    except ValueError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
+
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="phrases.{export_format}"'
+        },
+    )
@@ -1,41 +1,157 @@
 """Document processor Endpoint."""
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
 
+import asyncio
+import json
+import os
+from collections import deque
 from time import time
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from lib.db import integrate_phrase_data
-from phrase_counter.ingest import ingest_doc
-from pydantic import BaseModel
+from pandas import DataFrame
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask
+from starlette.types import Receive, Scope, Send
 
 from phrase_api.logger import LoggerSetup
 
-from lib.status_updater import (
-    status_detector, get_named_entities, get_stop_words_regex
+from phrase_api.lib.dictionaries import REGISTRY, get_dictionaries
+from phrase_api.lib.doc_pipeline import (
+    count_phrases,
+    init_pipeline,
+    merge_phrase_counts,
 )
-from phrase_api.lib.frequent_remover import freq_regex
+from phrase_api.lib.executor import BoundedExecutor, QueueSaturatedError
+from phrase_api.lib.retry import WriteDroppedError
+from phrase_api.lib.write_buffer import PhraseWriteBuffer
 
 
 # ------------------------------ Initialization -------------------------------
 router = APIRouter()
 logger = LoggerSetup(__name__, "debug").get_minimal()
 
-NE_LIST = get_named_entities()
-STOP_PATTERN = get_stop_words_regex()
+# Process pool for counting & status detection, thread pool for DB writes
+EXECUTOR = BoundedExecutor.from_env(
+    initializer=init_pipeline,
+    initargs=get_dictionaries().pipeline_args(),
+)
+
+# Workers are restarted with the new dictionaries after every refresh
+REGISTRY.subscribe(lambda snapshot: EXECUTOR.reinitialize(snapshot.pipeline_args()))
 
-# Frequents
-FREQ_NE, FREQ_STOPS = freq_regex("ne"), freq_regex("stop")
+# Optional write-behind buffer summing counts of hot phrases between upserts
+BUFFER = PhraseWriteBuffer.from_env()
+
+# Maximum number of documents in a batch request
+MAX_BATCH_DOCUMENTS = int(os.getenv("DOC_BATCH_MAX_SIZE") or 100)
 
 
 # ---------------------------- function definition ----------------------------
 
 
+@router.on_event("startup")
+def start_buffer() -> None:
+    """Starting background flushes of the write buffer."""
+    if BUFFER is not None:
+        BUFFER.start()
+
+
+@router.on_event("shutdown")
+def shutdown_executor() -> None:
+    """Waiting for running documents, stopping pools and flushing buffer."""
+    EXECUTOR.shutdown()
+    if BUFFER is not None:
+        BUFFER.close()
+
+
+def save_phrases(result: DataFrame, upsert_mode: str) -> Dict[str, int]:
+    """Upserting counted phrases, through the write buffer if it is enabled.
+
+    Args:
+        result: Counted phrases.
+        upsert_mode: Upsert mode of ``integrate_phrase_data``. Buffered
+            phrases are always written in batch mode.
+
+    Returns:
+        Rows written and round trips used.
+
+    Raises:
+        WriteDroppedError: If phrases were not saved after retries.
+    """
+    if BUFFER is not None:
+        return BUFFER.write(result)
+    return integrate_phrase_data(result, mode=upsert_mode)
+
+
 class PhraseDocument(BaseModel):
     """Schema for payload in doc-process endpoint."""
 
     document: str
 
 
+class BatchDocument(BaseModel):
+    """Single document of the batch doc-process payload."""
+
+    document: str
+    doc_id: Optional[str] = None
+    sitename: Optional[str] = None
+
+
+class PhraseDocumentBatch(BaseModel):
+    """Schema for payload in batch doc-process endpoint."""
+
+    documents: List[BatchDocument]
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """Streaming response for endpoints still reading the request body.
+
+    ``StreamingResponse`` listens for client disconnects on ``receive``,
+    which would take chunks of the request body away from the iterator.
+    Disconnects surface through ``Request.stream`` instead. The background
+    task runs even if streaming fails.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        finally:
+            if self.background is not None:
+                await self.background()
+
+
+def admit_job(jobs: int = 1) -> None:
+    """Admitting jobs or rejecting the request if the queue is full."""
+    try:
+        EXECUTOR.acquire(jobs)
+    except QueueSaturatedError as err:
+        logger.warning("Rejecting document: %s", err)
+        raise HTTPException(
+            status_code=503,
+            detail="Document queue is full, retry later.",
+            headers={"Retry-After": "1"},
+        ) from err
+
+
+def admit_jobs(jobs: int) -> int:
+    """Admitting the jobs of a multi-document request.
+
+    A request takes at most half of the queue, so a batch or a stream
+    leaves room for other requests instead of needing an idle queue.
+
+    Args:
+        jobs: Number of documents the request counts at a time.
+
+    Returns:
+        Number of admitted jobs, released by the caller.
+    """
+    slots = max(min(jobs, EXECUTOR.max_pending // 2), 1)
+    admit_job(slots)
+    return slots
+
+
 @router.post(
     "/api/doc-process/",
     response_model=dict,
@@ -51,6 +167,7 @@ async def process_document(
     tag_highlight: bool = False,
     sitename: Optional[str] = None,
     doc_id: Optional[str] = None,
+    upsert_mode: str = Query("batch", enum=["batch", "single"]),
 ) -> Dict[str, str]:
     """**Getting document content, processing & saving results in db.**
 
@@ -69,6 +186,10 @@ async def process_document(
 
     * **doc_id**: Optional document identifier.
 
+    * **upsert_mode**: `batch` for writing all phrases in one AQL statement or
+    `single` for one statement per phrase. Ignored when `PHRASE_WRITE_BUFFER`
+    is enabled.
+
     **Payload Example**: <br>
     ```
     {
@@ -76,43 +197,26 @@ async def process_document(
     }
     ```
     """
+    admit_job()
+
     try:
         logger.info("Starting")
         s_tot = time()
-        # ---------------------------------- INGEST ----------------------------------
-        logger.info("Counting phrases")
+        # ------------------------- INGEST & Status Detector -------------------------
+        logger.info("Counting phrases & detecting statuses")
 
         s_ingest = time()
 
         ngram_range = list(map(int, ngram_range.split(",")))
-        phrase_count_res = ingest_doc(
-            doc=doc.document,
-            doc_type=doc_type,
-            remove_stop_regex=FREQ_STOPS,
-            remove_highlight_regex=FREQ_NE,
-            ngram_range=ngram_range
+        phrase_count_res = await EXECUTOR.run_cpu(
+            count_phrases, doc.document, doc_type, ngram_range
         )
 
         e_ingest = time()
 
         logger.debug(
-            "Time taken for ingesting document: %.1f ms", (e_ingest - s_ingest) * 1000
-        )
-        # ----------------------------- Status Detector -----------------------------
-        logger.info("Detecting Statuses")
-
-        s_status = time()
-
-        phrase_count_res["status"] = [
-            status_detector(
-                phrase, STOP_PATTERN, NE_LIST
-            ) for phrase in phrase_count_res["bag"]
-        ]
-
-        e_status = time()
-
-        logger.debug(
-            "Time taken for status detection: %.1f ms", (e_status - s_status) * 1000
+            "Time taken for ingesting document & detecting statuses: %.1f ms",
+            (e_ingest - s_ingest) * 1000
         )
 
         # --------------------------- Integration ---------------------------
@@ -120,13 +224,17 @@ async def process_document(
 
         s_integrate = time()
 
-        integrate_phrase_data(phrase_count_res)
+        upsert_stats = await EXECUTOR.run_io(
+            save_phrases, phrase_count_res, upsert_mode
+        )
 
         e_integrate = time()
 
         logger.debug(
-            "Time taken for upserting document: %.1f ms",
-            (e_integrate - s_integrate) * 1000
+            "Time taken for upserting document: %.1f ms (%d rows, %d round trips)",
+            (e_integrate - s_integrate) * 1000,
+            upsert_stats["rows"],
+            upsert_stats["round_trips"],
         )
 
         # ---------------------------------------------------------------
@@ -141,6 +249,10 @@ async def process_document(
 
         return res
 
+    except WriteDroppedError as err:
+        logger.error(err)
+        raise HTTPException(status_code=500, detail="Failed saving phrases.") from err
+
     except HTTPException as err:
         logger.error(err)
         raise HTTPException(status_code=400) from err
@@ -148,3 +260,292 @@ async def process_document(
     except Exception as err:
         logger.error(err)
         raise HTTPException(status_code=400) from err
+
+    finally:
+        EXECUTOR.release()
+
+
+@router.post(
+    "/api/doc-process/batch",
+    response_model=dict,
+    tags=["Document Process"],
+    status_code=201,
+)
+async def process_document_batch(
+    batch: PhraseDocumentBatch,
+    doc_type: str = Query("TEXT", enum=["TEXT", "HTML", "URL"]),
+    ngram_range: str = "1,5",
+    replace_stop: bool = False,
+    tag_stop: bool = False,
+    tag_highlight: bool = False,
+    upsert_mode: str = Query("batch", enum=["batch", "single"]),
+) -> Dict[str, Any]:
+    """**Processing a batch of documents & saving merged results in db.**
+
+    Phrases of all documents are counted, merged and written in one upsert,
+    so a phrase repeated across articles is written once per batch.
+    Arguments are the same as `/api/doc-process/` and apply to every document.
+
+    **Response:** `status` of each document is `done` or `failed`.
+    Documents that failed counting are skipped, if saving fails every
+    document of the batch is failed.
+
+    The batch takes one queue slot per document, up to half of the queue,
+    and is rejected with 503 if they are not free.
+
+    **Payload Example**: <br>
+    ```
+    {
+        "documents": [
+            {"document": "<p> hello world </p>", "doc_id": "1", "sitename": "site"}
+        ]
+    }
+    ```
+    """
+    if len(batch.documents) > MAX_BATCH_DOCUMENTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BATCH_DOCUMENTS} documents are allowed.",
+        )
+
+    try:
+        ngram_range = list(map(int, ngram_range.split(",")))
+    except ValueError as err:
+        raise HTTPException(status_code=400, detail="Invalid ngram_range.") from err
+
+    slots = admit_jobs(len(batch.documents))
+
+    try:
+        s_tot = time()
+
+        # ------------------------- INGEST & Status Detector -------------------------
+        semaphore = asyncio.Semaphore(slots)
+
+        async def count_document(item: BatchDocument) -> DataFrame:
+            async with semaphore:
+                return await EXECUTOR.run_cpu(
+                    count_phrases, item.document, doc_type, ngram_range
+                )
+
+        counts = await asyncio.gather(
+            *(count_document(item) for item in batch.documents),
+            return_exceptions=True,
+        )
+
+        results = []
+        for item, count in zip(batch.documents, counts):
+            result = {"doc_id": item.doc_id, "sitename": item.sitename}
+            if isinstance(count, Exception):
+                logger.error("Failed counting document %s: %s", item.doc_id, count)
+                result.update(status="failed", detail="Failed processing document.")
+            else:
+                result["status"] = "done"
+            results.append(result)
+
+        # --------------------------- Integration ---------------------------
+        frames = [count for count in counts if not isinstance(count, Exception)]
+        upsert_stats = {"rows": 0, "round_trips": 0}
+        if frames:
+            try:
+                upsert_stats = await EXECUTOR.run_io(
+                    save_phrases, merge_phrase_counts(frames), upsert_mode
+                )
+            except Exception as err:
+                logger.error("Failed saving batch.", exc_info=err)
+                for result in results:
+                    if result["status"] == "done":
+                        result.update(status="failed", detail="Failed saving phrases.")
+
+        logger.debug(
+            "Batch of %d documents done in %.3f Seconds (%d rows, %d round trips)",
+            len(results),
+            time() - s_tot,
+            upsert_stats["rows"],
+            upsert_stats["round_trips"],
+        )
+
+        return {"message": "Batch integration done.", "documents": results}
+
+    finally:
+        EXECUTOR.release(slots)
+
+
+async def iter_ndjson(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, Optional[BatchDocument], Optional[str]]]:
+    """Parsing NDJSON documents from body chunks as they arrive.
+
+    Args:
+        chunks: Request body chunks.
+
+    Yields:
+        Line number, parsed document or None and parsing error or None.
+    """
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield (line_no, *parse_ndjson_line(line))
+    if buffer.strip():
+        yield (line_no + 1, *parse_ndjson_line(buffer))
+
+
+def parse_ndjson_line(line: bytes) -> Tuple[Optional[BatchDocument], Optional[str]]:
+    """Parsing one NDJSON line into a document."""
+    try:
+        return BatchDocument(**json.loads(line)), None
+    except (ValueError, TypeError, ValidationError) as err:
+        return None, str(err).splitlines()[0]
+
+
+async def process_stream(
+    request: Request,
+    doc_type: str,
+    ngram_range: List[int],
+    upsert_mode: str,
+    batch_size: int,
+    window: int,
+) -> AsyncIterator[str]:
+    """Counting streamed documents & upserting them batch by batch.
+
+    At most ``window`` documents are counted at a time and the body is only
+    read as fast as they finish, so memory does not depend on the upload
+    size.
+
+    Yields:
+        NDJSON lines for failed documents, saved batches and the final totals.
+    """
+    in_flight: Deque[Tuple[Optional[str], asyncio.Future]] = deque()
+    batch_frames: list = []
+    batch_ids: List[Optional[str]] = []
+    totals = {"received": 0, "done": 0, "failed": 0, "rows": 0}
+
+    def to_line(payload: Dict[str, Any]) -> str:
+        return json.dumps(payload) + "\n"
+
+    async def collect() -> Optional[str]:
+        """Waiting for the oldest document in flight."""
+        doc_id, task = in_flight.popleft()
+        try:
+            batch_frames.append(await task)
+            batch_ids.append(doc_id)
+            return None
+        except Exception as err:
+            logger.error("Failed counting document %s: %s", doc_id, err)
+            totals["failed"] += 1
+            return to_line(
+                {
+                    "doc_id": doc_id,
+                    "status": "failed",
+                    "detail": "Failed processing document.",
+                }
+            )
+
+    async def flush() -> Optional[str]:
+        """Upserting merged counts of the current batch."""
+        if not batch_frames:
+            return None
+        try:
+            upsert_stats = await EXECUTOR.run_io(
+                save_phrases, merge_phrase_counts(batch_frames), upsert_mode
+            )
+        except Exception as err:
+            logger.error("Failed saving streamed batch.", exc_info=err)
+            totals["failed"] += len(batch_ids)
+            line = to_line(
+                {
+                    "doc_ids": batch_ids,
+                    "status": "failed",
+                    "detail": "Failed saving phrases.",
+                }
+            )
+        else:
+            totals["done"] += len(batch_ids)
+            totals["rows"] += upsert_stats["rows"]
+            line = to_line({"progress": dict(totals)})
+        batch_frames.clear()
+        batch_ids.clear()
+        return line
+
+    try:
+        async for line_no, item, error in iter_ndjson(request.stream()):
+            totals["received"] += 1
+            if item is None:
+                totals["failed"] += 1
+                yield to_line({"line": line_no, "status": "failed", "detail": error})
+                continue
+
+            task = asyncio.ensure_future(
+                EXECUTOR.run_cpu(count_phrases, item.document, doc_type, ngram_range)
+            )
+            in_flight.append((item.doc_id, task))
+
+            if len(in_flight) >= window:
+                line = await collect()
+                if line:
+                    yield line
+            if len(batch_frames) >= batch_size:
+                yield await flush()
+
+        while in_flight:
+            line = await collect()
+            if line:
+                yield line
+        line = await flush()
+        if line:
+            yield line
+
+        yield to_line({"message": "Stream integration done.", **totals})
+
+    finally:
+        for _, task in in_flight:
+            task.cancel()
+
+
+@router.post(
+    "/api/doc-process/stream",
+    tags=["Document Process"],
+    status_code=200,
+    response_class=BodyStreamingResponse,
+)
+async def process_document_stream(
+    request: Request,
+    doc_type: str = Query("TEXT", enum=["TEXT", "HTML", "URL"]),
+    ngram_range: str = "1,5",
+    batch_size: int = Query(100, ge=1, le=MAX_BATCH_DOCUMENTS),
+    upsert_mode: str = Query("batch", enum=["batch", "single"]),
+) -> BodyStreamingResponse:
+    """**Processing an NDJSON stream of documents.**
+
+    The body holds one JSON document per line, same as the items of
+    `/api/doc-process/batch`. Documents are counted while the body is being
+    uploaded and phrase counts are upserted every **batch_size** documents.
+
+    **Response:** NDJSON lines, one per failed document, one `progress` line
+    per saved batch and a final line with totals. The stream takes one queue
+    slot per document counted at a time, up to half of the queue, and is
+    rejected with 503 if they are not free.
+
+    **Body Example**: <br>
+    ```
+    {"document": "<p> hello world </p>", "doc_id": "1", "sitename": "site"}
+    {"document": "<p> hello there </p>", "doc_id": "2", "sitename": "site"}
+    ```
+    """
+    try:
+        ngram_range = list(map(int, ngram_range.split(",")))
+    except ValueError as err:
+        raise HTTPException(status_code=400, detail="Invalid ngram_range.") from err
+
+    # Two documents per worker process are counted at a time
+    window = admit_jobs(max(EXECUTOR.cpu_workers, 1) * 2)
+
+    return BodyStreamingResponse(
+        process_stream(request, doc_type, ngram_range, upsert_mode, batch_size, window),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(EXECUTOR.release, window),
+    )
@@ -1,15 +1,32 @@
 """Updating the status of the phrase (highlight, stop) based on input."""
-from typing import Dict
+from typing import Any, Dict, List, Literal
 
 from fastapi import APIRouter, HTTPException
-from lib.db import update_status
+from lib.db import update_status, update_statuses
+from pydantic import BaseModel
 
 # ------------------------------ Initialization -------------------------------
 router = APIRouter()
 
+# Maximum number of phrases in a bulk update
+MAX_BULK_UPDATES = 10000
+
 # ---------------------------- function definition ----------------------------
 
 
+class StatusUpdate(BaseModel):
+    """Single phrase of the bulk status-updater payload."""
+
+    phrase: str
+    status: Literal["highlight", "stop"]
+
+
+class StatusUpdateBatch(BaseModel):
+    """Schema for payload in bulk status-updater endpoint."""
+
+    updates: List[StatusUpdate]
+
+
 @router.post(
     "/api/status-updater/{phrase}/{status_code}",
     response_model=dict,
@@ -48,3 +65,46 @@ async def read_phrase_status(phrase: str, status_code: int) -> Dict[str, str]:
 
     except Exception as err:
         raise HTTPException(status_code=400) from err
+
+
+@router.post(
+    "/api/status-updater/bulk",
+    response_model=dict,
+    tags=["Status Updater"],
+    status_code=201,
+)
+def update_phrase_statuses(batch: StatusUpdateBatch) -> Dict[str, Any]:
+    """**Updating statuses of many phrases in one request.**
+
+    All phrases are updated in a single database statement.
+
+    **Response:** `found` of each phrase is `false` if it does not exist in
+    database, in which case nothing is updated for it.
+
+    **Payload Example**: <br>
+    ```
+    {
+        "updates": [
+            {"phrase": "tehran", "status": "highlight"},
+            {"phrase": "of the", "status": "stop"}
+        ]
+    }
+    ```
+    """
+    if len(batch.updates) > MAX_BULK_UPDATES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BULK_UPDATES} phrases are allowed.",
+        )
+
+    found = update_statuses([(item.phrase, item.status) for item in batch.updates])
+    results = [
+        {"phrase": item.phrase, "status": item.status, "found": item_found}
+        for item, item_found in zip(batch.updates, found)
+    ]
+
+    return {
+        "results": results,
+        "updated": sum(found),
+        "not_found": len(found) - sum(found),
+    }
@@ -1,34 +1,29 @@
 """Document processor Endpoint."""
-from typing import Dict
+from typing import Any, Dict, List
 
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
 from phrase_api.logger import LoggerSetup
 
-from lib.status_updater import (
-    get_named_entities, get_stop_words_regex
-)
-from phrase_api.lib.frequent_remover import freq_regex
+from phrase_api.lib.dictionaries import get_dictionaries
 
 from phrase_counter.word_graph import generate_word_graph
 
 from phrase_api.lib.db import integrate_word_data, integrate_word_edge_data
+from phrase_api.lib.doc_pipeline import build_edge_frame
 
-from phrase_api.lib.status_updater import status_detector
+from phrase_api.lib.status_updater import detect_statuses
+from phrase_api.lib.word_graph import WORD_GRAPH, Adjacency
 import os
 
 
 # ------------------------------ Initialization -------------------------------
 router = APIRouter()
 LOGGER = LoggerSetup(__name__, "debug").get_minimal()
-
-NE_LIST = get_named_entities()
-STOP_PATTERN = get_stop_words_regex()
-
-# Frequents
-FREQ_NE, FREQ_STOPS = freq_regex("ne"), freq_regex("stop")
+# Words or edges sent in each UPSERT query
+WORD_GRAPH_BATCH_SIZE = int(os.getenv("WORD_GRAPH_BATCH_SIZE") or 5000)
 
 
 # ---------------------------- function definition ----------------------------
@@ -68,30 +63,21 @@ async def process_word_graph(
         LOGGER.info("Generated word graph dataframes.")
 
         # ----------------------- Edge dataframe manipulation -----------------------
-        # Adding _key value
-        rel_df["_key"] = [
-            f"{_from}_{_to}" for _from, _to in zip(rel_df["_from"], rel_df["_to"])
-        ]
-        # Adding vertex collection name to the begining of the _from & _to columns
-        rel_df["_from"] = [
-            f"{os.getenv('WORD_COLLECTION')}/{_from}" for _from in rel_df["_from"]]
-        rel_df["_to"] = [
-            f"{os.getenv('WORD_COLLECTION')}/{_to}" for _to in rel_df["_to"]]
+        rel_df = build_edge_frame(rel_df, os.getenv("WORD_COLLECTION"))
 
         # ----------------------------- Status Detection -----------------------------
-        word_df["status"] = [
-            status_detector(
-                word, STOP_PATTERN, NE_LIST
-            ) for word in word_df["word"]
-        ]
+        dictionaries = get_dictionaries()
+        word_df["status"] = detect_statuses(
+            word_df["word"], dictionaries.stop_matcher, dictionaries.ne_set
+        )
 
         LOGGER.info("Integrating words.")
 
-        integrate_word_data(word_df)
+        integrate_word_data(word_df, batch_size=WORD_GRAPH_BATCH_SIZE)
 
         LOGGER.info("Integrating word relations.")
 
-        integrate_word_edge_data(rel_df)
+        integrate_word_edge_data(rel_df, batch_size=WORD_GRAPH_BATCH_SIZE)
 
         LOGGER.info("Finished creating word graph.")
 
@@ -106,3 +92,97 @@ async def process_word_graph(
     except Exception as err:
         LOGGER.error(err)
         raise HTTPException(status_code=400) from err
+
+
+# ------------------------------- Read endpoints -------------------------------
+def find_word(adjacency: Adjacency, word: str) -> int:
+    """Id of the word in the adjacency, 404 if it has no edges."""
+    node = adjacency.node(word)
+    if node is None:
+        raise HTTPException(status_code=404, detail="no-word")
+    return node
+
+
+def describe(adjacency: Adjacency, node: int) -> Dict[str, Any]:
+    """Word & hash of a node."""
+    return {"word": adjacency.words[node], "word_hash": adjacency.hashes[node]}
+
+
+@router.get("/api/word-graph/neighbors", response_model=dict, tags=["Word Graph"])
+def read_neighbors(word: str, limit: int = Query(10, ge=1, le=1000)) -> Dict[str, Any]:
+    """**Words following the given word most often.**
+
+    Served from the in-memory adjacency of this worker, which picks up new
+    edges every `WORD_GRAPH_REFRESH` seconds.
+
+    **Arguments:**
+
+    * **word**: Word to look up.
+
+    * **limit**: Maximum number of neighbors, by edge count descending.
+    """
+    adjacency = WORD_GRAPH.get()
+    node = find_word(adjacency, word)
+    neighbors: List[Dict[str, Any]] = [
+        {**describe(adjacency, neighbor), "count": count}
+        for neighbor, count in adjacency.neighbors(node, limit)
+    ]
+    return {**describe(adjacency, node), "neighbors": neighbors}
+
+
+@router.get("/api/word-graph/expand", response_model=dict, tags=["Word Graph"])
+def read_expansion(
+    word: str,
+    hops: int = Query(2, ge=1, le=5),
+    limit: int = Query(10, ge=1, le=100),
+    max_nodes: int = Query(1000, ge=1, le=100000),
+) -> Dict[str, Any]:
+    """**Words reachable from the given word in a few hops.**
+
+    **Arguments:**
+
+    * **word**: Start word.
+
+    * **hops**: Maximum distance.
+
+    * **limit**: Top neighbors followed from every word.
+
+    * **max_nodes**: Maximum number of words returned.
+    """
+    adjacency = WORD_GRAPH.get()
+    node = find_word(adjacency, word)
+    depths = adjacency.expand(node, hops=hops, limit=limit, max_nodes=max_nodes)
+    return {
+        **describe(adjacency, node),
+        "nodes": [
+            {**describe(adjacency, reached), "hops": depth}
+            for reached, depth in depths.items()
+        ],
+    }
+
+
+@router.get("/api/word-graph/path", response_model=dict, tags=["Word Graph"])
+def read_path(
+    source: str, target: str, max_hops: int = Query(6, ge=1, le=10)
+) -> Dict[str, Any]:
+    """**Strongest path between two words.**
+
+    Every edge costs `1 / count`, the path with the lowest total cost of at
+    most `max_hops` edges is returned.
+
+    **Arguments:**
+
+    * **source**: Start word.
+
+    * **target**: End word.
+
+    * **max_hops**: Maximum number of edges in the path.
+    """
+    adjacency = WORD_GRAPH.get()
+    result = adjacency.weighted_path(
+        find_word(adjacency, source), find_word(adjacency, target), max_hops
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="no-path")
+    path, cost = result
+    return {"path": [describe(adjacency, node) for node in path], "cost": cost}
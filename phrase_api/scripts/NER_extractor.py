@@ -1,48 +1,80 @@
 # [\u0600-\u06FF]+(\s|\|)(\w+\-?(\w+)?) Final maybe
+from typing import Iterable, Iterator, List, Set
+
 import re
 import os
 from cleaning_utils import replace_arabic_char
 import pandas as pd
-from hashlib import sha256
 import multiprocessing as mp
 from phrase_api.logger import LoggerSetup
-from phrase_api.lib.db import arango_connection
-from arango.exceptions import AQLQueryExecuteError
+from phrase_api.lib.connection import get_database
+from phrase_api.lib.keys import phrase_keys
+from phrase_api.lib.retry import DEAD_LETTERS, execute_with_retry
 
 LOGGER = LoggerSetup("NER-Extractor", "info").get_minimal()
 
+NE_PATTERN = re.compile(r"[\u0600-\u06FF]+(\s|\|)(\w+\-?(\w+)?)")
+NE_TAG_PREFIXES = ("I", "B", "E", "S")
+
+NE_INSERT_QUERY = """
+FOR item IN @batch
+    INSERT item INTO @@ner_col OPTIONS { overwriteMode: "ignore" }
+"""
+
+
+def iter_ne_words(lines: Iterable[str]) -> Iterator[str]:
+    """Named entities of NER lines, each distinct word once.
 
-def fetch_ner_file(file_name):
-    """Reading ner file."""
-    with open(file_name, encoding="utf-8") as ner_file:
-        ner_text = ner_file.read()
+    Lines are matched one at a time, so memory is bounded by the number of
+    distinct words and not by the file size.
 
-    return ner_text
+    Args:
+        lines: Lines of a NER file, e.g. an open file.
+
+    Yields:
+        Normalized words tagged as named entity.
+    """
+    seen_raw: Set[str] = set()
+    seen: Set[str] = set()
+    for line in lines:
+        for match in NE_PATTERN.finditer(line):
+            parts = clean_ne_records(match.group()).split(" ")
+            if len(parts) != 2:
+                continue
+            raw_ne, type_ne = parts
+            if type_ne == "O" or not type_ne.startswith(NE_TAG_PREFIXES):
+                continue
+            if raw_ne in seen_raw:
+                continue
+            seen_raw.add(raw_ne)
+            word = replace_arabic_char(raw_ne)
+            if word not in seen:
+                seen.add(word)
+                yield word
+
+
+def iter_ne_batches(
+    lines: Iterable[str], batch_size: int = 10000
+) -> Iterator[pd.DataFrame]:
+    """Dataframes of at most batch_size distinct NE words with their hashes."""
+    words: List[str] = []
+    for word in iter_ne_words(lines):
+        words.append(word)
+        if len(words) == batch_size:
+            yield ne_frame(words)
+            words = []
+    if words:
+        yield ne_frame(words)
+
+
+def ne_frame(words: List[str]) -> pd.DataFrame:
+    """Dataframe of words and their hashes, hashed in one pass."""
+    return pd.DataFrame({"word": words, "word_hash": phrase_keys(words)})
 
 
 def process_ner_file(raw_ne: str):
     """Create dataframe of NE from the ner file."""
-    # ------------------- Fetch Records -------------------
-    pattern = re.compile(r"[\u0600-\u06FF]+(\s|\|)(\w+\-?(\w+)?)")
-    ne_regex = re.finditer(pattern, raw_ne)
-    ne_records_part = [match.group() for match in ne_regex]
-    # ------------------- Records Cleaning -------------------
-    cleaned_ne_records = [clean_ne_records(record) for record in ne_records_part]
-    # ------------------- Text Part Fetching & Cleaning -------------------
-    ne_record = set([
-        replace_arabic_char(ne) for ne, type_ne in (
-            record_part.split(" ") for record_part in cleaned_ne_records
-            if len(record_part.split(" ")) == 2
-        ) if type_ne != "O" and type_ne.startswith(("I", "B", "E", "S"))
-    ])
-
-    # ------------------- Dataframe Creation -------------------
-    df = pd.DataFrame(ne_record, columns=["word"])
-    df["word_hash"] = df.apply(
-        lambda row: sha256(row["word"].encode()).hexdigest(), axis=1
-    )
-
-    return df
+    return ne_frame(list(iter_ne_words(raw_ne.splitlines())))
 
 
 def clean_ne_records(record: str):
@@ -53,45 +85,44 @@ def clean_ne_records(record: str):
     return record
 
 
-def upsert_results(df: pd.DataFrame):
-    """Integrating results in arangodb."""
-    ner_col = os.getenv("NER_COLLECTION")
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
-    client = arango_connection()
-    phrase_db = client.db(database, username=username, password=password)
-    for row in df.iterrows():
-        row = row[1]
-
-        bind_vars = {
-            "word_hash": row["word_hash"],
-            "word": row["word"],
-            "@ner_col": ner_col
-        }
-
-        query = """
-            INSERT {"_key": @word_hash, "word": @word}
-            INTO @@ner_col OPTIONS { overwriteMode: "ignore" }
-            """
-        try:
-            phrase_db.aql.execute(query=query, bind_vars=bind_vars)
-        except AQLQueryExecuteError:
-            LOGGER.info("Failed because of lock error. Continuing.")
-            return
+def upsert_results(df: pd.DataFrame) -> int:
+    """Integrating results in arangodb in one statement.
+
+    Returns:
+        Number of words sent, existing words are left untouched.
+    """
+    records = [
+        {"_key": word_hash, "word": word}
+        for word, word_hash in zip(df["word"], df["word_hash"])
+    ]
+    if not records:
+        return 0
+    phrase_db = get_database()
+    try:
+        execute_with_retry(
+            "ner-insert",
+            lambda: phrase_db.aql.execute(
+                NE_INSERT_QUERY,
+                bind_vars={"@ner_col": os.getenv("NER_COLLECTION"), "batch": records},
+            ),
+        )
+    except Exception as err:
+        return len(records) - DEAD_LETTERS.write("ner-insert", records, err)
+    return len(records)
 
 
 def process_ner(file_path: str):
     """Main function for processing ner and integrating results"""
+    words = 0
     try:
-        ner_text = fetch_ner_file(file_path)
-        dataframe = process_ner_file(ner_text)
-        upsert_results(dataframe)
+        with open(file_path, encoding="utf-8") as ner_file:
+            for dataframe in iter_ne_batches(ner_file):
+                words += upsert_results(dataframe)
     except Exception as err:
         LOGGER.error("Failed processing ner file: %s", file_path, exc_info=err)
         return
 
-    LOGGER.info("Finished processing NER file: %s", file_path)
+    LOGGER.info("Finished processing NER file: %s (%d words)", file_path, words)
 
 
 def ner_handler(data_path: str, n_jobs=mp.cpu_count() - 4):
@@ -116,7 +147,7 @@ def ner_handler(data_path: str, n_jobs=mp.cpu_count() - 4):
         pool.starmap(
             process_ner,
             zip(
-                (data_path + file_path for file_path in ner_files),
+                (os.path.join(data_path, file_path) for file_path in ner_files),
             ),
         )
 
@@ -1,134 +1,307 @@
 """Suggested stop cli endpoint."""
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
 from math import ceil
 import multiprocessing as mp
-from phrase_api.lib.db import arango_connection
-from hashlib import sha256
+from phrase_api.lib.checkpoint import CheckpointStore
+from phrase_api.lib.connection import get_database
+from phrase_api.lib.keys import phrase_keys
+from phrase_api.lib.retry import DEAD_LETTERS, execute_with_retry
 import os
+from time import time
 from phrase_api.logger import LoggerSetup
 
 
 LOGGER = LoggerSetup("NER-Finder", "info").get_minimal()
 
+# Records without status of a key range, taken in key order after the last
+# processed key. ``@end`` of the last partition is above every key.
+DOC_FETCH_QUERY = """
+for doc in @@agg_collection
+    filter doc._key >= @start and doc._key < @end and doc._key > @after
+    filter doc.status == null
+    sort doc._key
+    limit @chunk_size
+    return {_key: doc._key, bag: doc.bag}
+"""
+KEY_RANGE_END = "~"
+
+NE_KEYS_QUERY = """
+for doc in @@ner_collection
+    return doc._key
+"""
+
+TAG_QUERY = """
+for phrase_hash in @keys
+    update {_key: phrase_hash} with {status: "suggested-highlight"}
+        in @@agg_collection
+"""
+
+# Word hashes of NER_COLLECTION, loaded once per worker by ``init_ne_search``
+_NE_HASHES: Dict[str, FrozenSet[str]] = {}
+
+
+def load_ne_hashes(batch_size: int = 50000) -> FrozenSet[str]:
+    """Fetching word hashes of all named entities in one streamed query."""
+    cursor = get_database().aql.execute(
+        NE_KEYS_QUERY,
+        bind_vars={"@ner_collection": os.getenv("NER_COLLECTION")},
+        batch_size=batch_size,
+        stream=True,
+    )
+    try:
+        return frozenset(cursor)
+    finally:
+        cursor.close(ignore_missing=True)
+
+
+def init_ne_search(ne_hashes: Optional[FrozenSet[str]] = None) -> None:
+    """Setting named entities used by ``tag_suggested_highlight`` in a process.
+
+    Args:
+        ne_hashes: Word hashes of named entities. Fetched if not given.
+    """
+    _NE_HASHES["words"] = (
+        ne_hashes if ne_hashes is not None else load_ne_hashes()
+    )
+
+
+def partition_bounds(n_partitions: int) -> List[Tuple[str, str]]:
+    """Splitting the key space into ranges of about the same size.
+
+    Keys are sha256 hex digests, so equal ranges of hex prefixes hold about
+    the same number of records.
+
+    Args:
+        n_partitions: Number of ranges.
+
+    Returns:
+        Inclusive start & exclusive end key of every range.
+    """
+    starts = [""] + [
+        format(index * 16 ** 8 // n_partitions, "08x")
+        for index in range(1, n_partitions)
+    ]
+    return list(zip(starts, starts[1:] + [KEY_RANGE_END]))
+
 
 def tag_handler(
-    max_records: int,
     chunk_size: int = 1000,
-    n_jobs: int = mp.cpu_count() - 2
+    n_jobs: int = mp.cpu_count() - 2,
+    partition_size: int = 100000,
+    checkpoint_dir: Optional[str] = None,
+    restart: bool = False,
 ):
     """Main handler for tagging suggested-highlight status
 
+    The aggregated collection is split into key ranges of about
+    ``partition_size`` records. Progress of every range is checkpointed, so
+    an interrupted run continues where it stopped. Checkpoints are dropped
+    once every range is done, so the next run scans the collection again.
+
     Args:
-        max_record: Maximum number of records present in aggregated collection.
-        chunk_size: Number of record to fetch in each process.
+        chunk_size: Number of record to fetch in each query.
         n_jobs: N processes to run on.
+        partition_size: Approximate number of records in each key range.
+        checkpoint_dir: Directory of checkpoints. Defaults to
+            ``NE_SEARCH_CHECKPOINT_DIR`` or ``checkpoints/search-NE``.
+        restart: Dropping checkpoints of interrupted runs.
     """
     LOGGER.info("Starting NE Search process.")
+    agg_collection = os.getenv("AGG_PHRASE_COL")
+    checkpoint_dir = (
+        checkpoint_dir
+        or os.getenv("NE_SEARCH_CHECKPOINT_DIR")
+        or "checkpoints/search-NE"
+    )
+    store = CheckpointStore(checkpoint_dir)
+    if restart:
+        store.clear()
 
-    offset_times = ceil(max_records / chunk_size)
-    offset_list = [offset * chunk_size for offset in range(offset_times)]
+    layout = store.read("layout")
+    if layout is None or layout["collection"] != agg_collection:
+        store.clear()
+        total = get_database().collection(agg_collection).count()
+        n_partitions = max(n_jobs, ceil(total / partition_size), 1)
+        layout = {
+            "collection": agg_collection,
+            "bounds": partition_bounds(n_partitions),
+        }
+        store.write("layout", layout)
+        LOGGER.info("Split %d records into %d partitions.", total, n_partitions)
+    else:
+        LOGGER.info("Resuming %d partitions.", len(layout["bounds"]))
 
-    LOGGER.info("A total number of %d jobs needs to be completed.", len(offset_list))
+    # Loaded once here, workers get the set when the pool starts
+    ne_hashes = load_ne_hashes()
+    LOGGER.info("Loaded %d named entities.", len(ne_hashes))
 
-    pool = mp.Pool(n_jobs)
+    pool = mp.Pool(n_jobs, initializer=init_ne_search, initargs=(ne_hashes,))
 
     LOGGER.info("Running on %d processes.", n_jobs)
 
-    pool.starmap(
-        tag_suggested_highlight,
-        zip(
-            (offset for offset in offset_list),
-            (chunk_size for _ in range(len(offset_list)))
-        ),
-    )
+    s_run = time()
+    scanned, tagged, failed = 0, 0, 0
+    jobs = [
+        (index, start, end, chunk_size, checkpoint_dir)
+        for index, (start, end) in enumerate(layout["bounds"])
+    ]
+    for stats in pool.imap_unordered(_run_partition, jobs):
+        scanned += stats["scanned"]
+        tagged += stats["tagged"]
+        failed += stats["failed"]
+        elapsed = time() - s_run
+        LOGGER.info(
+            "%d records scanned, %d tagged (%.0f records/s).",
+            scanned,
+            tagged,
+            scanned / elapsed if elapsed else 0,
+        )
+    pool.close()
+    pool.join()
+
+    if failed:
+        LOGGER.error("%d partitions failed, run again to resume them.", failed)
+    else:
+        store.clear()
     LOGGER.info("Suggested highlight tagging(NE Search) process finished.")
 
 
-def tag_suggested_highlight(
-    offset: int,
-    chunk_size: int
-):
-    """Tagging records that are Named Entity."""
-    agg_collection = os.getenv("AGG_PHRASE_COL")
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
+def _run_partition(job: tuple) -> Dict[str, int]:
+    """Unpacking pool job of ``tag_partition``."""
+    return tag_partition(*job)
+
+
+def tag_partition(
+    index: int,
+    start: str,
+    end: str,
+    chunk_size: int,
+    checkpoint_dir: str,
+) -> Dict[str, int]:
+    """Tagging records of a key range that are Named Entity.
+
+    Args:
+        index: Partition number, names its checkpoint.
+        start: Inclusive start key.
+        end: Exclusive end key.
+        chunk_size: Number of record to fetch in each query.
+        checkpoint_dir: Directory of checkpoints.
+
+    Returns:
+        Records scanned & tagged in this run and whether it failed.
+    """
+    if "words" not in _NE_HASHES:
+        init_ne_search()
+    store = CheckpointStore(checkpoint_dir)
+    name = f"partition-{index:05d}"
+    state = store.read(name) or {"after": "", "done": False}
+    stats = {"scanned": 0, "tagged": 0, "failed": 0}
+    if state["done"]:
+        return stats
+
+    s_part = time()
     try:
-        client = arango_connection()
-        phrase_db = client.db(database, username=username, password=password)
-
-        doc_fetch_query = """
-        for doc in @@agg_collection
-            limit @offset, @chunk_size
-            filter doc.status == null
-            return doc
-        """
-        bind_parameters = {
-            "@agg_collection": agg_collection,
-            "offset": offset,
-            "chunk_size": chunk_size
-        }
+        while True:
+            records = fetch_chunk(start, end, state["after"], chunk_size)
+            if not records:
+                state["done"] = True
+                store.write(name, state)
+                break
 
-        # Fetching Records
-        records = phrase_db.aql.execute(
-            doc_fetch_query,
-            bind_vars=bind_parameters
-        )
-        records = list(records)
-
-        # For every record if it is NE update status if not do nothing
-        update_status_query = """
-            UPDATE {_key: @phrase_hash} with {status: "suggested-highlight"}\
-                 IN @@agg_collection
-        """
-        for record in records:
-            if check_ner(record["bag"], phrase_db):
-                bind_pars = {
-                    "@agg_collection": agg_collection,
-                    "phrase_hash": record["_key"]
-                }
-                phrase_db.aql.execute(
-                    update_status_query,
-                    bind_vars=bind_pars
-                )
+            stats["tagged"] += tag_suggested_highlight(records)
+            stats["scanned"] += len(records)
+            state["after"] = records[-1]["_key"]
+            store.write(name, state)
 
     except Exception as err:
-        LOGGER.error("Failed Processing for offset %d", offset, exc_info=err)
-        return
+        LOGGER.error("Failed processing partition %d.", index, exc_info=err)
+        stats["failed"] = 1
 
-    LOGGER.info("Finished processing offset %d", offset)
+    elapsed = time() - s_part
+    LOGGER.info(
+        "Partition %d: %d records in %.1f s (%.0f records/s), %d tagged.",
+        index,
+        stats["scanned"],
+        elapsed,
+        stats["scanned"] / elapsed if elapsed else 0,
+        stats["tagged"],
+    )
+    return stats
 
 
-def check_ner(
-    phrase: str,
-    phrase_db
-):
-    """Breaking phrase and checking each word for if it is NE or not.
+def fetch_chunk(
+    start: str, end: str, after: str, chunk_size: int
+) -> List[Dict[str, str]]:
+    """Records without status of a key range following the ``after`` key."""
+    cursor = get_database().aql.execute(
+        DOC_FETCH_QUERY,
+        bind_vars={
+            "@agg_collection": os.getenv("AGG_PHRASE_COL"),
+            "start": start,
+            "end": end,
+            "after": after,
+            "chunk_size": chunk_size,
+        },
+        batch_size=chunk_size,
+    )
+    return list(cursor)
+
+
+def tag_suggested_highlight(records: List[Dict[str, str]]) -> int:
+    """Tagging records that are Named Entity.
 
     Args:
-        phrase: Phrase fetched from aggregated collection. Can be more than 1 word.
-        phrase_db: Arango client.
+        records: Records with ``_key`` & ``bag``.
 
     Returns:
-        True if all words of phrase are NE else False.
-    """
-    ner_collection = os.getenv("NER_COLLECTION")
-    words = [sha256(word.encode()).hexdigest() for word in phrase.split(" ")]
-    ner_query = """
-        for doc in @@ner_collection
-            filter doc._key == @word_hash
-            return doc
+        Number of tagged records.
     """
-    for word in words:
-        bind_pars = {
-            "@ner_collection": ner_collection,
-            "word_hash": word
-        }
-        res = phrase_db.aql.execute(
-            ner_query,
-            bind_vars=bind_pars
+    agg_collection = os.getenv("AGG_PHRASE_COL")
+    ne_keys = find_ner(records, _NE_HASHES["words"])
+    if not ne_keys:
+        return 0
+
+    phrase_db = get_database()
+    try:
+        execute_with_retry(
+            "suggested-highlight",
+            lambda: phrase_db.aql.execute(
+                TAG_QUERY,
+                bind_vars={"@agg_collection": agg_collection, "keys": ne_keys},
+            ),
+        )
+    except Exception as err:
+        DEAD_LETTERS.write(
+            "suggested-highlight", [{"_key": key} for key in ne_keys], err
         )
-        res = list(res)
-        if not res:
-            return False
+        return 0
+    return len(ne_keys)
 
-    return True
+
+def find_ner(
+    records: Iterable[Dict[str, str]], ne_hashes: FrozenSet[str]
+) -> List[str]:
+    """Keys of records whose phrases are Named Entity.
+
+    Every distinct word of the chunk is hashed once.
+
+    Args:
+        records: Records with ``_key`` & ``bag``.
+        ne_hashes: Word hashes of named entities.
+
+    Returns:
+        Keys of records all of whose words are named entities.
+    """
+    records = list(records)
+    words = list({word for record in records for word in record["bag"].split(" ")})
+    ne_words = {
+        word
+        for word, word_hash in zip(words, phrase_keys(words))
+        if word_hash in ne_hashes
+    }
+    return [
+        record["_key"]
+        for record in records
+        if all(word in ne_words for word in record["bag"].split(" "))
+    ]
@@ -1,13 +1,66 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
 import os
+from datetime import datetime
+from functools import partial
+from time import time
 
-from phrase_api.lib.db import arango_connection
+from phrase_api.lib.connection import get_database
+from phrase_api.lib.keys import phrase_key
+from phrase_api.lib.retry import DEAD_LETTERS, execute_with_retry
 import multiprocessing as mp
 from phrase_api.logger import LoggerSetup
-from arango.exceptions import AQLQueryExecuteError
-from time import sleep
 
 LOGGER = LoggerSetup("Chunk-AGG", "info").get_minimal()
 
+DOC_FETCH_QUERY = """
+for doc in @@phrase_collection
+    filter doc.sitename == @sitename AND doc.doc_id == @doc_id
+    return doc
+"""
+
+# Aggregates not yet aggregated records of several documents server-side and
+# marks them in the same transaction, so a record is never counted twice.
+# Documents found are returned whether they were aggregated before or not.
+BULK_AGGREGATE_QUERY = """
+let records = (
+    for doc in @@phrase_collection
+        filter doc.sitename == @sitename AND doc.doc_id IN @doc_ids
+        return keep(
+            doc, "_key", "doc_id", "agg_status",
+            "phrase_hash", "bag", "count", "status", "length"
+        )
+)
+let pending = records[* FILTER CURRENT.agg_status != 1]
+let marked = (
+    for record in pending
+        update {_key: record._key} with {"agg_status": 1} in @@phrase_collection
+        return 1
+)
+let upserted = (
+    for record in pending
+        collect phrase_hash = record.phrase_hash
+        aggregate total = SUM(record.count), bag = MAX(record.bag),
+            status = MAX(record.status), length = MAX(record.length)
+        upsert {"_key": phrase_hash}
+            insert {"_key": phrase_hash, "bag": bag, "count": total,
+            "status": status, "length": length}
+            update {"count": OLD.count + total}
+        in @@agg_collection
+        return 1
+)
+return {
+    records: LENGTH(marked),
+    phrases: LENGTH(upserted),
+    doc_ids: UNIQUE(records[*].doc_id)
+}
+"""
+AGG_MODES = ("bulk", "incremental", "record")
+
+# IDs before the watermark checked again by incremental runs, one ingest batch,
+# since parallel ingest batches and write buffering can save documents late
+INCREMENTAL_LOOKBACK = 100
+
 
 def aggregation_handler(
     cli_args,
@@ -17,6 +70,32 @@ def aggregation_handler(
     Args:
         cli_args: Arguments through CLI wrapper.
     """
+    sitename = cli_args["sitename"]
+    mode = cli_args.get("mode") or "bulk"
+    if mode not in AGG_MODES:
+        raise ValueError(f"Unknown aggregation mode: {mode}")
+    docs_per_batch = int(cli_args.get("docs_per_batch") or 100)
+
+    if mode == "incremental":
+        num_threads = max(mp.cpu_count() - 4, 2)
+        pool = mp.Pool(num_threads)
+        incremental_aggregate(
+            pool,
+            sitename,
+            n_jobs=num_threads,
+            docs_per_batch=docs_per_batch,
+            max_gap=int(cli_args.get("max_gap") or 1000),
+            lookback=(
+                INCREMENTAL_LOOKBACK
+                if cli_args.get("lookback") is None
+                else int(cli_args["lookback"])
+            ),
+            since_id=cli_args.get("since_id"),
+        )
+        pool.close()
+        pool.join()
+        return
+
     if cli_args["IDList"] is None and cli_args["maxID"] is None:
         raise Exception("No max id or id list is given.")
     elif cli_args["IDList"] is None:
@@ -26,21 +105,205 @@ def aggregation_handler(
         max_records = len(cli_args["IDList"])
         doc_id_list = (doc_id for doc_id in cli_args["IDList"])
 
-    sitename = cli_args["sitename"]
     num_threads = max(mp.cpu_count() - 4, 2)
     LOGGER.info(
         "Starting chunk aggregator process on %d threads(processes).", num_threads
     )
 
     pool = mp.Pool(num_threads)
-    pool.starmap(
-        chunk_aggregate,
-        zip(
-            (sitename for _ in range(max_records + 1)),
-            doc_id_list
+    if mode == "bulk":
+        s_run = time()
+        aggregated = sum(
+            result["records"]
+            for result in pool.starmap(
+                bulk_aggregate,
+                (
+                    (sitename, doc_ids)
+                    for doc_ids in _doc_batches(doc_id_list, docs_per_batch)
+                ),
+            )
+        )
+        elapsed = time() - s_run
+        LOGGER.info(
+            "Aggregated %d records in %.1f s (%.0f records/s).",
+            aggregated,
+            elapsed,
+            aggregated / elapsed if elapsed else 0,
+        )
+    else:
+        pool.starmap(
+            chunk_aggregate,
+            zip(
+                (sitename for _ in range(max_records + 1)),
+                doc_id_list
+            ),
+        )
+    LOGGER.info("Chunk aggregator process finished.")
+
+
+def _doc_batches(doc_ids, size: int) -> Iterator[List[str]]:
+    """Splitting document ids into lists of at most size ids."""
+    batch: List[str] = []
+    for doc_id in doc_ids:
+        batch.append(str(doc_id))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_aggregate(sitename: str, doc_ids: Sequence[str]) -> Dict[str, Any]:
+    """Aggregating phrases of several documents in one query.
+
+    Counts are summed per phrase hash on the server and upserted in bulk,
+    records are marked with ``agg_status`` in the same transaction.
+
+    Args:
+        sitename: name of the site
+        doc_ids: IDs of the documents
+
+    Returns:
+        Number of aggregated records & phrases, IDs of documents found and
+        whether the query failed.
+    """
+    bind_parameters = {
+        "@phrase_collection": os.getenv("PHRASE_COLLECTION"),
+        "@agg_collection": os.getenv("AGG_PHRASE_COL"),
+        "sitename": sitename,
+        "doc_ids": list(doc_ids),
+    }
+    try:
+        phrase_db = get_database()
+        cursor = execute_with_retry(
+            "chunk-aggregate",
+            partial(
+                phrase_db.aql.execute,
+                BULK_AGGREGATE_QUERY,
+                bind_vars=bind_parameters,
+            ),
+        )
+        result = {**next(cursor), "failed": False}
+    except Exception as err:
+        LOGGER.error(
+            "Failed aggregating doc IDs %s to %s, sitename %s.",
+            doc_ids[0],
+            doc_ids[-1],
+            sitename,
+            exc_info=err
+        )
+        DEAD_LETTERS.write(
+            "chunk-aggregate", [{"sitename": sitename, "doc_ids": list(doc_ids)}], err
+        )
+        return {"records": 0, "phrases": 0, "doc_ids": [], "failed": True}
+
+    LOGGER.info(
+        "Aggregated %d records of doc IDs %s to %s (sitename = %s)",
+        result["records"],
+        doc_ids[0],
+        doc_ids[-1],
+        sitename,
+    )
+    return result
+
+
+# ------------------------------ Incremental mode ------------------------------
+def read_watermark(sitename: str) -> Optional[int]:
+    """Highest aggregated document ID of the site, None if never aggregated."""
+    state = get_database().collection(os.getenv("AGG_STATE_COL")).get(
+        phrase_key(sitename)
+    )
+    return state["last_doc_id"] if state else None
+
+
+def write_watermark(sitename: str, last_doc_id: int) -> None:
+    """Storing highest aggregated document ID of the site."""
+    state_collection = get_database().collection(os.getenv("AGG_STATE_COL"))
+    execute_with_retry(
+        "chunk-aggregate-watermark",
+        partial(
+            state_collection.insert,
+            {
+                "_key": phrase_key(sitename),
+                "sitename": sitename,
+                "last_doc_id": last_doc_id,
+                "updated_at": datetime.utcnow().isoformat(),
+            },
+            overwrite=True,
         ),
     )
-    LOGGER.info("Chunk aggregator process finished.")
+
+
+def incremental_aggregate(
+    pool,
+    sitename: str,
+    n_jobs: int = 1,
+    docs_per_batch: int = 100,
+    max_gap: int = 1000,
+    lookback: int = INCREMENTAL_LOOKBACK,
+    since_id: Optional[int] = None,
+) -> int:
+    """Aggregating documents added since the last run.
+
+    Document IDs after the site watermark are aggregated in batches until
+    ``max_gap`` consecutive IDs have no records. The watermark moves to the
+    highest ID found, after every round of batches, and never past a failed
+    batch. Every run starts ``lookback`` IDs before the watermark, so
+    documents saved after a higher ID was aggregated are not missed. Records
+    are marked in the same transaction as their aggregation, so overlapping
+    or repeated runs do not count a record twice.
+
+    Args:
+        pool: Process pool running the batches.
+        sitename: name of the site
+        n_jobs: Number of processes in the pool, each gets a batch per round.
+        docs_per_batch: Document IDs in each query.
+        max_gap: Consecutive IDs without records that end the run.
+        lookback: IDs before the watermark checked again for documents
+            ingested late. Should cover the ingest batches run in parallel.
+        since_id: Watermark used instead of the stored one.
+
+    Returns:
+        Number of aggregated records.
+    """
+    watermark = read_watermark(sitename) if since_id is None else int(since_id)
+    highest = -1 if watermark is None else watermark
+    next_id = max(highest + 1 - lookback, 0)
+    LOGGER.info("Aggregating %s from doc ID %d.", sitename, next_id)
+
+    s_run = time()
+    aggregated, failed = 0, False
+    window = docs_per_batch * n_jobs
+    while not failed and next_id - 1 - highest < max_gap:
+        doc_ids = range(next_id, next_id + window)
+        next_id += window
+        batches = list(_doc_batches(doc_ids, docs_per_batch))
+        for result in pool.starmap(
+            bulk_aggregate, ((sitename, batch) for batch in batches)
+        ):
+            if result["failed"]:
+                failed = True
+                break
+            aggregated += result["records"]
+            found = [int(doc_id) for doc_id in result["doc_ids"]]
+            highest = max([highest] + found)
+
+        if highest >= 0 and highest != watermark:
+            write_watermark(sitename, highest)
+            watermark = highest
+
+    elapsed = time() - s_run
+    LOGGER.info(
+        "Aggregated %d records of %s up to doc ID %s in %.1f s (%.0f records/s).",
+        aggregated,
+        sitename,
+        watermark,
+        elapsed,
+        aggregated / elapsed if elapsed else 0,
+    )
+    if failed:
+        LOGGER.error("A batch failed, the next run resumes after doc ID %s.", watermark)
+    return aggregated
 
 
 def chunk_aggregate(
@@ -57,25 +320,16 @@ def chunk_aggregate(
 
     """
     phrase_collection = os.getenv("PHRASE_COLLECTION")
-    username = os.getenv("ARANGO_USER")
-    password = os.getenv("ARANGO_PASS")
-    database = os.getenv("ARANGO_DATABASE")
     try:
-        client = arango_connection()
-        phrase_db = client.db(database, username=username, password=password)
-
-        doc_fetch_query = """
-        for doc in @@phrase_collection
-            filter doc.sitename == @sitename AND doc.doc_id == @doc_id
-            return doc
-        """
+        phrase_db = get_database()
+
         bind_parameters = {
             "@phrase_collection": phrase_collection,
             "sitename": sitename,
             "doc_id": str(doc_id)
         }
         records = phrase_db.aql.execute(
-            doc_fetch_query,
+            DOC_FETCH_QUERY,
             bind_vars=bind_parameters
         )
         records = list(records)
@@ -111,8 +365,6 @@ def chunk_aggregate(
         "Finished aggregating records in (sitename = %s, docID = %s)", sitename, doc_id
     )
 
-    client.close()
-
 
 def aggregate_record(record: dict, phrase_client):
     """Processing aggregation for a single record.
@@ -147,19 +399,10 @@ def aggregate_record(record: dict, phrase_client):
         "phrase_length": phrase_length,
         "phrase_key": phrase_key
     }
-    try_counter = 1
-    while True:
-        try:
-            phrase_client.aql.execute(
-                upsert_query,
-                bind_vars=bind_parameters
-            )
-            break
-        except AQLQueryExecuteError:
-            LOGGER.warning(
-                "AQL exception for _key %s. Retrying (%d).",
-                phrase_key,
-                try_counter
-            )
-            try_counter += 1
-            sleep(0.1)
+    try:
+        execute_with_retry(
+            "chunk-aggregate",
+            partial(phrase_client.aql.execute, upsert_query, bind_vars=bind_parameters),
+        )
+    except Exception as err:
+        DEAD_LETTERS.write("chunk-aggregate", [record], err)
@@ -0,0 +1,43 @@
+"""Phrase export cli endpoint."""
+from time import time
+
+from phrase_api.lib.export import export_phrases, parse_fields
+from phrase_api.logger import LoggerSetup
+
+LOGGER = LoggerSetup("Phrase-Export", "info").get_minimal()
+
+
+def export_handler(cli_args):
+    """Exporting phrases of a status into a file.
+
+    Args:
+        cli_args: Arguments through CLI wrapper.
+
+    Returns:
+        False if the arguments are invalid, like Parquet without pyarrow.
+    """
+    s_export = time()
+    try:
+        chunks = export_phrases(
+            cli_args["status"],
+            export_format=cli_args["format"],
+            fields=parse_fields(cli_args["fields"]),
+            batch_size=cli_args["batch_size"],
+        )
+    except ValueError as err:
+        LOGGER.error(err)
+        return False
+
+    n_bytes = 0
+    with open(cli_args["output"], "wb") as export_file:
+        for chunk in chunks:
+            export_file.write(chunk)
+            n_bytes += len(chunk)
+
+    LOGGER.info(
+        "Exported %d bytes to %s in %.1f seconds.",
+        n_bytes,
+        cli_args["output"],
+        time() - s_export,
+    )
+    return True
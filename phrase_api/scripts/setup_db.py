@@ -0,0 +1,41 @@
+"""Database schema bootstrap cli endpoint."""
+from phrase_api.lib.schema import (
+    ensure_schema,
+    explain_hot_queries,
+    missing_indexes,
+)
+from phrase_api.logger import LoggerSetup
+
+LOGGER = LoggerSetup("Setup-DB", "info").get_minimal()
+
+
+def setup_db_handler(verify_only: bool = False, explain: bool = False) -> bool:
+    """Creating collections & indexes and reporting index usage of queries.
+
+    Args:
+        verify_only: Only report missing collections & indexes.
+        explain: Explaining every hot query of the API & CLI.
+
+    Returns:
+        True if schema is complete and no query scans a whole collection.
+    """
+    if not verify_only:
+        created = ensure_schema()
+        LOGGER.info("Created %d collections & indexes.", len(created))
+
+    missing = missing_indexes()
+    for item in missing:
+        LOGGER.error("Missing %s.", item)
+
+    full_scans = False
+    if explain:
+        for name, usage in explain_hot_queries().items():
+            LOGGER.info(
+                "%s: indexes %s, full scans %s",
+                name,
+                usage["indexes"] or "-",
+                usage["full_scans"] or "-",
+            )
+            full_scans = full_scans or bool(usage["full_scans"])
+
+    return not missing and not full_scans
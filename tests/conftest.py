@@ -8,6 +8,7 @@ import pandas as pd
 import pytest
 from phrase_counter.ingest import ingest_doc
 
+from phrase_api.lib.cache import FETCH_CACHE
 from phrase_api.lib.db import arango_connection
 
 
@@ -51,6 +52,7 @@ def initializing_db():
 
     test_node_collection.truncate()
     test_edge_collection.truncate()
+    FETCH_CACHE.clear()
 
     yield
 
@@ -76,6 +78,7 @@ def clean_collection():
 
     test_node_collection.truncate()
     test_edge_collection.truncate()
+    FETCH_CACHE.clear()
 
 
 @pytest.fixture(scope="function")
@@ -0,0 +1,86 @@
+"""Response cache tests."""
+from phrase_api.lib.cache import TTLCache
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hits_until_expiry() -> None:
+    """Checking that entries are served until their ttl passes."""
+    clock = FakeClock()
+    cache = TTLCache("test", ttl=10, clock=clock)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return [{"bag": "a"}]
+
+    assert cache.get_or_load("page", load) == [{"bag": "a"}]
+    clock.now = 9
+    cache.get_or_load("page", load)
+    assert len(loads) == 1
+
+    clock.now = 10
+    cache.get_or_load("page", load)
+    assert len(loads) == 2
+
+
+def test_evicts_least_recently_used() -> None:
+    """Checking that the least recently used entry is evicted first."""
+    cache = TTLCache("test", max_entries=2, ttl=10, clock=FakeClock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2
+
+
+def test_empty_pages_are_cached() -> None:
+    """Checking that empty results count as hits."""
+    cache = TTLCache("test", ttl=10, clock=FakeClock())
+    loads = []
+    for _ in range(3):
+        cache.get_or_load("page", lambda: loads.append(1) or [])
+    assert len(loads) == 1
+
+
+def test_clear_and_disabled() -> None:
+    """Checking invalidation and that ttl 0 disables caching."""
+    cache = TTLCache("test", ttl=10, clock=FakeClock())
+    cache.set("a", 1)
+    cache.clear()
+    assert cache.get("a") is None
+
+    disabled = TTLCache("test", ttl=0)
+    disabled.get_or_load("a", lambda: 1)
+    assert len(disabled) == 0
+
+
+def test_other_workers_are_stale_until_ttl() -> None:
+    """Checking that other workers serve new statuses once pages expire."""
+    clock = FakeClock()
+    statuses = {"a": None}
+    workers = [TTLCache("test", ttl=10, clock=clock) for _ in range(2)]
+
+    def load():
+        return dict(statuses)
+
+    for cache in workers:
+        cache.get_or_load("page", load)
+
+    statuses["a"] = "stop"
+    workers[0].clear()  # The worker serving the update
+    assert workers[0].get_or_load("page", load) == {"a": "stop"}
+    clock.now = 9.9
+    assert workers[1].get_or_load("page", load) == {"a": None}
+    clock.now = 10
+    assert workers[1].get_or_load("page", load) == {"a": "stop"}
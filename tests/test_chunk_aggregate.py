@@ -0,0 +1,74 @@
+"""Testing bulk chunk aggregation helpers."""
+from phrase_api.scripts import chunk_aggregate
+from phrase_api.scripts.chunk_aggregate import _doc_batches, incremental_aggregate
+
+
+class SerialPool:
+    """Pool running jobs in the calling process."""
+
+    def starmap(self, func, iterable):
+        return [func(*args) for args in iterable]
+
+
+def test_doc_batches() -> None:
+    """Document ids are split into string batches."""
+    assert list(_doc_batches(range(5), 2)) == [["0", "1"], ["2", "3"], ["4"]]
+    assert list(_doc_batches([], 2)) == []
+
+
+def test_incremental_aggregate(monkeypatch) -> None:
+    """Runs continue after the watermark and stop at a gap or failure."""
+    documents = {0, 3, 12, 15}
+    marked = set()
+    failing = set()
+    watermarks = {}
+
+    def bulk_aggregate(sitename, doc_ids):
+        if failing.intersection(doc_ids):
+            return {"records": 0, "phrases": 0, "doc_ids": [], "failed": True}
+        found = [doc_id for doc_id in doc_ids if int(doc_id) in documents]
+        pending = set(found) - marked
+        marked.update(pending)
+        return {
+            "records": len(pending),
+            "phrases": 0,
+            "doc_ids": found,
+            "failed": False,
+        }
+
+    monkeypatch.setattr(chunk_aggregate, "bulk_aggregate", bulk_aggregate)
+    monkeypatch.setattr(chunk_aggregate, "read_watermark", watermarks.get)
+    monkeypatch.setattr(
+        chunk_aggregate, "write_watermark", watermarks.__setitem__
+    )
+
+    def run(lookback=0):
+        return incremental_aggregate(
+            SerialPool(),
+            "site",
+            n_jobs=2,
+            docs_per_batch=5,
+            max_gap=10,
+            lookback=lookback,
+        )
+
+    assert run() == 4
+    assert watermarks == {"site": 15}
+
+    documents.update({16, 27})
+    assert run() == 2
+    assert watermarks == {"site": 27}
+
+    documents.update({31, 33})
+    failing.add("31")  # Its batch fails, the watermark stays
+    assert run() == 0
+    assert watermarks == {"site": 27}
+
+    failing.clear()
+    assert run() == 1  # 33 was aggregated by the batch next to the failed one
+    assert watermarks == {"site": 33}
+
+    documents.add(30)  # Saved after the run that moved past it
+    assert run() == 0
+    assert run(lookback=chunk_aggregate.INCREMENTAL_LOOKBACK) == 1
+    assert watermarks == {"site": 33}
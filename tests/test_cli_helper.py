@@ -0,0 +1,48 @@
+"""CLI helper tests."""
+from typing import List
+
+import pytest
+
+from phrase_api.lib import cli_helper
+
+
+class FakeResponse:
+    """Response with a status code and headers."""
+
+    def __init__(self, status_code: int) -> None:
+        self.status_code = status_code
+        self.headers = {"Retry-After": "1"} if status_code == 503 else {}
+
+
+@pytest.fixture
+def responses(monkeypatch: pytest.MonkeyPatch) -> List[int]:
+    """Status codes returned by the API in order, sleeps are skipped."""
+    codes: List[int] = []
+    monkeypatch.setattr(
+        cli_helper.requests,
+        "post",
+        lambda url, json, headers: FakeResponse(codes.pop(0)),
+    )
+    monkeypatch.setattr(cli_helper, "sleep", lambda seconds: None)
+    return codes
+
+
+def test_post_batch_retries_full_queue(responses: List[int]) -> None:
+    """Checking that 503 responses are retried until the batch is admitted."""
+    responses.extend([503, 503, 201])
+    assert cli_helper.post_batch("url", {}, {}).status_code == 201
+    assert not responses
+
+
+def test_post_batch_gives_up(responses: List[int]) -> None:
+    """Checking that the last 503 is returned once attempts are used up."""
+    responses.extend([503] * (cli_helper.INGEST_RETRY_ATTEMPTS + 1))
+    assert cli_helper.post_batch("url", {}, {}).status_code == 503
+    assert not responses
+
+
+def test_post_batch_keeps_other_errors(responses: List[int]) -> None:
+    """Checking that other failures are not retried."""
+    responses.extend([400, 201])
+    assert cli_helper.post_batch("url", {}, {}).status_code == 400
+    assert responses == [201]
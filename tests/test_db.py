@@ -10,7 +10,9 @@ from fastapi.exceptions import HTTPException
 
 from phrase_api.lib.db import (
     arango_connection,
+    decode_cursor,
     edge_generator,
+    encode_cursor,
     fetch_data,
     insert_phrase_data,
     integrate_phrase_data,
@@ -172,3 +174,59 @@ def test_simple_insert_arango(clean_collection, processed_text):
     test_col = test_db.collection(os.getenv("PHRASE_COLLECTION"))
     arango_rows = test_col.find({}, limit=1)
     assert list(arango_rows)
+
+
+def test_batch_upsert_round_trips(clean_collection, mock_data):
+    """Checking that batch mode writes the whole dataframe in one round trip."""
+    stats = integrate_phrase_data(mock_data, mode="batch")
+    assert stats == {"rows": len(mock_data), "round_trips": 1, "dropped": 0}
+
+
+def test_batch_upsert_chunks(clean_collection, mock_data):
+    """Checking that batch_size splits the dataframe into several statements."""
+    stats = integrate_phrase_data(mock_data, mode="batch", batch_size=50)
+    assert stats["rows"] == len(mock_data)
+    assert stats["round_trips"] == -(-len(mock_data) // 50)
+
+
+def test_batch_upsert_accumulates(clean_collection):
+    """Checking that batch mode keeps adding counts of existing phrases."""
+    sample_res = pd.DataFrame(
+        [{"bag": "test_bag", "count": 5, "status": None, "_key": "15fds67dsa94d6"}]
+    )
+    integrate_phrase_data(sample_res, mode="single")
+    integrate_phrase_data(sample_res, mode="batch")
+    test_client = arango_connection()
+    test_db = test_client.db(
+        os.getenv("ARANGO_DATABASE"),
+        username=os.getenv("ARANGO_USER"),
+        password=os.getenv("ARANGO_PASS"),
+    )
+    test_col = test_db.collection(os.getenv("PHRASE_COLLECTION"))
+    arango_rows = test_col.find({"_key": "15fds67dsa94d6"})
+    assert list(arango_rows)[0]["count"] == 10
+
+
+def test_cursor_pages_match_offset(clean_collection, mock_data):
+    """Checking that cursor pages walk the same order as offset pages."""
+    integrate_phrase_data(mock_data)
+    offset_keys = [
+        phrase["_key"] for phrase in fetch_data(status=None, limit=1000, offset=0)
+    ]
+
+    cursor_keys, cursor = [], None
+    while True:
+        page = fetch_data(status=None, limit=7, cursor=cursor)
+        cursor_keys.extend(phrase["_key"] for phrase in page)
+        if len(page) < 7:
+            break
+        cursor = encode_cursor(page[-1])
+
+    assert cursor_keys == offset_keys
+
+
+def test_invalid_cursor():
+    """Checking that malformed cursors are rejected."""
+    assert decode_cursor(encode_cursor({"count": 3, "_key": "abc"})) == (3, "abc")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
@@ -0,0 +1,76 @@
+"""Dictionary registry tests."""
+import pytest
+
+from phrase_api.lib import dictionaries
+
+
+@pytest.fixture(scope="function")
+def fake_dictionaries(monkeypatch):
+    """Replacing database loaders with in-memory dictionaries."""
+    data = {"ne": frozenset(["tehran"]), "stop": ["the"], "freq": ["in the city"]}
+    monkeypatch.setattr(dictionaries, "get_named_entities", lambda: data["ne"])
+    monkeypatch.setattr(dictionaries, "get_stop_words", lambda: data["stop"])
+    monkeypatch.setattr(dictionaries, "get_frequents", lambda type_freq: data["freq"])
+    # Collection revisions follow the data like ArangoDB revisions follow writes
+    monkeypatch.setattr(
+        dictionaries,
+        "collection_revisions",
+        lambda: {name: dictionaries.checksum(words) for name, words in data.items()},
+    )
+    return data
+
+
+def test_reload_swaps_only_changed(fake_dictionaries) -> None:
+    """Checking that unchanged dictionaries are reused after a reload."""
+    registry = dictionaries.DictionaryRegistry()
+    first = registry.get()
+    assert not registry.reload()
+
+    fake_dictionaries["stop"] = ["of"]
+    assert registry.reload()
+    second = registry.get()
+    assert second.version != first.version
+    assert second.ne_set is first.ne_set
+    assert second.freq_ne is first.freq_ne
+    assert second.stop_matcher.search("capital of iran")
+    assert not second.stop_matcher.search("the city")
+
+
+def test_listeners_get_new_snapshot(fake_dictionaries) -> None:
+    """Checking that subscribers are notified with the new snapshot."""
+    registry = dictionaries.DictionaryRegistry()
+    versions = []
+    registry.subscribe(lambda snapshot: versions.append(snapshot.version))
+    registry.get()
+    fake_dictionaries["ne"] = frozenset(["iran"])
+    registry.reload()
+    assert len(versions) == 2
+    assert versions[-1] == registry.get().version
+
+
+def test_snapshot_file_reused(fake_dictionaries, tmp_path, monkeypatch) -> None:
+    """Checking that a new process starts from the snapshot file."""
+    first = dictionaries.DictionaryRegistry(snapshot_dir=str(tmp_path)).get()
+    assert len(list(tmp_path.glob("dictionaries-*.pickle"))) == 1
+
+    def fail():
+        raise AssertionError("database should not be scanned")
+
+    monkeypatch.setattr(dictionaries, "get_named_entities", fail)
+    second = dictionaries.DictionaryRegistry(snapshot_dir=str(tmp_path)).get()
+    assert second.version == first.version
+    assert second.stop_matcher.search("the city")
+    assert second.freq_ne.remove("life in the city") == "life "
+
+
+def test_snapshot_file_replaced(fake_dictionaries, tmp_path) -> None:
+    """Checking that a revision change rebuilds and replaces the snapshot."""
+    registry = dictionaries.DictionaryRegistry(snapshot_dir=str(tmp_path))
+    old_path = registry.store.path(registry.get().revisions)
+
+    fake_dictionaries["ne"] = frozenset(["iran"])
+    assert registry.reload()
+    new_path = registry.store.path(registry.get().revisions)
+    assert list(tmp_path.glob("dictionaries-*.pickle")) == [new_path]
+    assert new_path != old_path
+    assert registry.get().ne_set == {"iran"}
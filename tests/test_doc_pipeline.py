@@ -0,0 +1,17 @@
+"""Testing CPU-bound document stages."""
+import pandas as pd
+
+from phrase_api.lib.doc_pipeline import build_edge_frame
+
+
+def test_build_edge_frame() -> None:
+    """Edges get keys & document handles of their words."""
+    rel_df = pd.DataFrame({"_from": ["a", "b"], "_to": ["b", "c"], "count": [2, 1]})
+
+    edges = build_edge_frame(rel_df, "words")
+
+    assert edges.to_dict(orient="records") == [
+        {"_from": "words/a", "_to": "words/b", "count": 2, "_key": "a_b"},
+        {"_from": "words/b", "_to": "words/c", "count": 1, "_key": "b_c"},
+    ]
+    assert list(rel_df["_from"]) == ["a", "b"]  # Input is left untouched
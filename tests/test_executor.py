@@ -0,0 +1,44 @@
+"""Bounded executor tests."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from phrase_api.lib.executor import BoundedExecutor, QueueSaturatedError
+
+
+def test_acquire_limits_jobs() -> None:
+    """Checking that jobs over ``max_pending`` are refused."""
+    executor = BoundedExecutor(cpu_workers=0, io_workers=1, max_pending=1)
+    executor.acquire()
+    with pytest.raises(QueueSaturatedError):
+        executor.acquire()
+    executor.release()
+    executor.acquire()
+
+
+def test_acquire_many_jobs() -> None:
+    """Checking that jobs admitted together take a slot each."""
+    executor = BoundedExecutor(cpu_workers=0, io_workers=1, max_pending=4)
+    executor.acquire(3)
+    with pytest.raises(QueueSaturatedError):
+        executor.acquire(2)
+    executor.acquire()
+    executor.release(4)
+    assert executor.pending == 0
+
+
+def test_run_cpu_retries_on_replaced_pool() -> None:
+    """Checking that a job reaching a pool shut down by a reload still runs."""
+    executor = BoundedExecutor(cpu_workers=0, io_workers=1, max_pending=1)
+    stale_pool = ThreadPoolExecutor(max_workers=1)
+    stale_pool.shutdown()
+    pools = [stale_pool]
+    cpu_pool = executor.cpu_pool
+
+    def replaced_pool():
+        return pools.pop() if pools else cpu_pool()
+
+    executor.cpu_pool = replaced_pool  # type: ignore
+    assert asyncio.run(executor.run_cpu(sum, [1, 2])) == 3
+    executor.shutdown()
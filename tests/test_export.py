@@ -0,0 +1,54 @@
+"""Phrase export encoder tests."""
+import json
+
+import pytest
+
+from phrase_api.lib import export
+from phrase_api.lib.export import csv_stream, ndjson_stream, parse_fields
+
+BATCHES = [
+    [{"bag": "new york", "count": 3, "status": None}],
+    [{"bag": "tehran", "count": 1, "status": "highlight"}],
+]
+
+
+def test_parse_fields() -> None:
+    """Checking projection parsing."""
+    assert parse_fields(None) == ["_key", "bag", "count", "status", "length"]
+    assert parse_fields("bag, count") == ["bag", "count"]
+    with pytest.raises(ValueError):
+        parse_fields("bag,password")
+
+
+def test_ndjson_stream() -> None:
+    """Checking one JSON line per phrase and one chunk per batch."""
+    chunks = list(ndjson_stream(iter(BATCHES)))
+    assert len(chunks) == 2
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert rows == BATCHES[0] + BATCHES[1]
+
+
+def test_csv_stream() -> None:
+    """Checking header, projection & empty exports."""
+    text = b"".join(csv_stream(iter(BATCHES), ["bag", "count"])).decode()
+    assert text.splitlines() == ["bag,count", "new york,3", "tehran,1"]
+    assert b"".join(csv_stream(iter([]), ["bag"])).decode().strip() == "bag"
+
+
+def test_parquet_stream() -> None:
+    """Checking that Parquet chunks read back as the exported phrases."""
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    fields = ["bag", "count", "status"]
+    data = b"".join(export.parquet_stream(iter(BATCHES), fields))
+    table = pq.read_table(pa.BufferReader(data))
+    assert table.column_names == fields
+    assert table.to_pylist() == BATCHES[0] + BATCHES[1]
+    assert pq.ParquetFile(pa.BufferReader(data)).num_row_groups == 2
+
+
+def test_parquet_without_pyarrow(monkeypatch) -> None:
+    """Checking that Parquet export is refused when pyarrow is missing."""
+    monkeypatch.setattr(export, "pa", None)
+    with pytest.raises(ValueError, match="parquet extra"):
+        export.export_phrases(None, export_format="parquet")
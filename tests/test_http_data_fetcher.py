@@ -19,3 +19,12 @@ def test_bad_status() -> None:
     with pytest.raises(HTTPException):
         response = client.get("http://127.0.0.1:8000/api/data-fetcher/?status=wrong")
         assert response.status_code == 400
+
+
+def test_export_csv() -> None:
+    """Testing CSV export with projection."""
+    response = client.get(
+        "http://127.0.0.1:8000/api/data-fetcher/export?format=csv&fields=bag,count"
+    )
+    assert response.status_code == 200
+    assert response.text.splitlines()[0] == "bag,count"
@@ -1,6 +1,9 @@
 """Testing doc-process endpoint."""
 from typing import Callable
 
+import json
+import sys
+
 from fastapi.testclient import TestClient
 
 from phrase_api.routers.http_doc_processor import router
@@ -25,3 +28,84 @@ def test_with_sample_page(test_page: str) -> None:
     )
 
     assert response.status_code == 201
+
+
+def test_batch_router(clean_collection: Callable[[], None]) -> None:
+    """Testing batch endpoint with per-document results."""
+    sample_payload = {
+        "documents": [
+            {"document": "hello world", "doc_id": "1", "sitename": "test"},
+            {"document": "hello there", "doc_id": "2", "sitename": "test"},
+        ]
+    }
+    response = client.post(
+        "http://127.0.0.1:8000/api/doc-process/batch?doc_type=TEXT",
+        json=sample_payload,
+    )
+
+    assert response.status_code == 201
+    results = response.json()["documents"]
+    assert [result["doc_id"] for result in results] == ["1", "2"]
+    assert all(result["status"] == "done" for result in results)
+
+
+def test_stream_router(clean_collection: Callable[[], None]) -> None:
+    """Testing NDJSON stream endpoint with a malformed line."""
+    body = "\n".join(
+        [
+            '{"document": "hello world", "doc_id": "1"}',
+            "not json",
+            '{"document": "hello there", "doc_id": "2"}',
+        ]
+    )
+    response = client.post(
+        "http://127.0.0.1:8000/api/doc-process/stream?batch_size=1",
+        content=body.encode(),
+    )
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1]["done"] == 2
+    assert lines[-1]["failed"] == 1
+
+
+def test_failed_save_is_not_created(monkeypatch, tmp_path) -> None:
+    """Testing that phrases dropped after retries do not return 201."""
+    from phrase_api.lib import retry
+    from phrase_api.routers import http_doc_processor
+
+    class FailingAql:
+        def execute(self, *args, **kwargs):
+            raise ValueError("collection not found")
+
+    class FailingDatabase:
+        aql = FailingAql()
+
+    db_module = sys.modules[http_doc_processor.integrate_phrase_data.__module__]
+    monkeypatch.setattr(db_module, "get_database", lambda: FailingDatabase())
+    monkeypatch.setattr(http_doc_processor, "BUFFER", None)
+    monkeypatch.setattr(retry.DEAD_LETTERS, "path", str(tmp_path / "dead.jsonl"))
+
+    response = client.post(
+        "http://127.0.0.1:8000/api/doc-process/?doc_type=TEXT",
+        json={"document": "hello world"},
+    )
+
+    assert response.status_code == 500
+    assert (tmp_path / "dead.jsonl").exists()
+
+
+def test_stream_rejected_when_queue_is_full(monkeypatch) -> None:
+    """Testing that a stream is not admitted past a saturated queue."""
+    from phrase_api.routers import http_doc_processor
+
+    executor = http_doc_processor.EXECUTOR
+    monkeypatch.setattr(executor, "pending", executor.max_pending - 1)
+
+    response = client.post(
+        "http://127.0.0.1:8000/api/doc-process/stream",
+        content=b'{"document": "hello world", "doc_id": "1"}',
+    )
+
+    assert response.status_code == 503
+    assert executor.pending == executor.max_pending - 1
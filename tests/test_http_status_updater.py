@@ -72,3 +72,33 @@ def test_new_phrase() -> None:
     with pytest.raises(HTTPException):
         response = client.post("http://127.0.0.1:8000/api/status-updater/sample/1")
         assert response.status_code == 404
+
+
+def test_bulk_update(clean_collection: Callable[[], None]) -> None:
+    """Testing bulk update with found & missing phrases."""
+    sample_res = pd.DataFrame(
+        [
+            {
+                "bag": "sample",
+                "count": 1,
+                "status": None,
+                "_key": sha256(b"sample").hexdigest(),
+            }
+        ]
+    )
+    integrate_phrase_data(sample_res)
+
+    payload = {
+        "updates": [
+            {"phrase": "sample", "status": "stop"},
+            {"phrase": "missing phrase", "status": "highlight"},
+        ]
+    }
+    response = client.post(
+        "http://127.0.0.1:8000/api/status-updater/bulk", json=payload
+    )
+
+    assert response.status_code == 201
+    body = response.json()
+    assert [result["found"] for result in body["results"]] == [True, False]
+    assert body["updated"] == 1
@@ -0,0 +1,107 @@
+"""Word matcher tests."""
+import random
+import re
+
+from phrase_api.lib.frequent_remover import build_freq_regexes
+from phrase_api.lib.matcher import PhraseRemover, WordMatcher
+
+
+def test_whole_word_match() -> None:
+    """Checking that only whole words are matched."""
+    matcher = WordMatcher(["of", "in the"])
+    assert matcher.search("capital of iran")
+    assert matcher.search("born in the city")
+    assert not matcher.search("offer")
+    assert not matcher.search("in them")
+
+
+def test_metacharacters_are_literal() -> None:
+    """Checking that regex metacharacters in words are not interpreted."""
+    matcher = WordMatcher(["a.b", "c+"])
+    assert matcher.search("x a.b y")
+    assert not matcher.search("x axb y")
+    assert matcher.search("c+d")
+    assert not matcher.search("cc d")
+
+
+def test_same_result_as_regex() -> None:
+    """Checking results against the escaped alternation regex."""
+    rnd = random.Random(7)
+    alphabet = "ab -_."
+    for _ in range(500):
+        words = ["".join(rnd.choices(alphabet, k=rnd.randint(1, 4))) for _ in range(4)]
+        regex = re.compile(r"\b(" + "|".join(map(re.escape, words)) + r")\b")
+        matcher = WordMatcher(words)
+        texts = [
+            "".join(rnd.choices(alphabet, k=rnd.randint(0, 12))) for _ in range(10)
+        ]
+        assert matcher.search_many(texts) == [bool(regex.search(t)) for t in texts]
+
+
+def test_phrase_remover_longest_match() -> None:
+    """Checking that the longest phrase at a position is removed."""
+    remover = PhraseRemover(["new york", "york times square"])
+    text = "the new york times square"
+    assert remover.remove(text) == "the  times square"
+    assert remover.remove(text, priority="length") == "the new "
+    assert remover.remove("renew it") == "renew it"
+
+
+def test_phrase_remover_same_as_regex_cascade() -> None:
+    """Checking length priority against the per-length regexes."""
+    rnd = random.Random(3)
+    for _ in range(300):
+        phrases = [
+            " ".join(rnd.choice(["a", "b", "ab"]) for _ in range(rnd.randint(1, 3)))
+            for _ in range(4)
+        ]
+        regexes = build_freq_regexes(phrases)
+        remover = PhraseRemover(phrases)
+        text = " ".join(rnd.choice(["a", "b", "ab"]) for _ in range(8))
+        expected = text
+        for length in regexes:
+            expected = re.sub(regexes[length], "", expected)
+        assert remover.remove(text, priority="length") == expected
+
+
+def escaped_cascade(phrases, text):
+    """Per-length regexes with literal phrases, longest alternative first."""
+    by_length = {}
+    for phrase in set(phrases):
+        if phrase.strip():
+            by_length.setdefault(len(phrase.split()), []).append(phrase)
+    for length in sorted(by_length, reverse=True):
+        alternatives = sorted(by_length[length], key=len, reverse=True)
+        regex = r"\b(" + "|".join(map(re.escape, alternatives)) + r")\b"
+        text = re.sub(regex, "", text)
+    return text
+
+
+def test_phrase_remover_punctuation_and_metacharacters() -> None:
+    """Checking phrases with punctuation and regex metacharacters."""
+    rnd = random.Random(11)
+    alphabet = ["a", "b", "ab", " ", "-", ".", "(", ")", "+", "*", "?"]
+    for _ in range(500):
+        phrases = [
+            "".join(rnd.choices(alphabet, k=rnd.randint(1, 5))) for _ in range(4)
+        ]
+        remover = PhraseRemover(phrases)
+        text = "".join(rnd.choices(alphabet, k=rnd.randint(0, 16)))
+        assert remover.remove(text, priority="length") == escaped_cascade(
+            phrases, text
+        )
+
+
+def test_phrase_remover_differs_from_unescaped_regexes() -> None:
+    """Documenting where the trie differs from ``build_freq_regexes``."""
+    phrases = ["a b", "a b-c"]
+    regexes = build_freq_regexes(phrases)
+    text = "x a b-c y"
+    assert re.sub(regexes[2], "", text) == "x -c y"
+    assert PhraseRemover(phrases).remove(text, priority="length") == "x  y"
+
+    # Metacharacters are literal in the trie
+    regexes = build_freq_regexes(["a.b"])
+    assert re.sub(regexes[1], "", "x axb y") == "x  y"
+    assert PhraseRemover(["a.b"]).remove("x axb y") == "x axb y"
+    assert PhraseRemover(["a.b"]).remove("x a.b y") == "x  y"
@@ -0,0 +1,45 @@
+"""Testing in-memory NE search."""
+from phrase_api.lib.checkpoint import CheckpointStore
+from phrase_api.lib.keys import phrase_keys
+from phrase_api.scripts.NE_search import (
+    KEY_RANGE_END,
+    find_ner,
+    partition_bounds,
+)
+
+NE_HASHES = frozenset(phrase_keys(["tehran", "iran", "reza"]))
+
+
+def test_find_ner() -> None:
+    """Keys of records whose words are all NE are found at once."""
+    records = [
+        {"_key": "1", "bag": "tehran"},
+        {"_key": "2", "bag": "reza lives"},
+        {"_key": "3", "bag": "iran tehran reza"},
+        {"_key": "4", "bag": "city"},
+    ]
+
+    assert find_ner(records, NE_HASHES) == ["1", "3"]
+    assert find_ner([], NE_HASHES) == []
+
+
+def test_partition_bounds() -> None:
+    """Key ranges are contiguous and cover every key."""
+    bounds = partition_bounds(4)
+
+    assert bounds[0][0] == "" and bounds[-1][1] == KEY_RANGE_END
+    assert all(prev[1] == curr[0] for prev, curr in zip(bounds, bounds[1:]))
+    assert bounds[1][0] == "40000000"
+    assert partition_bounds(1) == [("", KEY_RANGE_END)]
+
+
+def test_checkpoint_store(tmp_path) -> None:
+    """Checkpoints are read back until cleared."""
+    store = CheckpointStore(str(tmp_path / "checkpoints"))
+    assert store.read("partition-00000") is None
+
+    store.write("partition-00000", {"after": "ab", "done": False})
+    assert store.read("partition-00000") == {"after": "ab", "done": False}
+
+    store.clear()
+    assert store.read("partition-00000") is None
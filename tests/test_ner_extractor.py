@@ -0,0 +1,27 @@
+"""Testing the streaming NER file parser."""
+import io
+from hashlib import sha256
+
+from phrase_api.scripts.NER_extractor import iter_ne_batches, process_ner_file
+
+NER_TEXT = "تهران\tB-LOC\nرفت O\nایران|I-LOC\nتهران B-LOC\nكتاب S-ORG\nخانه X-ORG\n"
+
+
+def test_process_ner_file() -> None:
+    """Tagged words are kept once, normalized & hashed."""
+    df = process_ner_file(NER_TEXT)
+
+    assert list(df["word"]) == ["تهران", "ایران", "کتاب"]
+    assert list(df["word_hash"]) == [
+        sha256(word.encode()).hexdigest() for word in df["word"]
+    ]
+
+
+def test_iter_ne_batches() -> None:
+    """Lines are streamed into batches of distinct words."""
+    batches = list(iter_ne_batches(io.StringIO(NER_TEXT), batch_size=2))
+
+    assert [list(batch["word"]) for batch in batches] == [
+        ["تهران", "ایران"],
+        ["کتاب"],
+    ]
@@ -0,0 +1,91 @@
+"""Retry policy & dead-letter sink tests."""
+import json
+
+import pytest
+from arango.exceptions import AQLQueryExecuteError
+
+from phrase_api.lib.retry import (
+    DeadLetterSink,
+    RetryPolicy,
+    execute_with_retry,
+    retry_reason,
+)
+
+NO_WAIT = RetryPolicy(max_attempts=5, base_delay=0, max_delay=0)
+
+
+def arango_error(error_code: int, http_code: int = 409) -> AQLQueryExecuteError:
+    """Server error with given codes."""
+    err = AQLQueryExecuteError.__new__(AQLQueryExecuteError)
+    err.error_code = error_code
+    err.http_code = http_code
+    return err
+
+
+class FlakyWrite:
+    """Write failing with given errors before succeeding."""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def test_error_classification() -> None:
+    """Checking transient & fatal error codes."""
+    assert retry_reason(arango_error(1200)) == "conflict"
+    assert retry_reason(arango_error(18)) == "lock-timeout"
+    assert retry_reason(arango_error(0, http_code=503)) == "unavailable"
+    assert retry_reason(arango_error(1203, http_code=404)) is None
+    assert retry_reason(ValueError()) is None
+
+
+def test_backoff_is_bounded() -> None:
+    """Checking that jittered delays stay within the exponential bound."""
+    policy = RetryPolicy(base_delay=0.1, max_delay=1.0)
+    for attempt in range(10):
+        assert 0 <= policy.delay(attempt) <= min(1.0, 0.1 * 2 ** attempt)
+
+
+def test_retries_conflicts() -> None:
+    """Checking that write-write conflicts are retried until success."""
+    write = FlakyWrite(arango_error(1200), arango_error(1200))
+    assert execute_with_retry("test", write, policy=NO_WAIT) == "ok"
+    assert write.calls == 3
+
+
+def test_fatal_error_not_retried() -> None:
+    """Checking that fatal errors are raised at once."""
+    write = FlakyWrite(arango_error(1203, http_code=404))
+    with pytest.raises(AQLQueryExecuteError):
+        execute_with_retry("test", write, policy=NO_WAIT)
+    assert write.calls == 1
+
+
+def test_budget_shared_by_batch() -> None:
+    """Checking that retries stop once the batch budget is used."""
+    budget = RetryPolicy(min_budget=2, budget_ratio=0).budget(100)
+    first = FlakyWrite(arango_error(1200), arango_error(1200))
+    assert execute_with_retry("test", first, budget=budget, policy=NO_WAIT) == "ok"
+
+    second = FlakyWrite(arango_error(1200))
+    with pytest.raises(AQLQueryExecuteError):
+        execute_with_retry("test", second, budget=budget, policy=NO_WAIT)
+    assert second.calls == 1
+
+
+def test_dead_letter_sink(tmp_path) -> None:
+    """Checking that failed rows are appended as JSON lines."""
+    path = tmp_path / "failed" / "dead_letters.jsonl"
+    sink = DeadLetterSink(str(path))
+    assert sink.write("test", [{"_key": "a"}, {"_key": "b"}], ValueError("x")) == 2
+    sink.write("test", [{"_key": "c"}], ValueError("y"))
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["row"]["_key"] for line in lines] == ["a", "b", "c"]
+    assert lines[0]["error"] == "ValueError: x"
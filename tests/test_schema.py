@@ -0,0 +1,31 @@
+"""Schema bootstrap tests."""
+from phrase_api.lib.schema import ensure_schema, explain_hot_queries, missing_indexes
+
+# Every collection of the schema is set in .env.test, so all queries are explained
+HOT_QUERY_NAMES = [
+    "fetch-data status=None",
+    "fetch-data status=highlight cursor",
+    "status update",
+    "chunk-agg fetch",
+    "chunk-agg bulk",
+    "search-NE fetch",
+    "search-NE tag",
+    "NER insert",
+    "word-graph refresh",
+]
+
+
+def test_ensure_schema_is_idempotent() -> None:
+    """Checking that a second bootstrap creates nothing."""
+    ensure_schema()
+    assert not missing_indexes()
+    assert not ensure_schema()
+
+
+def test_hot_queries_use_indexes() -> None:
+    """Checking that no hot query enumerates a whole collection."""
+    ensure_schema()
+    usage = explain_hot_queries()
+    assert set(HOT_QUERY_NAMES) <= set(usage)
+    for name, plan in usage.items():
+        assert not plan["full_scans"], name
@@ -0,0 +1,23 @@
+"""Status detection tests."""
+import re
+
+import pandas as pd
+
+from phrase_api.lib.status_updater import detect_statuses, status_detector
+
+STOP_PATTERN = re.compile(r"\b(of|the)\b")
+NE_SET = frozenset(["tehran", "iran"])
+
+
+def test_status_detector() -> None:
+    """Checking stop, highlight and undetermined phrases."""
+    assert status_detector("capital of iran", STOP_PATTERN, NE_SET) == "suggested-stop"
+    assert status_detector("tehran iran", STOP_PATTERN, NE_SET) == "suggested-highlight"
+    assert status_detector("tehran city", STOP_PATTERN, NE_SET) is None
+
+
+def test_detect_statuses_matches_status_detector() -> None:
+    """Checking that column labelling equals per phrase detection."""
+    bags = pd.Series(["capital of iran", "tehran iran", "tehran city", "iran", "theme"])
+    expected = [status_detector(bag, STOP_PATTERN, NE_SET) for bag in bags]
+    assert detect_statuses(bags, STOP_PATTERN, NE_SET) == expected
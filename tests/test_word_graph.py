@@ -0,0 +1,119 @@
+"""Testing the in-memory word graph adjacency."""
+from phrase_api.lib.keys import phrase_key
+from phrase_api.lib.word_graph import WordGraphCache, build_adjacency
+
+WORDS = {phrase_key(word): word for word in ["a", "b", "c", "d", "e"]}
+
+
+def edge(_from: str, _to: str, count: int, updated_at: int = 1):
+    """Edge row between two words."""
+    return (phrase_key(_from), phrase_key(_to), count, updated_at)
+
+
+def named(adjacency, nodes):
+    """Words of node ids."""
+    return [adjacency.words[node] for node in nodes]
+
+
+def test_neighbors_sorted_by_count() -> None:
+    """Top neighbors are the most frequent ones."""
+    adjacency = build_adjacency(
+        None, [edge("a", "b", 5), edge("a", "c", 9), edge("a", "d", 1)], WORDS
+    )
+    neighbors = adjacency.neighbors(adjacency.node("a"), limit=2)
+
+    assert [(adjacency.words[node], count) for node, count in neighbors] == [
+        ("c", 9),
+        ("b", 5),
+    ]
+    assert adjacency.neighbors(adjacency.node("d")) == []
+    assert adjacency.node("missing") is None
+
+
+def test_merge_replaces_counts() -> None:
+    """Changed edges replace their counts, the previous adjacency is kept."""
+    previous = build_adjacency(None, [edge("a", "b", 5), edge("a", "c", 9)], WORDS)
+    merged = build_adjacency(
+        previous, [edge("a", "b", 20, 7), edge("c", "e", 1, 8)], WORDS
+    )
+
+    assert named(merged, [n for n, _ in merged.neighbors(merged.node("a"))]) == [
+        "b",
+        "c",
+    ]
+    assert merged.edge_count == 3
+    assert merged.watermark == 8
+    assert previous.edge_count == 2
+    assert previous.neighbors(previous.node("a"))[0][1] == 9
+
+
+def test_expand_follows_top_neighbors() -> None:
+    """Expansion stops at given hops & neighbors per word."""
+    adjacency = build_adjacency(
+        None,
+        [edge("a", "b", 5), edge("a", "c", 1), edge("b", "d", 1), edge("d", "e", 1)],
+        WORDS,
+    )
+    depths = adjacency.expand(adjacency.node("a"), hops=2, limit=1)
+
+    assert {adjacency.words[node]: depth for node, depth in depths.items()} == {
+        "a": 0,
+        "b": 1,
+        "d": 2,
+    }
+
+
+def test_weighted_path() -> None:
+    """Frequent edges are preferred within the hop limit."""
+    adjacency = build_adjacency(
+        None,
+        [edge("a", "b", 10), edge("b", "c", 10), edge("a", "c", 1)],
+        WORDS,
+    )
+    source, target = adjacency.node("a"), adjacency.node("c")
+
+    path, cost = adjacency.weighted_path(source, target)
+    assert named(adjacency, path) == ["a", "b", "c"]
+    assert cost == 0.2
+
+    path, cost = adjacency.weighted_path(source, target, max_hops=1)
+    assert named(adjacency, path) == ["a", "c"]
+    assert adjacency.weighted_path(target, source) is None
+
+
+def test_refresh_fetches_changed_edges(monkeypatch) -> None:
+    """Refreshes only ask for edges updated after the watermark."""
+    cache = WordGraphCache(overlap=1)
+    requests = []
+
+    def fetch_edges(since):
+        requests.append(since)
+        if since is None:
+            return [edge("a", "b", 1, 5000)]
+        return [edge("b", "c", 2, 9000)] if len(requests) == 2 else []
+
+    monkeypatch.setattr(cache, "_fetch_edges", fetch_edges)
+    monkeypatch.setattr(
+        cache, "_fetch_words", lambda hashes: {h: WORDS[h] for h in hashes}
+    )
+
+    assert cache.get().edge_count == 1
+    assert cache.refresh() == 1
+    assert cache.refresh() == 0
+    assert requests == [None, 4000, 8000]
+    assert named(cache.get(), [n for n, _ in cache.get().neighbors(1)]) == ["c"]
+
+
+def test_refresh_starts_on_first_get(monkeypatch) -> None:
+    """Background refresh starts only once the graph is read."""
+    cache = WordGraphCache(ttl=60)
+    monkeypatch.setattr(cache, "_fetch_edges", lambda since: [edge("a", "b", 1, 1)])
+    monkeypatch.setattr(
+        cache, "_fetch_words", lambda hashes: {h: WORDS[h] for h in hashes}
+    )
+
+    assert cache._thread is None
+    cache.get()
+    assert cache._thread is not None
+    cache.stop()
+    assert cache._thread is None
@@ -0,0 +1,128 @@
+"""Write-behind buffer tests."""
+from typing import List
+
+import threading
+
+import pandas as pd
+import pytest
+from pandas import DataFrame
+
+from phrase_api.lib import write_buffer
+from phrase_api.lib.write_buffer import PhraseWriteBuffer
+
+
+def phrase_frame(*bags: str) -> DataFrame:
+    """Counted phrases with count 1 for every bag."""
+    return pd.DataFrame(
+        {
+            "_key": list(bags),
+            "bag": list(bags),
+            "count": [1] * len(bags),
+            "status": [None] * len(bags),
+            "length": [1] * len(bags),
+        }
+    )
+
+
+class FakeWriter:
+    """Collecting written dataframes."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.frames: List[DataFrame] = []
+
+    def __call__(self, result: DataFrame):
+        if self.fail:
+            raise RuntimeError("write failed")
+        self.frames.append(result)
+        return {"rows": len(result), "round_trips": 1}
+
+
+def test_async_sums_hot_phrases() -> None:
+    """Checking that repeated phrases are written once with summed counts."""
+    writer = FakeWriter()
+    buffer = PhraseWriteBuffer(mode="async", max_rows=100, writer=writer)
+    for _ in range(50):
+        assert buffer.write(phrase_frame("hot", "cold")) == {
+            "rows": 0,
+            "round_trips": 0,
+        }
+    assert not writer.frames
+
+    buffer.close()
+    assert len(writer.frames) == 1
+    counts = dict(zip(writer.frames[0]["_key"], writer.frames[0]["count"]))
+    assert counts == {"hot": 50, "cold": 50}
+
+
+def test_async_flushes_on_size() -> None:
+    """Checking that a full buffer is flushed by the writer filling it."""
+    writer = FakeWriter()
+    buffer = PhraseWriteBuffer(mode="async", max_rows=2, writer=writer)
+    buffer.write(phrase_frame("a"))
+    assert buffer.write(phrase_frame("b"))["rows"] == 2
+    assert len(buffer) == 0
+
+
+def test_async_keeps_counts_of_failed_flush() -> None:
+    """Checking that counts of a failed flush are retried later."""
+    writer = FakeWriter(fail=True)
+    buffer = PhraseWriteBuffer(mode="async", writer=writer)
+    buffer.write(phrase_frame("a"))
+    buffer.flush()
+    buffer.write(phrase_frame("a"))
+
+    writer.fail = False
+    buffer.flush()
+    assert writer.frames[0]["count"].tolist() == [2]
+
+
+def test_ack_writes_before_returning() -> None:
+    """Checking that ack mode saves counts before write returns."""
+    writer = FakeWriter()
+    buffer = PhraseWriteBuffer(mode="ack", writer=writer)
+    assert buffer.write(phrase_frame("a", "b"))["rows"] == 2
+    assert len(writer.frames) == 1
+
+
+def test_ack_raises_on_failed_flush() -> None:
+    """Checking that ack mode surfaces write errors to the caller."""
+    buffer = PhraseWriteBuffer(mode="ack", writer=FakeWriter(fail=True))
+    with pytest.raises(RuntimeError):
+        buffer.write(phrase_frame("a"))
+    assert len(buffer) == 0
+
+
+def test_error_history_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Checking that errors are kept for ack mode only and evicted."""
+    monkeypatch.setattr(write_buffer, "_ERROR_HISTORY", 3)
+    writer = FakeWriter(fail=True)
+    buffer = PhraseWriteBuffer(mode="ack", writer=writer)
+    with pytest.raises(RuntimeError):
+        buffer.write(phrase_frame("a"))
+    writer.fail = False
+    for _ in range(5):
+        buffer.write(phrase_frame("a"))
+    assert not buffer._errors
+
+    buffer = PhraseWriteBuffer(mode="async", writer=FakeWriter(fail=True))
+    buffer.write(phrase_frame("a"))
+    buffer.flush()
+    assert not buffer._errors
+
+
+def test_ack_concurrent_writers() -> None:
+    """Checking that concurrent ack writers lose no counts."""
+    writer = FakeWriter()
+    buffer = PhraseWriteBuffer(mode="ack", writer=writer)
+    threads = [
+        threading.Thread(target=buffer.write, args=(phrase_frame("hot"),))
+        for _ in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(frame["count"].sum() for frame in writer.frames) == 20
+    assert len(writer.frames) <= 20